@@ -0,0 +1,78 @@
+from typing import AbstractSet, Any, Dict, List, Tuple, Union
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models import BulkItemResult, BulkResult
+
+Update = Union[Dict[str, Any], List[Dict[str, Any]]]
+
+
+def _write_errors(exc: BulkWriteError) -> Dict[int, str]:
+    return {error["index"]: error.get("errmsg", "write error") for error in exc.details.get("writeErrors", [])}
+
+
+def collect_results(ids: List[str], ordered: bool, errors: Dict[int, str], missing: AbstractSet[str] = frozenset()) -> BulkResult:
+    result = BulkResult(ordered=ordered)
+    # An ordered batch stops at its first failed write; nothing after it ran.
+    stop_at = min(errors) if ordered and errors else None
+    for index, doc_id in enumerate(ids):
+        if stop_at is not None and index > stop_at:
+            item = BulkItemResult(index=index, id=doc_id, status="skipped")
+        elif index in errors:
+            item = BulkItemResult(index=index, id=doc_id, status="error", error=errors[index])
+        elif doc_id in missing:
+            item = BulkItemResult(index=index, id=doc_id, status="not_found")
+        else:
+            item = BulkItemResult(index=index, id=doc_id, status="ok")
+        if item.status == "ok":
+            result.succeeded += 1
+        else:
+            result.failed += 1
+        result.results.append(item)
+    return result
+
+
+async def _existing_ids(collection: AsyncIOMotorCollection, ids: List[str]) -> set:
+    cursor = collection.find({"id": {"$in": ids}}, {"_id": 0, "id": 1})
+    return {doc["id"] async for doc in cursor}
+
+
+async def bulk_insert(collection: AsyncIOMotorCollection, docs: List[Dict[str, Any]], ordered: bool) -> BulkResult:
+    ids = [doc["id"] for doc in docs]
+    errors = {}
+    if docs:
+        try:
+            # insert_many adds _id to the dicts in place; hand it copies.
+            await collection.insert_many([dict(doc) for doc in docs], ordered=ordered)
+        except BulkWriteError as exc:
+            errors = _write_errors(exc)
+    return collect_results(ids, ordered, errors)
+
+
+async def bulk_update(
+    collection: AsyncIOMotorCollection, updates: List[Tuple[str, Update]], ordered: bool
+) -> BulkResult:
+    ids = [doc_id for doc_id, _ in updates]
+    errors, existing = {}, set()
+    if updates:
+        existing = await _existing_ids(collection, ids)
+        try:
+            await collection.bulk_write(
+                [UpdateOne({"id": doc_id}, update) for doc_id, update in updates], ordered=ordered
+            )
+        except BulkWriteError as exc:
+            errors = _write_errors(exc)
+    return collect_results(ids, ordered, errors, set(ids) - existing)
+
+
+async def bulk_delete(collection: AsyncIOMotorCollection, ids: List[str], ordered: bool) -> BulkResult:
+    errors, existing = {}, set()
+    if ids:
+        existing = await _existing_ids(collection, ids)
+        try:
+            await collection.bulk_write([DeleteOne({"id": doc_id}) for doc_id in ids], ordered=ordered)
+        except BulkWriteError as exc:
+            errors = _write_errors(exc)
+    return collect_results(ids, ordered, errors, set(ids) - existing)
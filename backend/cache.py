@@ -0,0 +1,122 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from repository import Repository
+
+
+class CacheBackend:
+    """Async key/value interface the services cache documents through.
+
+    Values are plain BSON-free dicts, so an external store (Redis, memcached)
+    can implement this by serializing them.
+    """
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    async def clear(self, prefix: str = "") -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class NullCache(CacheBackend):
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        pass
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        pass
+
+    async def clear(self, prefix: str = "") -> None:
+        pass
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU with a per-entry TTL and a bound on entry count."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self, prefix: str = "") -> None:
+        if not prefix:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def cache_key(collection_name: str, doc_id: str) -> str:
+    return f"{collection_name}:{doc_id}"
+
+
+async def cached_find_one(cache: CacheBackend, repository: Repository, doc_id: str) -> Optional[Dict[str, Any]]:
+    key = cache_key(repository.name, doc_id)
+    doc = await cache.get(key)
+    if doc is None:
+        # A write landing while get() runs may already have invalidated the
+        # key; caching what get() read then would pin the old document.
+        version = repository.version
+        doc = await repository.get(doc_id)
+        if doc is not None and repository.version == version:
+            await cache.set(key, doc)
+    return doc
+
+
+async def invalidate(cache: CacheBackend, collection_name: str, ids: Iterable[str]) -> None:
+    await cache.delete_many(cache_key(collection_name, doc_id) for doc_id in ids)
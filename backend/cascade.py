@@ -0,0 +1,210 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+from cache import CacheBackend, NullCache, invalidate
+from repository import Repository, motor_repositories
+from rollups import ROLLUP_PROJECTIONS, Rollups
+
+logger = logging.getLogger(__name__)
+
+CASCADE_BATCH_SIZE = 500
+
+# parent collection -> child collections holding its id, swept in this order
+CASCADES = {
+    "projects": [("estimates", "project_id")],
+    "estimates": [("proposals", "estimate_id")],
+}
+
+
+class MissingParent(ValueError):
+    pass
+
+
+async def require_parents(
+    repositories: Dict[str, Repository], collection_name: str, docs: List[Dict[str, Any]]
+) -> None:
+    """Refuse to write `collection_name` rows whose parent doesn't exist.
+
+    The orphan sweeper would delete them later without a word, so they are
+    turned away here instead. Docs may be sparse changes; only the parent
+    keys they carry are checked.
+    """
+    for parent, children in CASCADES.items():
+        for child, field in children:
+            if child != collection_name:
+                continue
+            ids = {doc[field] for doc in docs if field in doc}
+            if not ids:
+                continue
+            found = await repositories[parent].find({"id": {"$in": list(ids)}}, {"_id": 0, "id": 1})
+            missing = sorted(ids - {doc["id"] for doc in found})
+            if missing:
+                raise MissingParent(f"Unknown {field}: {', '.join(map(str, missing))}")
+
+
+class CascadeDeleter:
+    """Delete documents together with everything that references them.
+
+    Children go first, in batches of `batch_size` ids per delete_many, so a
+    failure part-way never leaves orphans behind a deleted parent. On a
+    replica set or mongos the whole cascade runs in one transaction;
+    standalone servers get the same steps without one, as do in-memory
+    `repositories` (pass db=None with those).
+    """
+
+    def __init__(
+        self,
+        db: Optional[AsyncIOMotorDatabase],
+        cache: Optional[CacheBackend] = None,
+        batch_size: int = CASCADE_BATCH_SIZE,
+        repositories: Optional[Dict[str, Repository]] = None,
+    ):
+        self.db = db
+        self.cache = cache or NullCache()
+        self.batch_size = batch_size
+        self.repositories = repositories or motor_repositories(db)
+        self._transactions: Optional[bool] = None
+
+    async def delete(self, collection_name: str, ids: List[str]) -> Dict[str, int]:
+        """Delete `ids` and their descendants; returns deleted counts per collection."""
+        return await self._run(collection_name, ids, include_roots=True)
+
+    async def delete_children(self, collection_name: str, ids: List[str]) -> Dict[str, int]:
+        """Delete only the descendants of `ids`, e.g. after a bulk delete."""
+        return await self._run(collection_name, ids, include_roots=False)
+
+    async def _run(self, collection_name: str, ids: List[str], include_roots: bool) -> Dict[str, int]:
+        if not ids:
+            return {}
+        deleted: Dict[str, List[str]] = {}
+        counts: Dict[str, int] = {}
+
+        async def cascade(session=None) -> None:
+            # with_transaction may retry, so start each attempt from scratch
+            deleted.clear()
+            counts.clear()
+            await self._delete_tree(collection_name, ids, session, deleted, counts, include_roots)
+
+        if await self._use_transactions():
+            try:
+                async with await self.db.client.start_session() as session:
+                    await session.with_transaction(cascade)
+            except OperationFailure as exc:
+                if exc.code != 20:  # IllegalOperation: not a replica set member
+                    raise
+                self._transactions = False
+                await cascade()
+        else:
+            await cascade()
+        for name, deleted_ids in deleted.items():
+            await invalidate(self.cache, name, deleted_ids)
+        return counts
+
+    async def _delete_tree(
+        self,
+        collection_name: str,
+        ids: List[str],
+        session,
+        deleted: Dict[str, List[str]],
+        counts: Dict[str, int],
+        include_roots: bool,
+    ) -> None:
+        for child, foreign_key in CASCADES.get(collection_name, []):
+            children = await self.repositories[child].find(
+                {foreign_key: {"$in": ids}}, {"_id": 0, "id": 1}, session=session
+            )
+            child_ids = [doc["id"] for doc in children]
+            for start in range(0, len(child_ids), self.batch_size):
+                batch = child_ids[start:start + self.batch_size]
+                await self._delete_tree(child, batch, session, deleted, counts, True)
+        if not include_roots:
+            return
+        count = await self.repositories[collection_name].delete_ids(ids, session=session)
+        deleted.setdefault(collection_name, []).extend(ids)
+        counts[collection_name] = counts.get(collection_name, 0) + count
+
+    async def _use_transactions(self) -> bool:
+        if self._transactions is None and self.db is None:
+            self._transactions = False
+        if self._transactions is None:
+            try:
+                hello = await self.db.client.admin.command("hello")
+                self._transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+            except (ConnectionFailure, OperationFailure, NotImplementedError):
+                self._transactions = False
+        return self._transactions
+
+
+async def _sweep_batch(
+    deleter: CascadeDeleter, rollups: Rollups, parent: str, keys: Set[str], removed: Dict[str, int]
+) -> None:
+    live = await deleter.repositories[parent].find({"id": {"$in": sorted(keys)}}, {"_id": 0, "id": 1})
+    missing = sorted(keys - {doc["id"] for doc in live})
+    if not missing:
+        return
+    orphans = []
+    if parent == "projects":
+        # Orphaned estimates still count in the rollups until deleted here
+        orphans = await deleter.repositories["estimates"].find(
+            {"project_id": {"$in": missing}}, ROLLUP_PROJECTIONS["estimates"]
+        )
+    settled = False
+    try:
+        counts = await deleter.delete_children(parent, missing)
+        settled = True
+    finally:
+        await rollups.remove_orphans(orphans, settled)
+    for name, count in counts.items():
+        removed[name] = removed.get(name, 0) + count
+
+
+async def sweep_orphans(
+    repositories: Dict[str, Repository],
+    cache: Optional[CacheBackend] = None,
+    batch_size: int = CASCADE_BATCH_SIZE,
+    db: Optional[AsyncIOMotorDatabase] = None,
+) -> Dict[str, int]:
+    """Remove children whose parent no longer exists, and their descendants.
+
+    Streams each child collection's foreign keys and checks them against the
+    parent ids `batch_size` distinct keys at a time, so memory stays bounded
+    however many parents are referenced. Deleted estimates are taken back
+    from the rollups. `db` enables cascade transactions.
+    """
+    deleter = CascadeDeleter(db, cache, batch_size, repositories)
+    rollups = Rollups(repositories)
+    removed: Dict[str, int] = {}
+    for parent, children in CASCADES.items():
+        for child, foreign_key in children:
+            keys: Set[str] = set()
+            references = repositories[child].iterate(
+                {foreign_key: {"$ne": None}}, {"_id": 0, foreign_key: 1}, batch_size
+            )
+            async for doc in references:
+                keys.add(doc[foreign_key])
+                if len(keys) >= batch_size:
+                    await _sweep_batch(deleter, rollups, parent, keys, removed)
+                    keys = set()
+            if keys:
+                await _sweep_batch(deleter, rollups, parent, keys, removed)
+    logger.info("Orphan sweep removed %s", removed)
+    return removed
+
+
+async def run_orphan_sweeper(
+    repositories: Dict[str, Repository],
+    cache: Optional[CacheBackend],
+    interval: float,
+    db: Optional[AsyncIOMotorDatabase] = None,
+) -> None:
+    """Background loop for startup; cancel the task to stop it."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sweep_orphans(repositories, cache, db=db)
+        except Exception:
+            logger.exception("Orphan sweep failed")
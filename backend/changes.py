@@ -0,0 +1,345 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import ConnectionFailure, OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# auto uses a change stream when the server supports one and polls otherwise
+CHANGE_FEED_MODES = ("auto", "stream", "poll", "off")
+WATCHED_COLLECTIONS = ["projects", "leads", "materials", "estimates", "proposals"]
+STATE_COLLECTION = "change_feed_state"
+RESUME_SAVE_INTERVAL = 1.0
+# Stream events are published in batches of up to this many, so one query
+# resolves the ids of all their updated documents.
+STREAM_BATCH_SIZE = 100
+# Remembered _id -> id pairs; ids never change, so entries never go stale.
+ID_CACHE_SIZE = 100000
+POLL_BATCH_SIZE = 1000
+# Deletes are detected by counting documents created before now minus this
+# grace, which an insert still in flight (or sent by a replica whose clock
+# is a little behind) can no longer add to; younger documents are tracked
+# by id instead.
+POLL_INSERT_GRACE = timedelta(seconds=30)
+# That count scans the created_at index of every watched collection, so it
+# runs on its own, much longer interval than the poll.
+DELETE_CHECK_INTERVAL = 300.0
+RETRY_DELAY = 5.0
+
+# Server errors meaning the stored resume token can no longer be used
+_STALE_TOKEN_CODES = {260, 280, 286}  # InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost
+
+
+class ChangeEvent:
+    """One write seen on the database.
+
+    `doc_id` is the document's `id` field. It is None when the server could
+    not say which document changed (a delete without a pre-image), and for
+    "invalidate" events, which mean "anything in `collection` may have
+    changed" (or every collection, when `collection` is None).
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        collection: Optional[str],
+        doc_id: Optional[str] = None,
+        fields: Iterable[str] = (),
+    ):
+        self.operation = operation
+        self.collection = collection
+        self.doc_id = doc_id
+        self.fields = set(fields)
+
+    def __repr__(self) -> str:
+        return f"ChangeEvent({self.operation}, {self.collection}, {self.doc_id})"
+
+
+Subscriber = Callable[[ChangeEvent], Awaitable[None]]
+
+
+class ChangeFeed:
+    """In-process pub/sub for change events."""
+
+    def __init__(self):
+        self._subscribers: List[tuple] = []
+
+    def subscribe(self, callback: Subscriber, collections: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """Call `callback` for events on `collections` (all by default); returns an unsubscribe function."""
+        entry = (callback, set(collections) if collections is not None else None)
+        self._subscribers.append(entry)
+        return lambda: self._subscribers.remove(entry)
+
+    async def publish(self, event: ChangeEvent) -> None:
+        for callback, collections in list(self._subscribers):
+            if collections is not None and event.collection is not None and event.collection not in collections:
+                continue
+            try:
+                await callback(event)
+            except Exception:
+                logger.exception("Change subscriber %r failed on %r", callback, event)
+
+
+async def _replicated(db: AsyncIOMotorDatabase) -> bool:
+    # Change streams need a replica set or mongos, like transactions.
+    try:
+        hello = await db.client.admin.command("hello")
+    except (ConnectionFailure, OperationFailure, NotImplementedError):
+        return False
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+def _stream_event(change: Dict[str, Any], doc_id: Optional[str]) -> ChangeEvent:
+    operation = change["operationType"]
+    collection = change.get("ns", {}).get("coll")
+    if operation not in ("insert", "update", "replace", "delete"):
+        # drop, rename, dropDatabase and the stream's own invalidate
+        return ChangeEvent("invalidate", collection)
+    fields = (change.get("updateDescription") or {}).get("updatedFields") or {}
+    return ChangeEvent(operation, collection, doc_id, (field.split(".")[0] for field in fields))
+
+
+class _IdCache:
+    """Most recently seen (collection, _id) -> id pairs."""
+
+    def __init__(self, max_entries: int = ID_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[Hashable, str]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        doc_id = self._ids.get(key)
+        if doc_id is not None:
+            self._ids.move_to_end(key)
+        return doc_id
+
+    def remember(self, key: Hashable, doc_id: str) -> None:
+        self._ids[key] = doc_id
+        self._ids.move_to_end(key)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+
+class _PollPosition:
+    """How far polling has got in one collection.
+
+    Changes are walked in (updated_at, id) order from `updated_at`/`last_id`.
+    Documents created up to `counted_until` are counted (`counted`, at
+    monotonic time `counted_at`); younger ones seen since are kept in `young`
+    (id -> created_at) until the next count takes them in.
+    """
+
+    def __init__(self, updated_at: datetime, last_id: str):
+        self.updated_at = updated_at
+        self.last_id = last_id
+        self.counted_until: Optional[datetime] = None
+        self.counted = 0
+        self.counted_at = 0.0
+        self.young: Dict[str, datetime] = {}
+
+
+class ChangeListener:
+    """Feeds a ChangeFeed from a change stream, or by polling updated_at.
+
+    The stream resumes from the token saved under `consumer` in
+    change_feed_state; if that token has aged out of the oplog, subscribers
+    get an "invalidate" event and the stream starts from now. Standalone
+    servers have no change streams, so there the listener polls each
+    collection for (updated_at, id) past the last one seen instead. Polling
+    cannot see deletes directly: young documents are checked by id on every
+    poll and published as deletes, and a drop in the count of older
+    documents, taken every `delete_check_interval` seconds, is published as
+    an "invalidate" for that collection.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        feed: ChangeFeed,
+        consumer: str = "api",
+        collections: Iterable[str] = WATCHED_COLLECTIONS,
+        mode: str = "auto",
+        poll_interval: float = 2.0,
+        delete_check_interval: float = DELETE_CHECK_INTERVAL,
+    ):
+        self.db = db
+        self.feed = feed
+        self.consumer = consumer
+        self.collections = list(collections)
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.delete_check_interval = delete_check_interval
+        self.state = db[STATE_COLLECTION]
+        self._ids = _IdCache()
+
+    async def run(self) -> None:
+        """Background loop for startup; cancel the task to stop it."""
+        if self.mode == "stream" or (self.mode == "auto" and await _replicated(self.db)):
+            await self._stream_forever()
+        else:
+            logger.info("Change streams unavailable; polling %s every %.1fs", self.collections, self.poll_interval)
+            await self._poll_forever()
+
+    async def _load_state(self) -> Dict[str, Any]:
+        return await self.state.find_one({"_id": self.consumer}) or {}
+
+    async def _save_state(self, fields: Dict[str, Any]) -> None:
+        await self.state.update_one(
+            {"_id": self.consumer}, {"$set": {**fields, "updated_at": datetime.utcnow()}}, upsert=True
+        )
+
+    async def _stream_forever(self) -> None:
+        while True:
+            try:
+                await self._stream()
+            except OperationFailure as exc:
+                if exc.code not in _STALE_TOKEN_CODES:
+                    logger.exception("Change stream failed; retrying in %.0fs", RETRY_DELAY)
+                    await asyncio.sleep(RETRY_DELAY)
+                    continue
+                logger.warning("Stored resume token is no longer valid (%s); starting from now", exc)
+                await self.state.update_one({"_id": self.consumer}, {"$unset": {"resume_token": ""}})
+                await self.feed.publish(ChangeEvent("invalidate", None))
+            except PyMongoError:
+                logger.exception("Change stream failed; retrying in %.0fs", RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY)
+
+    async def _stream(self) -> None:
+        token = (await self._load_state()).get("resume_token")
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": self.collections}}},
+            # Subscribers need ids and changed field names, not whole documents.
+            {"$project": {
+                "operationType": 1, "ns": 1, "documentKey": 1, "fullDocument.id": 1,
+                "fullDocumentBeforeChange.id": 1, "updateDescription.updatedFields": 1,
+            }},
+        ]
+        # No updateLookup: inserts and replaces carry the document anyway, and
+        # the ids of updated ones are resolved per batch (see _publish_changes).
+        options: Dict[str, Any] = {"max_await_time_ms": 1000}
+        if await self._pre_images_supported():
+            options["full_document_before_change"] = "whenAvailable"
+        saved, saved_at = token, time.monotonic()
+        async with self.db.watch(pipeline, resume_after=token, **options) as stream:
+            try:
+                while stream.alive:
+                    changes = []
+                    while len(changes) < STREAM_BATCH_SIZE:
+                        change = await stream.try_next()
+                        if change is None:
+                            break
+                        changes.append(change)
+                    await self._publish_changes(changes)
+                    token = stream.resume_token
+                    if token != saved and time.monotonic() - saved_at >= RESUME_SAVE_INTERVAL:
+                        await self._save_state({"resume_token": token})
+                        saved, saved_at = token, time.monotonic()
+            finally:
+                if token != saved:
+                    await self._save_state({"resume_token": token})
+
+    async def _publish_changes(self, changes: List[Dict[str, Any]]) -> None:
+        """Publish stream events with the `id` of each document, looked up in one query per collection."""
+        unknown: Dict[str, List[Any]] = {}
+        for change in changes:
+            key = (change.get("ns", {}).get("coll"), (change.get("documentKey") or {}).get("_id"))
+            document = change.get("fullDocument") or change.get("fullDocumentBeforeChange") or {}
+            if document.get("id") is not None:
+                self._ids.remember(key, document["id"])
+            elif change["operationType"] == "update" and self._ids.get(key) is None:
+                unknown.setdefault(key[0], []).append(key[1])
+        for collection, keys in unknown.items():
+            async for doc in self.db[collection].find({"_id": {"$in": keys}}, {"_id": 1, "id": 1}):
+                if doc.get("id") is not None:
+                    self._ids.remember((collection, doc["_id"]), doc["id"])
+        for change in changes:
+            key = (change.get("ns", {}).get("coll"), (change.get("documentKey") or {}).get("_id"))
+            # A delete without a pre-image or a remembered id stays anonymous.
+            await self.feed.publish(_stream_event(change, self._ids.get(key)))
+
+    async def _pre_images_supported(self) -> bool:
+        # fullDocumentBeforeChange is a MongoDB 6.0 option; older servers reject it.
+        try:
+            info = await self.db.client.server_info()
+        except PyMongoError:
+            return False
+        return info.get("versionArray", [0])[0] >= 6
+
+    async def _poll_forever(self) -> None:
+        state = await self._load_state()
+        now = datetime.utcnow()
+        since, after = state.get("poll_since") or {}, state.get("poll_after") or {}
+        positions = {name: _PollPosition(since.get(name, now), after.get(name, "")) for name in self.collections}
+        while True:
+            try:
+                before = {name: (position.updated_at, position.last_id) for name, position in positions.items()}
+                for name in self.collections:
+                    await self._poll(name, positions[name])
+                if any((position.updated_at, position.last_id) != before[name] for name, position in positions.items()):
+                    await self._save_state({
+                        "poll_since": {name: position.updated_at for name, position in positions.items()},
+                        "poll_after": {name: position.last_id for name, position in positions.items()},
+                    })
+            except PyMongoError:
+                logger.exception("Change polling failed")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _poll(self, name: str, position: _PollPosition) -> None:
+        collection = self.db[name]
+        cutoff = datetime.utcnow() - POLL_INSERT_GRACE
+        if position.counted_until is None:
+            young = collection.find({"created_at": {"$gt": cutoff}}, {"_id": 0, "id": 1, "created_at": 1})
+            position.young = {doc["id"]: doc["created_at"] async for doc in young}
+            position.counted = await collection.count_documents({"created_at": {"$lte": cutoff}})
+            position.counted_until, position.counted_at = cutoff, time.monotonic()
+        while True:
+            # Keyset on (updated_at, id): any number of writes sharing one
+            # timestamp are walked through in id order, never re-read.
+            docs = await collection.find(
+                {"$or": [
+                    {"updated_at": {"$gt": position.updated_at}},
+                    {"updated_at": position.updated_at, "id": {"$gt": position.last_id}},
+                ]},
+                {"_id": 0, "id": 1, "created_at": 1, "updated_at": 1},
+            ).sort([("updated_at", 1), ("id", 1)]).limit(POLL_BATCH_SIZE).to_list(POLL_BATCH_SIZE)
+            for doc in docs:
+                created = doc.get("created_at")
+                operation = "update"
+                if created is not None and created > position.counted_until and doc["id"] not in position.young:
+                    position.young[doc["id"]] = created
+                    operation = "insert"
+                await self.feed.publish(ChangeEvent(operation, name, doc["id"]))
+            if docs:
+                position.updated_at, position.last_id = docs[-1]["updated_at"], docs[-1]["id"]
+            if len(docs) < POLL_BATCH_SIZE:
+                break
+        await self._detect_young_deletes(name, position)
+        if time.monotonic() - position.counted_at >= self.delete_check_interval:
+            await self._detect_older_deletes(name, position, cutoff)
+
+    async def _detect_young_deletes(self, name: str, position: _PollPosition) -> None:
+        collection = self.db[name]
+        ids = list(position.young)
+        live = set()
+        for start in range(0, len(ids), POLL_BATCH_SIZE):
+            docs = collection.find({"id": {"$in": ids[start:start + POLL_BATCH_SIZE]}}, {"_id": 0, "id": 1})
+            live.update([doc["id"] async for doc in docs])
+        for doc_id in ids:
+            if doc_id not in live:
+                del position.young[doc_id]
+                await self.feed.publish(ChangeEvent("delete", name, doc_id))
+
+    async def _detect_older_deletes(self, name: str, position: _PollPosition, cutoff: datetime) -> None:
+        collection = self.db[name]
+        # Checked before counting, so a delete racing the two errs towards an invalidate.
+        aging = [doc_id for doc_id, created in position.young.items() if created <= cutoff]
+        counted = await collection.count_documents({"created_at": {"$lte": cutoff}})
+        if counted < position.counted + len(aging):
+            await self.feed.publish(ChangeEvent("invalidate", name))
+        for doc_id in aging:
+            del position.young[doc_id]
+        position.counted, position.counted_until, position.counted_at = counted, cutoff, time.monotonic()
@@ -0,0 +1,226 @@
+import re
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from repository import Repository
+
+DEDUP_POLICIES = ("merge", "reject", "off")
+
+# Combined name/address similarity at or above this is a near-duplicate
+NEAR_DUPLICATE_THRESHOLD = 0.88
+# Households and offices share phones, so a phone match also needs names this close
+PHONE_NAME_THRESHOLD = 0.88
+MAX_BLOCK_CANDIDATES = 50
+BACKFILL_BATCH_SIZE = 1000
+
+# Fields a later submission may fill in when the existing lead lacks them
+MERGE_FILL_FIELDS = ["email", "phone", "address", "description", "estimated_budget"]
+
+_ADDRESS_ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "road": "rd", "drive": "dr", "lane": "ln",
+    "boulevard": "blvd", "court": "ct", "place": "pl", "terrace": "ter", "highway": "hwy",
+    "north": "n", "south": "s", "east": "e", "west": "w", "apartment": "apt", "suite": "ste",
+}
+# Lead fields the keys and blocks are derived from
+KEYED_FIELDS = ["id", "email", "phone", "name", "address"]
+
+_GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+class DuplicateLead(Exception):
+    def __init__(self, existing_id: str, reason: str):
+        super().__init__(f"Duplicate of lead {existing_id} ({reason})")
+        self.existing_id = existing_id
+        self.reason = reason
+
+
+def email_key(email: Optional[str]) -> Optional[str]:
+    """Lower-cased address without +tags (and without dots for Gmail)."""
+    if not email or "@" not in email:
+        return None
+    local, _, domain = email.strip().lower().rpartition("@")
+    local = local.split("+", 1)[0]
+    if domain in _GMAIL_DOMAINS:
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}" if local else None
+
+
+def phone_key(phone: Optional[str]) -> Optional[str]:
+    """Digits only, dropping a leading North American country code."""
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    return digits if len(digits) >= 7 else None
+
+
+def _words(text: Optional[str]) -> List[str]:
+    return [word for word in _NON_WORD.split((text or "").lower()) if word]
+
+
+def normalize_name(name: Optional[str]) -> str:
+    return " ".join(_words(name))
+
+
+def normalize_address(address: Optional[str]) -> str:
+    return " ".join(_ADDRESS_ABBREVIATIONS.get(word, word) for word in _words(address))
+
+
+def blocking_keys(doc: Dict[str, Any]) -> List[str]:
+    """Cheap keys that near-duplicates almost always share.
+
+    Only leads sharing a block are compared with difflib, so the similarity
+    pass stays small however large the collection gets.
+    """
+    keys = []
+    address = normalize_address(doc.get("address")).split()
+    number = next((word for word in address if word.isdigit()), None)
+    street = next((word for word in address if not word.isdigit()), None)
+    if number and street:
+        keys.append(f"addr:{number}:{street}")
+    name = normalize_name(doc.get("name")).split()
+    if len(name) >= 2:
+        keys.append(f"name:{name[0][:3]}:{name[-1]}")
+    return keys
+
+
+def with_dedup_keys(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **doc,
+        "email_key": email_key(doc.get("email")),
+        "phone_key": phone_key(doc.get("phone")),
+        "dedup_blocks": blocking_keys(doc),
+    }
+
+
+def dedup_key_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    keyed = with_dedup_keys(doc)
+    return {field: keyed[field] for field in ("email_key", "phone_key", "dedup_blocks")}
+
+
+def touches_dedup_keys(fields) -> bool:
+    return any(field in KEYED_FIELDS for field in fields)
+
+
+def name_similarity(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    return SequenceMatcher(None, normalize_name(a.get("name")), normalize_name(b.get("name"))).ratio()
+
+
+def similarity(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    name = name_similarity(a, b)
+    address = SequenceMatcher(
+        None, normalize_address(a.get("address")), normalize_address(b.get("address"))
+    ).ratio()
+    return (name + address) / 2
+
+
+class CandidateIndex:
+    """Leads to compare against, keyed so each lookup touches only its block.
+
+    Documents added during a batch are matched by later items of the same
+    batch, which is how a bulk import dedups against itself.
+    """
+
+    def __init__(self, docs=()):
+        self.by_email: Dict[str, Dict[str, Any]] = {}
+        self.by_phone: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_block: Dict[str, List[Dict[str, Any]]] = {}
+        for doc in docs:
+            self.add(doc)
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        if doc.get("email_key"):
+            self.by_email.setdefault(doc["email_key"], doc)
+        if doc.get("phone_key"):
+            self.by_phone.setdefault(doc["phone_key"], []).append(doc)
+        for block in doc.get("dedup_blocks") or ():
+            self.by_block.setdefault(block, []).append(doc)
+
+    def match(self, doc: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Best duplicate of `doc` and the reason, if any."""
+        if doc["email_key"] in self.by_email:
+            return self.by_email[doc["email_key"]], "email"
+        # A different email has already failed to match, so a shared phone
+        # only counts with the same person's name behind it.
+        for candidate in self.by_phone.get(doc["phone_key"], ())[:MAX_BLOCK_CANDIDATES]:
+            if name_similarity(doc, candidate) >= PHONE_NAME_THRESHOLD:
+                return candidate, "phone and name"
+        candidates = {
+            id(candidate): candidate
+            for block in doc["dedup_blocks"]
+            for candidate in self.by_block.get(block, ())[:MAX_BLOCK_CANDIDATES]
+        }
+        scored = [(similarity(doc, candidate), candidate) for candidate in candidates.values()]
+        if scored:
+            score, best = max(scored, key=lambda item: item[0])
+            if score >= NEAR_DUPLICATE_THRESHOLD:
+                return best, f"similar name and address ({score:.2f})"
+        return None
+
+
+async def find_candidates(repository: Repository, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Existing leads that could duplicate any of `docs`.
+
+    Exact keys and blocks are separate indexed queries so a crowded block
+    cannot push an exact email or phone match out of the capped block results.
+    """
+    projection = {"_id": 0, "search_grams": 0}
+    emails = sorted({doc["email_key"] for doc in docs if doc["email_key"]})
+    phones = sorted({doc["phone_key"] for doc in docs if doc["phone_key"]})
+    blocks = sorted({block for doc in docs for block in doc["dedup_blocks"]})
+    exact_clauses = []
+    if emails:
+        exact_clauses.append({"email_key": {"$in": emails}})
+    if phones:
+        exact_clauses.append({"phone_key": {"$in": phones}})
+    candidates = []
+    if exact_clauses:
+        candidates += await repository.find({"$or": exact_clauses}, projection)
+    if blocks:
+        limit = MAX_BLOCK_CANDIDATES * len(docs)
+        candidates += await repository.find({"dedup_blocks": {"$in": blocks}}, projection, limit)
+    return candidates
+
+
+def merge_changes(existing: Dict[str, Any], incoming: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields to $set on `existing` so it absorbs a duplicate submission."""
+    changes = {
+        field: incoming[field]
+        for field in MERGE_FILL_FIELDS
+        if incoming.get(field) and not existing.get(field)
+    }
+    note = f"Duplicate submission via {incoming.get('source', 'unknown')} on {datetime.utcnow():%Y-%m-%d}"
+    if incoming.get("notes") and incoming["notes"] not in (existing.get("notes") or ""):
+        note = f"{note}: {incoming['notes']}"
+    changes["notes"] = f"{existing['notes']}\n{note}" if existing.get("notes") else note
+    return changes
+
+
+async def refresh_dedup_keys(repository: Repository, ids: List[str]) -> None:
+    """Recompute keys after a partial update changed a keyed field."""
+    if not ids:
+        return
+    docs = await repository.find({"id": {"$in": ids}}, {"_id": 0, **{field: 1 for field in KEYED_FIELDS}})
+    await repository.set_many([(doc["id"], dedup_key_fields(doc)) for doc in docs])
+
+
+async def backfill_dedup_keys(db: AsyncIOMotorDatabase, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Add dedup keys to leads written before deduplication existed."""
+    filled = 0
+    cursor = db.leads.find(
+        {"dedup_blocks": {"$exists": False}},
+        {"_id": 0, **{field: 1 for field in KEYED_FIELDS}},
+    ).batch_size(batch_size)
+    batch: List[UpdateOne] = []
+    async for doc in cursor:
+        batch.append(UpdateOne({"id": doc["id"]}, {"$set": dedup_key_fields(doc)}))
+        if len(batch) >= batch_size:
+            filled += (await db.leads.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        filled += (await db.leads.bulk_write(batch, ordered=False)).modified_count
+    return filled
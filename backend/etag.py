@@ -0,0 +1,66 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, Optional, Tuple
+
+
+def _quoted_digest(*parts: Any) -> str:
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def document_etag(doc_id: str, updated_at: datetime) -> str:
+    return _quoted_digest(doc_id, updated_at.isoformat())
+
+
+def page_etag(body: bytes, next_cursor: Optional[str]) -> str:
+    # The body carries every id and updated_at on the page (and any embedded
+    # parents), so the tag changes exactly when the page does and agrees
+    # across replicas.
+    digest = hashlib.sha1(body)
+    digest.update(b"\x1f" + (next_cursor or "").encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so a W/ prefix is ignored."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+class ListEtags:
+    """Tags of recently served list pages, remembered with collection versions.
+
+    Repositories bump their version on every write, and the change feed bumps
+    it for writes made elsewhere. While the versions a tag was computed under
+    still hold, a revalidation can be answered 304 without querying. The TTL
+    bounds staleness from writers nothing reports (other replicas running
+    with the change feed off).
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Tuple[int, ...], str]]" = OrderedDict()
+
+    def get(self, key: Hashable, versions: Tuple[int, ...]) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, known_versions, etag = entry
+        if known_versions != versions or time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return etag
+
+    def remember(self, key: Hashable, versions: Tuple[int, ...], etag: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, versions, etag)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,119 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Parent fields embedded by an expansion; enough to label a row, nothing bulky
+PROJECT_FIELDS = ["id", "name", "client_id", "status", "project_type"]
+ESTIMATE_FIELDS = ["id", "project_id", "description", "total_cost", "status"]
+
+# $lookup with both localField/foreignField and a sub-pipeline needs 5.0
+LOOKUP_PIPELINE_MIN_VERSION = (5, 0)
+
+
+class InvalidExpand(ValueError):
+    pass
+
+
+class Join(NamedTuple):
+    """One parent embedded into each row: rows[local_field] == parent.id."""
+
+    source: str
+    local_field: str
+    as_field: str
+    fields: List[str]
+    nested: Tuple["Join", ...] = ()
+
+
+def lookup_stages(join: Join) -> List[Dict[str, Any]]:
+    # localField/foreignField with a sub-pipeline joins through the unique
+    # `id` index and only ships the listed parent fields.
+    nested = [stage for child in join.nested for stage in lookup_stages(child)]
+    return [
+        {
+            "$lookup": {
+                "from": join.source,
+                "localField": join.local_field,
+                "foreignField": "id",
+                "pipeline": [{"$project": {"_id": 0, **{field: 1 for field in join.fields}}}, *nested],
+                "as": join.as_field,
+            }
+        },
+        {"$unwind": {"path": f"${join.as_field}", "preserveNullAndEmptyArrays": True}},
+    ]
+
+
+async def join_parents(repositories: Dict[str, Any], docs: List[Dict[str, Any]], join: Join) -> None:
+    """The same join done in process: one find by id for the page's parents.
+
+    Used where $lookup can't run it (the memory backend, MongoDB before 5.0).
+    Rows whose parent is missing are left without the field, as $unwind with
+    preserveNullAndEmptyArrays leaves them.
+    """
+    ids = list({doc[join.local_field] for doc in docs if doc.get(join.local_field) is not None})
+    if not ids:
+        return
+    parents = await repositories[join.source].find(
+        {"id": {"$in": ids}}, {"_id": 0, **{field: 1 for field in join.fields}}
+    )
+    for child in join.nested:
+        await join_parents(repositories, parents, child)
+    by_id = {parent["id"]: parent for parent in parents}
+    for doc in docs:
+        parent = by_id.get(doc.get(join.local_field))
+        if parent is not None:
+            doc[join.as_field] = parent
+
+
+_lookup_pipelines: Dict[int, bool] = {}
+
+
+async def supports_lookup_pipeline(database) -> bool:
+    """Whether the server runs lookup_stages(); asked once per client."""
+    key = id(database.client)
+    if key not in _lookup_pipelines:
+        info = await database.client.server_info()
+        version = tuple(info.get("versionArray", ())[:2])
+        _lookup_pipelines[key] = version >= LOOKUP_PIPELINE_MIN_VERSION
+    return _lookup_pipelines[key]
+
+
+def _project_join(local_field: str = "project_id") -> Join:
+    return Join("projects", local_field, "project", PROJECT_FIELDS)
+
+
+def _estimate_join(with_project: bool) -> Join:
+    return Join(
+        "estimates", "estimate_id", "estimate", ESTIMATE_FIELDS,
+        nested=(_project_join(),) if with_project else (),
+    )
+
+
+# resource -> expand value -> join
+EXPANSIONS = {
+    "estimates": {
+        "project": _project_join(),
+    },
+    "proposals": {
+        "estimate": _estimate_join(False),
+        "estimate.project": _estimate_join(True),
+    },
+}
+
+
+def expansion(resource: str, expand: Optional[str]) -> Optional[Join]:
+    """Look up the join for an ?expand= value, or None if unset."""
+    if not expand:
+        return None
+    try:
+        return EXPANSIONS[resource][expand]
+    except KeyError:
+        allowed = ", ".join(EXPANSIONS.get(resource, {})) or "none"
+        raise InvalidExpand(f"Cannot expand '{expand}' on {resource}; allowed: {allowed}")
+
+
+def _sources(join: Join) -> List[str]:
+    return [join.source, *(source for child in join.nested for source in _sources(child))]
+
+
+def joined_collections(resource: str, expand: Optional[str]) -> List[str]:
+    # Unknown values are rejected by expansion() when the page is loaded.
+    found = EXPANSIONS.get(resource, {}).get(expand or "")
+    return _sources(found) if found else []
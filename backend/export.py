@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Type
+
+from pydantic import BaseModel
+
+from repository import DOCUMENT_PROJECTION, Repository
+
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_default)
+    return value
+
+
+async def export_rows(
+    repository: Repository,
+    model: Type[BaseModel],
+    query: Dict[str, Any],
+    fmt: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """Stream a collection as NDJSON or CSV in page order, one chunk per batch."""
+    columns: List[str] = list(model.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+
+    rows = 0
+    async for doc in repository.iterate(query, DOCUMENT_PROJECTION, batch_size):
+        if writer:
+            writer.writerow([_csv_value(doc.get(column)) for column in columns])
+        else:
+            buffer.write(json.dumps({column: doc.get(column) for column in columns}, default=_json_default))
+            buffer.write("\n")
+        rows += 1
+        if rows % batch_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
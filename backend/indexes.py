@@ -0,0 +1,128 @@
+import logging
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Every list endpoint pages on (created_at, id), so each filter index ends
+# with those two keys to serve the filter and the sort from one index.
+PAGE_KEYS = [("created_at", ASCENDING), ("id", ASCENDING)]
+# Change polling walks (updated_at, id) the same way (see changes.py).
+UPDATED_KEYS = [("updated_at", ASCENDING), ("id", ASCENDING)]
+
+# /api/search ranks with the text index and falls back to the trigram
+# index for typos and prefixes (see search.py).
+GRAMS_INDEX = IndexModel([("search_grams", ASCENDING)], name="search_grams")
+
+
+def _filter_index(*fields: str) -> List[tuple]:
+    return [(field, ASCENDING) for field in fields] + PAGE_KEYS
+
+
+def _text_index(weights: Dict[str, int]) -> IndexModel:
+    return IndexModel([(field, TEXT) for field in weights], name="search_text", weights=weights)
+
+
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "projects": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(PAGE_KEYS, name="created_at_id"),
+        IndexModel(UPDATED_KEYS, name="updated_at_id"),
+        IndexModel(_filter_index("status"), name="status_created_at_id"),
+        IndexModel(_filter_index("client_id"), name="client_id_created_at_id"),
+        IndexModel(_filter_index("project_type"), name="project_type_created_at_id"),
+        _text_index({"name": 10, "address": 3, "description": 1}),
+        GRAMS_INDEX,
+    ],
+    "leads": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(PAGE_KEYS, name="created_at_id"),
+        IndexModel(UPDATED_KEYS, name="updated_at_id"),
+        IndexModel(_filter_index("status"), name="status_created_at_id"),
+        IndexModel(_filter_index("source"), name="source_created_at_id"),
+        _text_index({"name": 10, "email": 5, "phone": 5, "address": 3, "description": 1}),
+        GRAMS_INDEX,
+        # Lookup (not unique) indexes: older data may already hold duplicates
+        IndexModel([("email_key", ASCENDING)], name="email_key"),
+        IndexModel([("phone_key", ASCENDING)], name="phone_key"),
+        IndexModel([("dedup_blocks", ASCENDING)], name="dedup_blocks"),
+    ],
+    "materials": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(PAGE_KEYS, name="created_at_id"),
+        IndexModel(UPDATED_KEYS, name="updated_at_id"),
+        IndexModel(_filter_index("category"), name="category_created_at_id"),
+        IndexModel(_filter_index("supplier"), name="supplier_created_at_id"),
+        IndexModel([("supplier", ASCENDING), ("name", ASCENDING)], name="supplier_name"),
+        _text_index({"name": 10, "category": 5, "supplier": 5, "description": 1}),
+        GRAMS_INDEX,
+    ],
+    "estimates": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(PAGE_KEYS, name="created_at_id"),
+        IndexModel(UPDATED_KEYS, name="updated_at_id"),
+        IndexModel(_filter_index("status"), name="status_created_at_id"),
+        IndexModel(_filter_index("project_id"), name="project_id_created_at_id"),
+        IndexModel(_filter_index("lead_id"), name="lead_id_created_at_id"),
+        IndexModel([("material_ids", ASCENDING), ("status", ASCENDING)], name="material_ids_status"),
+    ],
+    "proposals": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(PAGE_KEYS, name="created_at_id"),
+        IndexModel(UPDATED_KEYS, name="updated_at_id"),
+        IndexModel(_filter_index("status"), name="status_created_at_id"),
+        IndexModel(_filter_index("estimate_id"), name="estimate_id_created_at_id"),
+    ],
+    # Reports read one period's buckets in order (see rollups.py)
+    "rollups": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("period", ASCENDING), ("bucket", ASCENDING)], name="period_bucket"),
+    ],
+}
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    """Create every declared index. Safe to run on each startup."""
+    for collection_name, indexes in INDEX_SPECS.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except OperationFailure as exc:
+            # Typically a unique index over existing duplicate ids; keep
+            # serving and let the report surface it.
+            logger.error("Could not create indexes on %s: %s", collection_name, exc)
+
+
+async def index_report(db: AsyncIOMotorDatabase) -> Dict[str, Dict[str, Any]]:
+    """Compare declared indexes with what exists and how often each is used."""
+    report = {}
+    for collection_name, indexes in INDEX_SPECS.items():
+        collection = db[collection_name]
+        declared = {index.document["name"] for index in indexes}
+        existing = await collection.index_information()
+        usage = {}
+        try:
+            async for stat in collection.aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = stat["accesses"]["ops"]
+        except OperationFailure:
+            pass
+        report[collection_name] = {
+            "missing": sorted(declared - set(existing)),
+            "undeclared": sorted(set(existing) - declared - {"_id_"}),
+            "unused": sorted(
+                name for name, ops in usage.items() if ops == 0 and name != "_id_"
+            ),
+            "usage": usage,
+        }
+    return report
+
+
+async def log_index_report(db: AsyncIOMotorDatabase) -> None:
+    report = await index_report(db)
+    for collection_name, entry in report.items():
+        if entry["missing"]:
+            logger.warning("Missing indexes on %s: %s", collection_name, ", ".join(entry["missing"]))
+        if entry["undeclared"]:
+            logger.info("Undeclared indexes on %s: %s", collection_name, ", ".join(entry["undeclared"]))
@@ -0,0 +1,98 @@
+import csv
+import io
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, Tuple
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from models import ImportRowError, MaterialCreate, MaterialImportProgress
+from repository import Repository, Upserts
+from search import with_search_grams
+
+IMPORT_BATCH_SIZE = 1000
+# Cap the error list so a completely malformed file cannot blow up the report.
+MAX_REPORTED_ERRORS = 100
+
+
+def _clean_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    # Blank cells mean "not provided" so optional fields fall back to None.
+    return {
+        key.strip(): value.strip()
+        for key, value in row.items()
+        if key and isinstance(value, str) and value.strip()
+    }
+
+
+def _upserts(pending: Dict[Tuple[str, str], MaterialCreate], now: datetime) -> Upserts:
+    return [
+        (
+            {"supplier": supplier, "name": name},
+            {**with_search_grams("materials", material.model_dump()), "updated_at": now},
+            {"id": str(uuid.uuid4()), "created_at": now},
+        )
+        for (supplier, name), material in pending.items()
+    ]
+
+
+def _read_batch(
+    reader: Iterator[Dict[str, Any]],
+    batch_size: int,
+    pending: Dict[Tuple[str, str], MaterialCreate],
+    progress: MaterialImportProgress,
+) -> bool:
+    """Parse rows into `pending` until it holds a batch; False once the file is exhausted."""
+    for row in reader:
+        progress.rows += 1
+        try:
+            material = MaterialCreate(**_clean_row(row))
+        except ValidationError as exc:
+            progress.failed += 1
+            if len(progress.errors) < MAX_REPORTED_ERRORS:
+                message = "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+                )
+                # Line 1 is the header
+                progress.errors.append(ImportRowError(row=progress.rows + 1, error=message))
+            continue
+        pending[(material.supplier, material.name)] = material
+        if len(pending) >= batch_size:
+            return True
+    return False
+
+
+async def _flush(
+    repository: Repository,
+    pending: Dict[Tuple[str, str], MaterialCreate],
+    progress: MaterialImportProgress,
+) -> None:
+    inserted, updated = await repository.upsert_many(_upserts(pending, datetime.utcnow()))
+    progress.inserted += inserted
+    progress.updated += updated
+    pending.clear()
+
+
+async def import_materials(
+    repository: Repository,
+    stream: BinaryIO,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> AsyncIterator[MaterialImportProgress]:
+    """Upsert a supplier price list keyed on (supplier, name).
+
+    Rows are read lazily and written in batches, yielding progress after each
+    batch and a final report with `done` set. Reading and validating a batch
+    blocks, so it runs in the threadpool while the event loop serves others.
+    """
+    progress = MaterialImportProgress()
+    # Later rows for the same material win within a batch, which also keeps
+    # the unordered upserts from racing each other on one key.
+    pending: Dict[Tuple[str, str], MaterialCreate] = {}
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    while await run_in_threadpool(_read_batch, reader, batch_size, pending, progress):
+        await _flush(repository, pending, progress)
+        yield progress
+    if pending:
+        await _flush(repository, pending, progress)
+    progress.done = True
+    yield progress
@@ -0,0 +1,334 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.errors import OperationFailure
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+INF_BUCKET = 'le="+Inf"'
+MAX_RECORDED_SHAPES = 50
+# Read commands whose reply carries documents back in a cursor batch
+CURSOR_COMMANDS = {"find", "aggregate", "getMore"}
+PROFILE_COLLECTION = "system.profile"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Sequence[str] = (), amount: float = 1.0) -> None:
+        key = tuple(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + float(amount)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value!r}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Sequence[str], value: float) -> None:
+        key = tuple(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = _labels(self.labelnames, key, f'le="{bound:g}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, INF_BUCKET)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {float(total)!r}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Any] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route.", ["method", "route"],
+))
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "Requests by route and status code.", ["method", "route", "status"],
+))
+REQUEST_DB_COMMANDS = registry.register(Histogram(
+    "http_request_db_commands", "MongoDB round trips per request.", ["method", "route"], COUNT_BUCKETS,
+))
+REQUEST_DB_SECONDS = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent waiting on MongoDB per request.", ["method", "route"],
+))
+REQUEST_DOCUMENTS = registry.register(Counter(
+    "http_request_documents_returned_total", "Documents MongoDB returned to each route.", ["method", "route"],
+))
+REQUEST_SERIALIZATION = registry.register(Histogram(
+    "http_request_serialization_seconds", "Time spent encoding list bodies.", ["method", "route"],
+))
+DB_COMMAND_DURATION = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency.", ["command", "collection"],
+))
+DB_COMMAND_FAILURES = registry.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands.", ["command", "collection"],
+))
+DB_DOCUMENTS_EXAMINED = registry.register(Counter(
+    "mongodb_documents_examined_total", "Documents MongoDB scanned for profiled operations.", ["op", "collection"],
+))
+DB_KEYS_EXAMINED = registry.register(Counter(
+    "mongodb_keys_examined_total", "Index keys MongoDB scanned for profiled operations.", ["op", "collection"],
+))
+
+
+class RequestStats:
+    """What one request spent on MongoDB, filled in by the command listener."""
+
+    def __init__(self, record_shapes: bool):
+        self.db_commands = 0
+        self.db_seconds = 0.0
+        self.documents = 0
+        self.serialization_seconds = 0.0
+        self.shapes: Optional[List[str]] = [] if record_shapes else None
+        self._lock = threading.Lock()
+
+    def add_command(self, seconds: float, documents: int, shape: Optional[str]) -> None:
+        # Listener callbacks run on Motor's executor threads.
+        with self._lock:
+            self.db_commands += 1
+            self.db_seconds += seconds
+            self.documents += documents
+            if self.shapes is not None and shape and len(self.shapes) < MAX_RECORDED_SHAPES:
+                self.shapes.append(shape)
+
+
+# Motor copies the caller's context into its executor, so the listener sees
+# the stats object of the request that issued the command.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+@contextmanager
+def timed_serialization() -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_request.get()
+        if stats is not None:
+            stats.serialization_seconds += time.perf_counter() - started
+
+
+def query_shape(value: Any, depth: int = 0) -> Any:
+    """Replace literal values with '?' so shapes group like queries together."""
+    if depth > 6:
+        return "..."
+    if isinstance(value, dict):
+        return {key: query_shape(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item, depth + 1) for item in value[:5]]
+        return ["?"] if value else []
+    return "?"
+
+
+def _command_shape(event: monitoring.CommandStartedEvent) -> str:
+    command = event.command
+    name = event.command_name
+    collection = command.get(name) if isinstance(command.get(name), str) else ""
+    if name == "find":
+        detail = {"filter": command.get("filter", {}), "sort": command.get("sort")}
+    elif name == "aggregate":
+        detail = {"pipeline": command.get("pipeline", [])}
+    elif name in ("update", "findAndModify"):
+        updates = command.get("updates") or [command]
+        detail = {"q": updates[0].get("q", updates[0].get("query", {}))}
+    elif name == "delete":
+        detail = {"q": (command.get("deletes") or [{}])[0].get("q", {})}
+    elif name == "count":
+        detail = {"query": command.get("query", {})}
+    else:
+        detail = {}
+    return f"{name} {collection} {query_shape(detail)}"
+
+
+def _returned(event: monitoring.CommandSucceededEvent) -> int:
+    reply = event.reply
+    if event.command_name in CURSOR_COMMANDS:
+        cursor = reply.get("cursor", {})
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if event.command_name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    return 0
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command and charges it to the current request."""
+
+    def __init__(self):
+        self._started: Dict[Tuple[Any, int], Tuple[str, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        name = event.command_name
+        collection = event.command.get(name)
+        collection = collection if isinstance(collection, str) else ""
+        stats = current_request.get()
+        shape = _command_shape(event) if stats is not None and stats.shapes is not None else None
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (collection, shape)
+
+    def _finish(self, event) -> Tuple[str, Optional[str]]:
+        with self._lock:
+            return self._started.pop((event.connection_id, event.request_id), ("", None))
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection, shape = self._finish(event)
+        seconds = event.duration_micros / 1_000_000
+        DB_COMMAND_DURATION.observe((event.command_name, collection), seconds)
+        stats = current_request.get()
+        if stats is not None:
+            stats.add_command(seconds, _returned(event), shape)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection, shape = self._finish(event)
+        seconds = event.duration_micros / 1_000_000
+        DB_COMMAND_FAILURES.inc((event.command_name, collection))
+        stats = current_request.get()
+        if stats is not None:
+            stats.add_command(seconds, 0, shape)
+
+
+class MetricsMiddleware:
+    """Per-route latency, status and database cost for every HTTP request.
+
+    Routes are labelled by their path template (scope["route"]), so ids in
+    URLs do not multiply the series. With `slow_request_ms` set, slower
+    requests are logged along with the shapes of the queries they ran.
+    """
+
+    def __init__(self, app: ASGIApp, slow_request_ms: Optional[float] = None):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(record_shapes=self.slow_request_ms is not None)
+        token = current_request.set(stats)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            self._record(scope, status, elapsed, stats)
+
+    def _record(self, scope: Scope, status: int, elapsed: float, stats: RequestStats) -> None:
+        route = scope.get("route")
+        labels = (scope["method"], getattr(route, "path", "unmatched"))
+        REQUEST_DURATION.observe(labels, elapsed)
+        REQUESTS.inc((*labels, str(status)))
+        REQUEST_DB_COMMANDS.observe(labels, stats.db_commands)
+        REQUEST_DB_SECONDS.observe(labels, stats.db_seconds)
+        REQUEST_DOCUMENTS.inc(labels, stats.documents)
+        if stats.serialization_seconds:
+            REQUEST_SERIALIZATION.observe(labels, stats.serialization_seconds)
+        if self.slow_request_ms is not None and elapsed * 1000 >= self.slow_request_ms:
+            logger.warning(
+                "Slow request %s %s: %.1f ms, status %d, %d db commands (%.1f ms), "
+                "%d documents, serialization %.1f ms; queries: %s",
+                labels[0], scope.get("path"), elapsed * 1000, status, stats.db_commands,
+                stats.db_seconds * 1000, stats.documents, stats.serialization_seconds * 1000,
+                "; ".join(stats.shapes or []),
+            )
+
+
+async def watch_profiler(db: AsyncIOMotorDatabase, slow_ms: int, interval: float) -> None:
+    """Count documents and index keys scanned, as the database profiler reports them.
+
+    Command replies carry no scan counts, so this turns on profiling level 1
+    for operations slower than `slow_ms` (0 profiles everything, at a cost)
+    and folds new system.profile entries into the counters every `interval`
+    seconds. Counts are per operation and collection, not per route; run as
+    a background task and cancel it to stop.
+    """
+    try:
+        await db.command({"profile": 1, "slowms": slow_ms})
+    except OperationFailure:
+        logger.warning("Could not enable the database profiler; scan counts are not reported", exc_info=True)
+        return
+    since = None
+    while True:
+        try:
+            query = {"ns": {"$ne": f"{db.name}.{PROFILE_COLLECTION}"}}
+            if since is not None:
+                query["ts"] = {"$gt": since}
+            projection = {"_id": 0, "ts": 1, "op": 1, "ns": 1, "docsExamined": 1, "keysExamined": 1}
+            async for entry in db[PROFILE_COLLECTION].find(query, projection).sort("ts", 1):
+                since = entry["ts"]
+                labels = (entry.get("op", ""), entry.get("ns", "").partition(".")[2])
+                DB_DOCUMENTS_EXAMINED.inc(labels, entry.get("docsExamined", 0))
+                DB_KEYS_EXAMINED.inc(labels, entry.get("keysExamined", 0))
+        except Exception:
+            logger.exception("Reading the database profiler failed")
+        await asyncio.sleep(interval)
@@ -1,8 +1,11 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Generic, TypeVar
 from datetime import datetime
 import uuid
 
+CreateT = TypeVar("CreateT")
+UpdateT = TypeVar("UpdateT")
+
 class Project(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -28,6 +31,18 @@ class ProjectCreate(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
 
+class ProjectUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    address: Optional[str] = None
+    client_id: Optional[str] = None
+    status: Optional[str] = None
+    project_type: Optional[str] = None
+    estimated_cost: Optional[float] = None
+    actual_cost: Optional[float] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
 class Lead(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -54,6 +69,18 @@ class LeadCreate(BaseModel):
     estimated_budget: float = 0.0
     notes: Optional[str] = None
 
+class LeadUpdate(BaseModel):
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    project_type: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    source: Optional[str] = None
+    estimated_budget: Optional[float] = None
+    notes: Optional[str] = None
+
 class Material(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -73,6 +100,14 @@ class MaterialCreate(BaseModel):
     supplier: Optional[str] = None
     description: Optional[str] = None
 
+class MaterialUpdate(BaseModel):
+    name: Optional[str] = None
+    category: Optional[str] = None
+    unit: Optional[str] = None
+    cost_per_unit: Optional[float] = None
+    supplier: Optional[str] = None
+    description: Optional[str] = None
+
 class Estimate(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     project_id: str
@@ -84,6 +119,7 @@ class Estimate(BaseModel):
     overhead_cost: float
     profit_margin: float
     line_items: List[Dict[str, Any]] = []
+    material_ids: List[str] = []  # catalog materials priced into line_items
     status: str = "draft"  # draft, sent, approved, rejected
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -98,6 +134,17 @@ class EstimateCreate(BaseModel):
     profit_margin: float
     line_items: List[Dict[str, Any]] = []
 
+class EstimateUpdate(BaseModel):
+    project_id: Optional[str] = None
+    lead_id: Optional[str] = None
+    description: Optional[str] = None
+    materials_cost: Optional[float] = None
+    labor_cost: Optional[float] = None
+    overhead_cost: Optional[float] = None
+    profit_margin: Optional[float] = None
+    line_items: Optional[List[Dict[str, Any]]] = None
+    status: Optional[str] = None
+
 class Proposal(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     estimate_id: str
@@ -114,4 +161,97 @@ class ProposalCreate(BaseModel):
     title: str
     content: str
     terms: str
-    valid_until: Optional[datetime] = None
\ No newline at end of file
+    valid_until: Optional[datetime] = None
+
+class ProposalUpdate(BaseModel):
+    estimate_id: Optional[str] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+    terms: Optional[str] = None
+    status: Optional[str] = None
+    valid_until: Optional[datetime] = None
+
+class BulkCreateRequest(BaseModel, Generic[CreateT]):
+    items: List[CreateT]
+    ordered: bool = True
+
+class BulkUpdateItem(BaseModel, Generic[UpdateT]):
+    id: str
+    changes: UpdateT
+
+class BulkUpdateRequest(BaseModel, Generic[UpdateT]):
+    items: List[BulkUpdateItem[UpdateT]]
+    ordered: bool = True
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]
+    ordered: bool = True
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: str  # ok, merged, duplicate, not_found, error, skipped
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    ordered: bool
+    succeeded: int = 0
+    failed: int = 0
+    results: List[BulkItemResult] = []
+
+class DashboardStats(BaseModel):
+    total_projects: int = 0
+    active_projects: int = 0
+    total_leads: int = 0
+    new_leads: int = 0
+    total_estimates: int = 0
+    pending_estimates: int = 0
+    by_status: Dict[str, Dict[str, int]] = {}
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class RollupRow(BaseModel):
+    bucket: str  # 2024-05 or 2024-05-17, by created_at
+    project_type: Optional[str] = None  # None when rolled up across types
+    estimates: int = 0
+    estimates_by_status: Dict[str, int] = {}
+    estimate_value_by_status: Dict[str, float] = {}
+    pipeline_value: float = 0.0  # draft and sent estimates
+    won_value: float = 0.0
+    win_rate: Optional[float] = None  # approved / (approved + rejected)
+    projects: int = 0
+    projects_by_status: Dict[str, int] = {}
+    estimated_cost: float = 0.0
+    actual_cost: float = 0.0
+    completed_estimated_cost: float = 0.0
+    completed_actual_cost: float = 0.0
+    cost_variance: float = 0.0  # actual minus estimated, completed projects
+
+class RollupReport(BaseModel):
+    period: str  # day, month
+    rows: List[RollupRow] = []
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class MaterialImportProgress(BaseModel):
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    done: bool = False
+
+class SearchHit(BaseModel):
+    type: str  # projects, leads, materials
+    score: float
+    document: Dict[str, Any]
+
+class SearchResults(BaseModel):
+    query: str
+    mode: str  # text, fuzzy
+    page: int
+    limit: int
+    has_more: bool = False
+    hits: List[SearchHit] = []
@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+# Keyset order shared by every list endpoint. `id` breaks ties between
+# documents created in the same millisecond.
+SORT_ORDER = [("created_at", 1), ("id", 1)]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    payload = {"t": doc["created_at"].isoformat(), "id": doc["id"]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), str(payload["id"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor("Invalid pagination cursor") from exc
+
+
+def build_filter(
+    equals: Dict[str, Any],
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Build a MongoDB filter from equality params, skipping unset ones."""
+    query = {field: value for field, value in equals.items() if value is not None}
+    created_range = {}
+    if created_after is not None:
+        created_range["$gte"] = created_after
+    if created_before is not None:
+        created_range["$lt"] = created_before
+    if created_range:
+        query["created_at"] = created_range
+    return query
+
+
+def _after_clause(after: str) -> Dict[str, Any]:
+    created_at, doc_id = decode_cursor(after)
+    return {
+        "$or": [
+            {"created_at": {"$gt": created_at}},
+            {"created_at": created_at, "id": {"$gt": doc_id}},
+        ]
+    }
+
+
+async def fetch_page(
+    collection: AsyncIOMotorCollection,
+    query: Dict[str, Any],
+    limit: int = DEFAULT_PAGE_LIMIT,
+    after: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one keyset page, returning the documents and the next cursor."""
+    limit, query = _page_bounds(limit, query, after)
+    # One extra row tells us whether another page exists without a count().
+    docs = await collection.find(query, projection).sort(SORT_ORDER).limit(limit + 1).to_list(limit + 1)
+    return split_page(docs, limit)
+
+
+async def aggregate_page(
+    collection: AsyncIOMotorCollection,
+    query: Dict[str, Any],
+    limit: int = DEFAULT_PAGE_LIMIT,
+    after: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    stages: Sequence[Dict[str, Any]] = (),
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Like fetch_page, but runs extra stages (e.g. $lookup) on the page's rows only."""
+    limit, query = _page_bounds(limit, query, after)
+    pipeline = [
+        {"$match": query},
+        {"$sort": dict(SORT_ORDER)},
+        {"$limit": limit + 1},
+        *stages,
+    ]
+    if projection:
+        pipeline.append({"$project": projection})
+    docs = await collection.aggregate(pipeline).to_list(limit + 1)
+    return split_page(docs, limit)
+
+
+def _page_bounds(limit: int, query: Dict[str, Any], after: Optional[str]) -> Tuple[int, Dict[str, Any]]:
+    limit = max(1, min(limit, MAX_PAGE_LIMIT))
+    if after:
+        query = {"$and": [query, _after_clause(after)]} if query else _after_clause(after)
+    return limit, query
+
+
+def split_page(docs: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1])
+    return docs, next_cursor
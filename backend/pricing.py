@@ -0,0 +1,124 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from repository import Repository
+
+# Line items are free-form dicts; the engine understands these keys:
+#   material_id   catalog material whose cost_per_unit prices the line
+#   quantity      defaults to 1
+#   unit_cost     required when there is no material_id, or when
+#                 price_source is "manual" to pin a price over the catalog
+#   labor_cost    optional per-line labor; when any line carries it the
+#                 estimate's labor_cost becomes the sum over lines
+# and writes back unit_cost, extended_cost and price_source on every line.
+# material_ids on the estimate lists the catalog materials it depends on; it
+# is the reverse index used to re-price drafts when a material cost changes.
+
+
+class PricingError(ValueError):
+    pass
+
+
+def is_catalog_priced(item: Dict[str, Any]) -> bool:
+    return bool(item.get("material_id")) and item.get("price_source") != "manual"
+
+
+def _to_float(value: Any, what: str) -> float:
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise PricingError(f"Invalid {what}: {value!r}")
+
+
+async def load_unit_costs(materials: Repository, estimates: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Fetch cost_per_unit for every catalog material the estimates reference."""
+    material_ids = {
+        item["material_id"]
+        for estimate in estimates
+        for item in estimate.get("line_items") or []
+        if is_catalog_priced(item)
+    }
+    if not material_ids:
+        return {}
+    docs = await materials.find({"id": {"$in": list(material_ids)}}, {"_id": 0, "id": 1, "cost_per_unit": 1})
+    return {doc["id"]: doc["cost_per_unit"] for doc in docs}
+
+
+def estimate_total(estimate: Dict[str, Any]) -> float:
+    return (
+        estimate["materials_cost"]
+        + estimate["labor_cost"]
+        + estimate["overhead_cost"]
+        + estimate["profit_margin"]
+    )
+
+
+def price_line_items(estimates: List[Dict[str, Any]], unit_costs: Dict[str, float]) -> None:
+    """Price the line items of every estimate in one vectorized pass, in place.
+
+    Estimates with line items get materials_cost (and labor_cost, when lines
+    carry labor) rolled up from them; the rest keep their supplied amounts.
+    """
+    counts = np.array([len(estimate.get("line_items") or []) for estimate in estimates], dtype=np.int64)
+    items = [item for estimate in estimates for item in estimate.get("line_items") or []]
+    if not items:
+        for estimate in estimates:
+            estimate["material_ids"] = []
+        return
+    owners = np.repeat(np.arange(len(estimates)), counts)
+
+    quantity = np.array([_to_float(item.get("quantity", 1), "quantity") for item in items])
+    manual_cost = np.array([_to_float(item.get("unit_cost"), "unit_cost") for item in items])
+    line_labor = np.array([_to_float(item.get("labor_cost"), "labor_cost") for item in items])
+    catalog = np.array([is_catalog_priced(item) for item in items], dtype=bool)
+
+    # Hash-join line items to the catalog; a trailing NaN catches misses.
+    catalog_index = pd.Index(list(unit_costs))
+    catalog_cost = np.append(np.fromiter(unit_costs.values(), dtype=float, count=len(unit_costs)), np.nan)
+    positions = catalog_index.get_indexer([item.get("material_id") for item in items])
+    unit_cost = np.where(catalog, catalog_cost[positions], manual_cost)
+    quantity = np.nan_to_num(quantity, nan=1.0)
+
+    unresolved = np.flatnonzero(np.isnan(unit_cost))
+    if unresolved.size:
+        first = unresolved[0]
+        estimate_index = int(owners[first])
+        line_index = int(first - counts[:estimate_index].sum())
+        reason = (
+            f"unknown material {items[first]['material_id']!r}" if catalog[first] else "missing unit_cost"
+        )
+        raise PricingError(f"Estimate {estimate_index}, line item {line_index}: {reason}")
+
+    extended = np.round(quantity * unit_cost, 2)
+    materials_cost = np.bincount(owners, weights=extended, minlength=len(estimates))
+    has_labor = ~np.isnan(line_labor)
+    labor_cost = np.bincount(owners, weights=np.where(has_labor, line_labor, 0.0), minlength=len(estimates))
+    labor_lines = np.bincount(owners, weights=has_labor, minlength=len(estimates))
+
+    for item, qty, cost, total, from_catalog in zip(
+        items, quantity.tolist(), unit_cost.tolist(), extended.tolist(), catalog.tolist()
+    ):
+        item["quantity"] = qty
+        item["unit_cost"] = cost
+        item["extended_cost"] = total
+        item["price_source"] = "catalog" if from_catalog else "manual"
+
+    for estimate in estimates:
+        estimate["material_ids"] = sorted({
+            item["material_id"] for item in estimate.get("line_items") or [] if item["price_source"] == "catalog"
+        })
+    for index in np.flatnonzero(counts).tolist():
+        estimates[index]["materials_cost"] = round(float(materials_cost[index]), 2)
+        if labor_lines[index]:
+            estimates[index]["labor_cost"] = round(float(labor_cost[index]), 2)
+
+
+def price_estimates(estimates: List[Dict[str, Any]], unit_costs: Dict[str, float]) -> None:
+    """Price line items and set total_cost on complete estimate dicts."""
+    price_line_items(estimates, unit_costs)
+    for estimate in estimates:
+        estimate["total_cost"] = estimate_total(estimate)
@@ -0,0 +1,686 @@
+import copy
+from bisect import bisect_right, insort
+from collections import Counter
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+
+from bulk import Update, bulk_delete, bulk_insert, bulk_update, collect_results
+from indexes import INDEX_SPECS
+from models import BulkResult
+from pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, SORT_ORDER, decode_cursor, fetch_page, split_page
+
+# What a single-document read hands back: no Mongo _id, no search index data
+DOCUMENT_PROJECTION = {"_id": 0, "search_grams": 0}
+
+COLLECTIONS = ("projects", "leads", "materials", "estimates", "proposals", "rollups")
+
+ITERATE_BATCH_SIZE = 1000
+
+# Secondary indexes of the in-memory backend: status plus the foreign,
+# dedup, import and search keys the services look documents up by.
+MEMORY_INDEXES = {
+    "projects": ["status", "client_id", "search_grams"],
+    "leads": ["status", "email_key", "phone_key", "dedup_blocks", "search_grams"],
+    "materials": ["category", "supplier", "name", "search_grams"],
+    "estimates": ["status", "project_id", "lead_id", "material_ids"],
+    "proposals": ["status", "estimate_id"],
+    "rollups": ["period"],
+}
+
+Changes = List[Tuple[str, Dict[str, Any]]]
+# (equality key, fields to set, fields only written when inserting)
+Upserts = List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]
+# (id, amounts to add, fields only written when inserting)
+Increments = List[Tuple[str, Dict[str, float], Dict[str, Any]]]
+Derive = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def build_patch_update(fields: Dict[str, Any], derived: Optional[Dict[str, Any]] = None) -> Update:
+    """Build the update document for a sparse change set.
+
+    `derived` holds aggregation expressions evaluated after the new values are
+    applied (e.g. a recomputed total), which switches to a pipeline update.
+    """
+    fields = {**fields, "updated_at": datetime.utcnow()}
+    if derived:
+        return [
+            {"$set": {field: {"$literal": value} for field, value in fields.items()}},
+            {"$set": derived},
+        ]
+    return {"$set": fields}
+
+
+class Repository:
+    """Async storage for one collection of documents keyed by `id`.
+
+    Queries and projections are the MongoDB subset the services use:
+    equality, $in, $nin, $ne, $gt/$gte/$lt/$lte, $exists, $and and $or on
+    top-level fields; inclusion or exclusion projections. Pages come back in
+    pagination.SORT_ORDER.
+    """
+
+    name: str
+    # Bumped by every write, and by the change feed for writes made elsewhere
+    version: int = 0
+
+    def touch(self) -> None:
+        self.version += 1
+
+    async def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def find(
+        self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None, limit: int = 0, session=None
+    ) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def find_page(
+        self,
+        query: Dict[str, Any],
+        limit: int = DEFAULT_PAGE_LIMIT,
+        after: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        raise NotImplementedError
+
+    def iterate(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = ITERATE_BATCH_SIZE,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every match in page order without holding the result set."""
+        raise NotImplementedError
+
+    async def count_by(self, field: str, query: Optional[Dict[str, Any]] = None) -> Dict[Any, int]:
+        """How many documents matching `query` hold each value of `field`."""
+        raise NotImplementedError
+
+    async def insert_one(self, doc: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = True) -> BulkResult:
+        raise NotImplementedError
+
+    async def set_fields(self, doc_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Overwrite `fields` as given and return the stored document."""
+        raise NotImplementedError
+
+    async def swap_fields(self, doc_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Overwrite `fields` as given and return the document as it was before."""
+        raise NotImplementedError
+
+    async def set_many(self, changes: Changes, where: Optional[Dict[str, Any]] = None) -> int:
+        """Overwrite fields on many documents, unordered, without bumping updated_at.
+
+        Only documents also matching `where` are written; returns how many were.
+        """
+        raise NotImplementedError
+
+    async def upsert_many(self, upserts: Upserts) -> Tuple[int, int]:
+        """Set fields on the document matching each key, inserting it when there is none.
+
+        Unordered; returns (inserted, updated).
+        """
+        raise NotImplementedError
+
+    async def increment_many(self, increments: Increments) -> None:
+        """Add to numeric fields by id, creating missing documents at zero first."""
+        raise NotImplementedError
+
+    async def replace_all(self, docs: List[Dict[str, Any]]) -> None:
+        """Swap the whole collection for `docs`."""
+        raise NotImplementedError
+
+    async def patch(
+        self, doc_id: str, fields: Dict[str, Any], derived: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Apply a sparse change set, skipping the write when nothing differs."""
+        raise NotImplementedError
+
+    async def patch_many(self, changes: Changes, ordered: bool = True, derive: Optional[Derive] = None) -> BulkResult:
+        raise NotImplementedError
+
+    async def delete_one(self, doc_id: str) -> bool:
+        raise NotImplementedError
+
+    async def delete_many(self, ids: List[str], ordered: bool = True) -> BulkResult:
+        raise NotImplementedError
+
+    async def delete_ids(self, ids: List[str], session=None) -> int:
+        """Delete without per-item results; returns how many existed."""
+        raise NotImplementedError
+
+
+class MotorRepository(Repository):
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+        self.name = collection.name
+
+    async def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"id": doc_id}, DOCUMENT_PROJECTION)
+
+    async def find(
+        self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None, limit: int = 0, session=None
+    ) -> List[Dict[str, Any]]:
+        cursor = self.collection.find(query, projection, session=session).limit(limit)
+        return await cursor.to_list(limit or None)
+
+    async def find_page(
+        self,
+        query: Dict[str, Any],
+        limit: int = DEFAULT_PAGE_LIMIT,
+        after: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return await fetch_page(self.collection, query, limit, after, projection)
+
+    async def iterate(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = ITERATE_BATCH_SIZE,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        cursor = self.collection.find(query, projection).sort(SORT_ORDER).batch_size(batch_size)
+        async for doc in cursor:
+            yield doc
+
+    async def count_by(self, field: str, query: Optional[Dict[str, Any]] = None) -> Dict[Any, int]:
+        pipeline = [{"$match": query or {}}, {"$group": {"_id": f"${field}", "count": {"$sum": 1}}}]
+        return {row["_id"]: row["count"] async for row in self.collection.aggregate(pipeline)}
+
+    async def insert_one(self, doc: Dict[str, Any]) -> None:
+        # insert_one adds _id to the dict in place; hand it a copy.
+        await self.collection.insert_one(dict(doc))
+        self.touch()
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = True) -> BulkResult:
+        result = await bulk_insert(self.collection, docs, ordered)
+        self.touch()
+        return result
+
+    async def set_fields(self, doc_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        updated = await self.collection.find_one_and_update(
+            {"id": doc_id},
+            {"$set": fields},
+            projection=DOCUMENT_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        self.touch()
+        return updated
+
+    async def swap_fields(self, doc_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        previous = await self.collection.find_one_and_update(
+            {"id": doc_id},
+            {"$set": fields},
+            projection=DOCUMENT_PROJECTION,
+            return_document=ReturnDocument.BEFORE,
+        )
+        self.touch()
+        return previous
+
+    async def set_many(self, changes: Changes, where: Optional[Dict[str, Any]] = None) -> int:
+        if not changes:
+            return 0
+        result = await self.collection.bulk_write(
+            [UpdateOne({**(where or {}), "id": doc_id}, {"$set": fields}) for doc_id, fields in changes],
+            ordered=False,
+        )
+        self.touch()
+        return result.modified_count
+
+    async def upsert_many(self, upserts: Upserts) -> Tuple[int, int]:
+        if not upserts:
+            return 0, 0
+        result = await self.collection.bulk_write(
+            [
+                UpdateOne(key, {"$set": fields, "$setOnInsert": on_insert}, upsert=True)
+                for key, fields, on_insert in upserts
+            ],
+            ordered=False,
+        )
+        self.touch()
+        return result.upserted_count, result.modified_count
+
+    async def increment_many(self, increments: Increments) -> None:
+        if not increments:
+            return
+        await self.collection.bulk_write(
+            [
+                UpdateOne({"id": doc_id}, {"$inc": amounts, "$setOnInsert": on_insert}, upsert=True)
+                for doc_id, amounts, on_insert in increments
+            ],
+            ordered=False,
+        )
+        self.touch()
+
+    async def replace_all(self, docs: List[Dict[str, Any]]) -> None:
+        # Built in a side collection that is renamed over the live one, so
+        # readers see the old documents or the new ones, never a mix.
+        staging = self.collection.database[f"{self.name}_rebuild"]
+        await staging.drop()
+        if not docs:
+            await self.collection.delete_many({})
+            self.touch()
+            return
+        for start in range(0, len(docs), ITERATE_BATCH_SIZE):
+            await staging.insert_many([dict(doc) for doc in docs[start:start + ITERATE_BATCH_SIZE]], ordered=False)
+        if INDEX_SPECS.get(self.name):
+            await staging.create_indexes(INDEX_SPECS[self.name])
+        await staging.rename(self.name, dropTarget=True)
+        self.touch()
+
+    async def patch(
+        self, doc_id: str, fields: Dict[str, Any], derived: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        if not fields:
+            return await self.get(doc_id)
+        changed = {"id": doc_id, "$or": [{field: {"$ne": value}} for field, value in fields.items()]}
+        updated = await self.collection.find_one_and_update(
+            changed,
+            build_patch_update(fields, derived),
+            projection=DOCUMENT_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        if updated is None:
+            # Either nothing differed or the id does not exist.
+            return await self.get(doc_id)
+        self.touch()
+        return updated
+
+    async def patch_many(self, changes: Changes, ordered: bool = True, derive: Optional[Derive] = None) -> BulkResult:
+        updates = [
+            (doc_id, build_patch_update(fields, derive(fields) if derive else None)) for doc_id, fields in changes
+        ]
+        result = await bulk_update(self.collection, updates, ordered)
+        self.touch()
+        return result
+
+    async def delete_one(self, doc_id: str) -> bool:
+        result = await self.collection.delete_one({"id": doc_id})
+        self.touch()
+        return result.deleted_count > 0
+
+    async def delete_many(self, ids: List[str], ordered: bool = True) -> BulkResult:
+        result = await bulk_delete(self.collection, ids, ordered)
+        self.touch()
+        return result
+
+    async def delete_ids(self, ids: List[str], session=None) -> int:
+        result = await self.collection.delete_many({"id": {"$in": ids}}, session=session)
+        self.touch()
+        return result.deleted_count
+
+
+_MISSING = object()
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    # Like MongoDB, a scalar condition matches any element of an array field.
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+
+def _compare(compare: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def match(value: Any, operand: Any) -> bool:
+        try:
+            return value is not None and compare(value, operand)
+        except TypeError:
+            return False
+    return match
+
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": _equals,
+    "$ne": lambda value, operand: not _equals(value, operand),
+    "$in": lambda value, operand: any(_equals(value, item) for item in operand),
+    "$nin": lambda value, operand: not any(_equals(value, item) for item in operand),
+    "$gt": _compare(lambda value, operand: value > operand),
+    "$gte": _compare(lambda value, operand: value >= operand),
+    "$lt": _compare(lambda value, operand: value < operand),
+    "$lte": _compare(lambda value, operand: value <= operand),
+}
+
+
+def _is_operator_dict(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith("$") for key in condition)
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif _is_operator_dict(condition):
+            value = doc.get(key, _MISSING)
+            for operator, operand in condition.items():
+                if operator == "$exists":
+                    if (value is not _MISSING) != bool(operand):
+                        return False
+                elif operator not in _OPERATORS:
+                    raise ValueError(f"Unsupported query operator {operator}")
+                elif not _OPERATORS[operator](None if value is _MISSING else value, operand):
+                    return False
+        elif not _equals(doc.get(key), condition):
+            return False
+    return True
+
+
+def evaluate(expression: Any, doc: Dict[str, Any]) -> Any:
+    """The aggregation expressions services compute fields with: $add, $substrCP, $literal."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return doc.get(expression[1:])
+    if not _is_operator_dict(expression):
+        return expression
+    [(operator, operand)] = expression.items()
+    if operator == "$literal":
+        return operand
+    if operator == "$add":
+        values = [evaluate(item, doc) for item in operand]
+        return None if any(value is None for value in values) else sum(values)
+    if operator == "$substrCP":
+        text, start, length = (evaluate(item, doc) for item in operand)
+        return (text or "")[start:start + length]
+    raise ValueError(f"Unsupported expression operator {operator}")
+
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(doc)
+    included = {field: spec for field, spec in projection.items() if field != "_id" and spec not in (0, False)}
+    if included:
+        return {
+            field: evaluate(spec, doc) if isinstance(spec, dict) else copy.deepcopy(doc[field])
+            for field, spec in included.items()
+            if isinstance(spec, dict) or field in doc
+        }
+    excluded = {field for field, spec in projection.items() if spec in (0, False)}
+    return {field: copy.deepcopy(value) for field, value in doc.items() if field not in excluded}
+
+
+def _index_values(value: Any) -> List[Any]:
+    values = value if isinstance(value, list) else [value]
+    return [item for item in values if item is not None and not isinstance(item, (dict, list))]
+
+
+class MemoryRepository(Repository):
+    """Process-local backend: documents by id plus secondary indexes.
+
+    Equality and $in conditions on `id` or an indexed field narrow a query
+    to its index entries; pages walk a list kept in keyset order. Nothing is
+    persisted, so this suits tests, benchmarks and single-node deployments
+    that can rebuild their data.
+    """
+
+    def __init__(self, name: str, indexed_fields: Iterable[str] = ()):
+        self.name = name
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in indexed_fields}
+        self._order: List[Tuple[Any, str]] = []
+
+    @classmethod
+    def for_collection(cls, name: str) -> "MemoryRepository":
+        return cls(name, MEMORY_INDEXES.get(name, ()))
+
+    def _key(self, doc: Dict[str, Any]) -> Tuple[Any, str]:
+        return doc.get("created_at") or datetime.min, doc["id"]
+
+    def _add(self, doc: Dict[str, Any]) -> None:
+        self.touch()
+        self._docs[doc["id"]] = doc
+        for field, index in self._indexes.items():
+            for value in _index_values(doc.get(field)):
+                index.setdefault(value, set()).add(doc["id"])
+        insort(self._order, self._key(doc))
+
+    def _remove(self, doc_id: str) -> Dict[str, Any]:
+        self.touch()
+        doc = self._docs.pop(doc_id)
+        for field, index in self._indexes.items():
+            for value in _index_values(doc.get(field)):
+                bucket = index.get(value)
+                if bucket is not None:
+                    bucket.discard(doc_id)
+                    if not bucket:
+                        del index[value]
+        del self._order[bisect_right(self._order, self._key(doc)) - 1]
+        return doc
+
+    def _replace(self, doc_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        # Re-adding keeps the indexes and the keyset order in step with the change.
+        doc = self._remove(doc_id)
+        doc.update(copy.deepcopy(fields))
+        self._add(doc)
+        return doc
+
+    def _lookup(self, field: str, condition: Any) -> Optional[Set[str]]:
+        if field != "id" and field not in self._indexes:
+            return None
+        if _is_operator_dict(condition):
+            if set(condition) != {"$in"}:
+                return None
+            values = condition["$in"]
+        elif isinstance(condition, (dict, list)):
+            return None
+        else:
+            values = [condition]
+        if any(value is None for value in values):
+            return None  # null also matches a missing field, which is not indexed
+        if field == "id":
+            return {value for value in values if value in self._docs}
+        index = self._indexes[field]
+        if len(values) == 1:
+            # The live index entry, not a copy; callers only read it.
+            return index.get(values[0], set())
+        return set().union(*(index.get(value, ()) for value in values))
+
+    def _candidates(self, query: Dict[str, Any]) -> Optional[Set[str]]:
+        """Ids that can match `query` according to the indexes, or None for a full scan.
+
+        The result may be a live index entry, so it must not be modified.
+        """
+        narrowed: List[Set[str]] = []
+        for key, condition in query.items():
+            if key == "$and":
+                narrowed.extend(ids for ids in (self._candidates(clause) for clause in condition) if ids is not None)
+                continue
+            if key == "$or":
+                branches = [self._candidates(clause) for clause in condition]
+                ids = None if any(branch is None for branch in branches) else set().union(*branches)
+            else:
+                ids = self._lookup(key, condition)
+            if ids is not None:
+                narrowed.append(ids)
+        if not narrowed:
+            return None
+        # Intersecting from the smallest set costs no more than that set's size.
+        narrowed.sort(key=len)
+        found = narrowed[0]
+        for ids in narrowed[1:]:
+            if not found:
+                break
+            found = found & ids
+        return found
+
+    def _scan(self, query: Dict[str, Any], start: Optional[Tuple[Any, str]] = None) -> Iterable[Dict[str, Any]]:
+        candidates = self._candidates(query)
+        if candidates is None:
+            keys = self._order[bisect_right(self._order, start):] if start else self._order
+        else:
+            keys = sorted(self._key(self._docs[doc_id]) for doc_id in candidates)
+            if start:
+                keys = keys[bisect_right(keys, start):]
+        for _, doc_id in keys:
+            doc = self._docs[doc_id]
+            if matches(doc, query):
+                yield doc
+
+    async def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        doc = self._docs.get(doc_id)
+        return project(doc, DOCUMENT_PROJECTION) if doc else None
+
+    async def find(
+        self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None, limit: int = 0, session=None
+    ) -> List[Dict[str, Any]]:
+        docs = []
+        for doc in self._scan(query):
+            docs.append(project(doc, projection))
+            if limit and len(docs) >= limit:
+                break
+        return docs
+
+    async def find_page(
+        self,
+        query: Dict[str, Any],
+        limit: int = DEFAULT_PAGE_LIMIT,
+        after: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        limit = max(1, min(limit, MAX_PAGE_LIMIT))
+        start = decode_cursor(after) if after else None
+        page = []
+        for doc in self._scan(query, start):
+            # One extra row tells whether another page exists, as in fetch_page.
+            page.append(project(doc, projection))
+            if len(page) > limit:
+                break
+        return split_page(page, limit)
+
+    async def iterate(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = ITERATE_BATCH_SIZE,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # Matched up front so writes made while the caller awaits cannot
+        # shift the walk.
+        for doc in list(self._scan(query)):
+            yield project(doc, projection)
+
+    async def count_by(self, field: str, query: Optional[Dict[str, Any]] = None) -> Dict[Any, int]:
+        return dict(Counter(doc.get(field) for doc in self._scan(query or {})))
+
+    async def insert_one(self, doc: Dict[str, Any]) -> None:
+        if doc["id"] in self._docs:
+            raise ValueError(f"Duplicate id {doc['id']} in {self.name}")
+        self._add(copy.deepcopy(doc))
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = True) -> BulkResult:
+        errors: Dict[int, str] = {}
+        for index, doc in enumerate(docs):
+            if doc["id"] in self._docs:
+                errors[index] = f"Duplicate id {doc['id']} in {self.name}"
+                if ordered:
+                    break
+                continue
+            self._add(copy.deepcopy(doc))
+        return collect_results([doc["id"] for doc in docs], ordered, errors)
+
+    async def set_fields(self, doc_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if doc_id not in self._docs:
+            return None
+        return project(self._replace(doc_id, fields), DOCUMENT_PROJECTION)
+
+    async def swap_fields(self, doc_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if doc_id not in self._docs:
+            return None
+        previous = project(self._docs[doc_id], DOCUMENT_PROJECTION)
+        self._replace(doc_id, fields)
+        return previous
+
+    async def set_many(self, changes: Changes, where: Optional[Dict[str, Any]] = None) -> int:
+        written = 0
+        for doc_id, fields in changes:
+            doc = self._docs.get(doc_id)
+            if doc is not None and matches(doc, where or {}):
+                self._replace(doc_id, fields)
+                written += 1
+        return written
+
+    async def upsert_many(self, upserts: Upserts) -> Tuple[int, int]:
+        inserted = updated = 0
+        for key, fields, on_insert in upserts:
+            existing = next(iter(self._scan(key)), None)
+            if existing is None:
+                self._add(copy.deepcopy({**key, **fields, **on_insert}))
+                inserted += 1
+            else:
+                self._replace(existing["id"], fields)
+                updated += 1
+        return inserted, updated
+
+    async def increment_many(self, increments: Increments) -> None:
+        for doc_id, amounts, on_insert in increments:
+            doc = self._docs.get(doc_id)
+            if doc is None:
+                self._add({**copy.deepcopy(on_insert), "id": doc_id, **amounts})
+            else:
+                self._replace(doc_id, {field: doc.get(field, 0) + amount for field, amount in amounts.items()})
+
+    async def replace_all(self, docs: List[Dict[str, Any]]) -> None:
+        self._docs.clear()
+        self._order.clear()
+        for index in self._indexes.values():
+            index.clear()
+        for doc in docs:
+            self._add(copy.deepcopy(doc))
+        self.touch()
+
+    def _apply(self, doc_id: str, fields: Dict[str, Any], derived: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        doc = self._replace(doc_id, {**fields, "updated_at": datetime.utcnow()})
+        if derived:
+            doc = self._replace(doc_id, {field: evaluate(expression, doc) for field, expression in derived.items()})
+        return doc
+
+    async def patch(
+        self, doc_id: str, fields: Dict[str, Any], derived: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        doc = self._docs.get(doc_id)
+        if doc is None:
+            return None
+        if any(not _equals(doc.get(field), value) for field, value in fields.items()):
+            doc = self._apply(doc_id, fields, derived)
+        return project(doc, DOCUMENT_PROJECTION)
+
+    async def patch_many(self, changes: Changes, ordered: bool = True, derive: Optional[Derive] = None) -> BulkResult:
+        missing = set()
+        for doc_id, fields in changes:
+            if doc_id not in self._docs:
+                missing.add(doc_id)
+                continue
+            self._apply(doc_id, fields, derive(fields) if derive else None)
+        return collect_results([doc_id for doc_id, _ in changes], ordered, {}, missing)
+
+    async def delete_one(self, doc_id: str) -> bool:
+        if doc_id not in self._docs:
+            return False
+        self._remove(doc_id)
+        return True
+
+    async def delete_many(self, ids: List[str], ordered: bool = True) -> BulkResult:
+        missing = {doc_id for doc_id in ids if doc_id not in self._docs}
+        for doc_id in ids:
+            if doc_id in self._docs:
+                self._remove(doc_id)
+        return collect_results(ids, ordered, {}, missing)
+
+    async def delete_ids(self, ids: List[str], session=None) -> int:
+        present = [doc_id for doc_id in set(ids) if doc_id in self._docs]
+        for doc_id in present:
+            self._remove(doc_id)
+        return len(present)
+
+
+def motor_repositories(db: AsyncIOMotorDatabase) -> Dict[str, Repository]:
+    return {name: MotorRepository(db[name]) for name in COLLECTIONS}
+
+
+def memory_repositories() -> Dict[str, Repository]:
+    return {name: MemoryRepository.for_collection(name) for name in COLLECTIONS}
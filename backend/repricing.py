@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from cache import CacheBackend, NullCache, invalidate
+from pricing import PricingError, load_unit_costs, price_estimates
+from repository import Repository
+from rollups import Rollups
+
+logger = logging.getLogger(__name__)
+
+REPRICE_BATCH_SIZE = 200
+# Materials re-priced per pass of a RepriceQueue
+REPRICE_QUEUE_BATCH_SIZE = 1000
+
+REPRICE_FIELDS = [
+    "id", "line_items", "material_ids",
+    "materials_cost", "labor_cost", "overhead_cost", "profit_margin", "total_cost",
+    # read so the rollups can move the changed totals
+    "project_id", "status", "created_at",
+]
+
+
+def _priced(estimates: List[Dict[str, Any]], unit_costs: Dict[str, float]) -> List[Dict[str, Any]]:
+    try:
+        price_estimates(estimates, unit_costs)
+        return estimates
+    except PricingError:
+        pass
+    # Some estimate references a material that has since been deleted;
+    # price the rest one by one and leave the broken ones as they are.
+    priced = []
+    for estimate in estimates:
+        try:
+            price_estimates([estimate], unit_costs)
+            priced.append(estimate)
+        except PricingError as exc:
+            logger.warning("Skipping re-price of estimate %s: %s", estimate["id"], exc)
+    return priced
+
+
+async def _reprice_batch(
+    repositories: Dict[str, Repository], batch: List[Dict[str, Any]], cache: CacheBackend
+) -> int:
+    estimates = repositories["estimates"]
+    before = {doc["id"]: (doc["materials_cost"], doc["labor_cost"], doc["total_cost"]) for doc in batch}
+    unit_costs = await load_unit_costs(repositories["materials"], batch)
+    changed = [
+        doc for doc in _priced(batch, unit_costs)
+        if before[doc["id"]] != (doc["materials_cost"], doc["labor_cost"], doc["total_cost"])
+    ]
+    if not changed:
+        return 0
+    now = datetime.utcnow()
+    modified = await estimates.set_many(
+        [
+            (doc["id"], {
+                "line_items": doc["line_items"],
+                "material_ids": doc["material_ids"],
+                "materials_cost": doc["materials_cost"],
+                "labor_cost": doc["labor_cost"],
+                "total_cost": doc["total_cost"],
+                "updated_at": now,
+            })
+            for doc in changed
+        ],
+        where={"status": "draft"},
+    )
+    await invalidate(cache, estimates.name, [doc["id"] for doc in changed])
+    await Rollups(repositories).record(
+        estimates.name, [{**doc, "total_cost": before[doc["id"]][2]} for doc in changed], changed
+    )
+    return modified
+
+
+async def reprice_estimates(
+    repositories: Dict[str, Repository],
+    material_ids: List[str],
+    cache: Optional[CacheBackend] = None,
+    batch_size: int = REPRICE_BATCH_SIZE,
+) -> int:
+    """Re-price draft estimates that reference any of the given materials.
+
+    Only estimates found through the material_ids reverse index are read, and
+    only those whose totals actually move are written.
+    """
+    if not material_ids:
+        return 0
+    cache = cache or NullCache()
+    drafts = repositories["estimates"].iterate(
+        {"material_ids": {"$in": list(material_ids)}, "status": "draft"},
+        {"_id": 0, **{field: 1 for field in REPRICE_FIELDS}},
+        batch_size,
+    )
+    repriced = 0
+    batch: List[Dict[str, Any]] = []
+    async for doc in drafts:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            repriced += await _reprice_batch(repositories, batch, cache)
+            batch = []
+    if batch:
+        repriced += await _reprice_batch(repositories, batch, cache)
+    logger.info("Re-priced %d draft estimates for %d materials", repriced, len(material_ids))
+    return repriced
+
+
+async def reprice_materials_updated_since(
+    repositories: Dict[str, Repository], since: datetime, cache: Optional[CacheBackend] = None
+) -> int:
+    docs = await repositories["materials"].find({"updated_at": {"$gte": since}}, {"_id": 0, "id": 1})
+    return await reprice_estimates(repositories, [doc["id"] for doc in docs], cache)
+
+
+class RepriceQueue:
+    """Re-prices drafts for material ids as they are reported, in the background.
+
+    Ids added while a pass runs are coalesced into the next one, so a burst
+    of material writes (a price-list import seen through the change feed)
+    costs a few passes rather than one per material.
+    """
+
+    def __init__(
+        self,
+        repositories: Dict[str, Repository],
+        cache: Optional[CacheBackend] = None,
+        batch_size: int = REPRICE_QUEUE_BATCH_SIZE,
+    ):
+        self.repositories = repositories
+        self.cache = cache
+        self.batch_size = batch_size
+        self._pending: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, material_ids: Iterable[str]) -> None:
+        self._pending.update(material_ids)
+        if self._pending and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._drain())
+
+    async def join(self) -> None:
+        """Wait until every id added so far has been re-priced."""
+        while self._task is not None and not self._task.done():
+            await self._task
+
+    async def _drain(self) -> None:
+        while self._pending:
+            material_ids = [self._pending.pop() for _ in range(min(self.batch_size, len(self._pending)))]
+            try:
+                await reprice_estimates(self.repositories, material_ids, self.cache)
+            except Exception:
+                logger.exception("Re-pricing for %d materials failed", len(material_ids))
@@ -0,0 +1,297 @@
+"""Reporting rollups kept up to date on every project and estimate write.
+
+Run `python rollups.py rebuild` (with MONGO_URL and DB_NAME set, as for the
+server) to recompute every bucket from the source collections.
+"""
+import argparse
+import asyncio
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from repository import Repository, motor_repositories
+
+ROLLUP_COLLECTION = "rollups"
+
+PERIODS = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+
+# Summed per bucket, next to a document count
+AMOUNT_FIELDS = {
+    "projects": ["estimated_cost", "actual_cost"],
+    "estimates": ["total_cost"],
+}
+# Fields whose change can move a document's contribution
+ROLLUP_INPUTS = {
+    "projects": ["status", "project_type", "estimated_cost", "actual_cost"],
+    "estimates": [
+        "status", "project_id", "total_cost",
+        "materials_cost", "labor_cost", "overhead_cost", "profit_margin", "line_items",
+    ],
+}
+ROLLUP_PROJECTIONS = {
+    "projects": {"_id": 0, "id": 1, "created_at": 1, "status": 1, "project_type": 1, "estimated_cost": 1, "actual_cost": 1},
+    "estimates": {"_id": 0, "id": 1, "created_at": 1, "status": 1, "project_id": 1, "total_cost": 1},
+}
+
+OPEN_ESTIMATE_STATUSES = ["draft", "sent"]
+WON_STATUS, LOST_STATUS = "approved", "rejected"
+COMPLETED_PROJECT_STATUS = "completed"
+
+Key = Tuple[str, str, str, str, str]  # source, period, bucket, project_type, status
+Deltas = Dict[Key, Dict[str, float]]
+
+
+def touches_rollups(source: str, fields: Iterable[str]) -> bool:
+    return any(field in ROLLUP_INPUTS[source] for field in fields)
+
+
+def changes_rollups(source: str, before: Dict[str, Any], after: Dict[str, Any]) -> bool:
+    """Whether a write moved `before` to an `after` that counts differently."""
+    return any(before.get(field) != after.get(field) for field in ROLLUP_PROJECTIONS[source] if field != "_id")
+
+
+def bucket_of(period: str, when: date) -> str:
+    return when.strftime(PERIODS[period])
+
+
+def _dimension(value: Any) -> str:
+    return "unknown" if value is None else str(value)
+
+
+def contribute(deltas: Deltas, source: str, doc: Dict[str, Any], project_type: Any, sign: int) -> None:
+    """Add (sign=1) or take back (sign=-1) what `doc` counts for in every period."""
+    created = doc.get("created_at")
+    if not isinstance(created, datetime):
+        return
+    amounts = {"count": 1, **{field: doc.get(field) or 0 for field in AMOUNT_FIELDS[source]}}
+    for period in PERIODS:
+        key = (source, period, bucket_of(period, created), _dimension(project_type), _dimension(doc.get("status")))
+        entry = deltas.setdefault(key, {})
+        for field, amount in amounts.items():
+            entry[field] = entry.get(field, 0) + sign * amount
+
+
+def _rollup_id(key: Key) -> str:
+    return "|".join(key)
+
+
+def _dimensions(key: Key) -> Dict[str, str]:
+    return dict(zip(("source", "period", "bucket", "project_type", "status"), key))
+
+
+class Rollups:
+    """Per-day and per-month aggregates by project type and status.
+
+    Services hand the before and after images of a write to `record`, which
+    $incs the difference into the buckets. Estimates are bucketed by their
+    project's type, so a project changing type moves its estimates along;
+    an estimate whose project is gone counts under type unknown until the
+    orphan sweeper deletes it. Concurrent writes to one document and writes
+    made outside the services can skew a bucket; `rebuild` recomputes
+    everything. Buckets live in the `rollups` repository, one document per
+    key.
+    """
+
+    def __init__(self, repositories: Dict[str, Repository]):
+        self.repositories = repositories
+        self.store = repositories[ROLLUP_COLLECTION]
+
+    async def load(self, source: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """The fields rollups need from the documents matching `query`."""
+        return await self.repositories[source].find(query, ROLLUP_PROJECTIONS[source])
+
+    async def load_ids(self, source: str, ids: List[str]) -> List[Dict[str, Any]]:
+        return await self.load(source, {"id": {"$in": list(ids)}}) if ids else []
+
+    async def _project_types(self, project_ids: Iterable[str]) -> Dict[str, Any]:
+        docs = await self.repositories["projects"].find(
+            {"id": {"$in": sorted(set(project_ids))}}, {"_id": 0, "id": 1, "project_type": 1}
+        )
+        return {doc["id"]: doc.get("project_type") for doc in docs}
+
+    async def record(
+        self,
+        source: str,
+        before: List[Dict[str, Any]],
+        after: List[Dict[str, Any]],
+        project_types: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        if not before and not after:
+            return
+        deltas: Deltas = {}
+        if source == "estimates":
+            if project_types is None:
+                project_types = await self._project_types(doc.get("project_id") for doc in before + after)
+            for docs, sign in ((before, -1), (after, 1)):
+                for doc in docs:
+                    contribute(deltas, source, doc, project_types.get(doc.get("project_id")), sign)
+        else:
+            for docs, sign in ((before, -1), (after, 1)):
+                for doc in docs:
+                    contribute(deltas, source, doc, doc.get("project_type"), sign)
+            await self._move_estimates(before, after, deltas)
+        await self._apply(deltas)
+
+    async def _move_estimates(self, before: List[Dict[str, Any]], after: List[Dict[str, Any]], deltas: Deltas) -> None:
+        old_types = {doc["id"]: doc.get("project_type") for doc in before}
+        new_types = {doc["id"]: doc.get("project_type") for doc in after}
+        retyped = [doc_id for doc_id in new_types if doc_id in old_types and old_types[doc_id] != new_types[doc_id]]
+        if not retyped:
+            return
+        for estimate in await self.load("estimates", {"project_id": {"$in": retyped}}):
+            contribute(deltas, "estimates", estimate, old_types[estimate["project_id"]], -1)
+            contribute(deltas, "estimates", estimate, new_types[estimate["project_id"]], 1)
+
+    async def remove_projects(
+        self, projects: List[Dict[str, Any]], estimates: List[Dict[str, Any]], settled: bool = True
+    ) -> None:
+        """Take back deleted projects and the estimates cascaded with them.
+
+        After a cascade that failed part-way (`settled=False`) only what is
+        really gone is taken back; estimates left behind a deleted project
+        move to type unknown, where `remove_orphans` later finds them.
+        """
+        alive: Set[str] = set()
+        remaining: Set[str] = set()
+        if not settled:
+            alive = {doc["id"] for doc in await self.load_ids("projects", [doc["id"] for doc in projects])}
+            remaining = {doc["id"] for doc in await self.load_ids("estimates", [doc["id"] for doc in estimates])}
+        project_types = {doc["id"]: doc.get("project_type") for doc in projects}
+        deltas: Deltas = {}
+        for doc in projects:
+            if doc["id"] not in alive:
+                contribute(deltas, "projects", doc, doc.get("project_type"), -1)
+        for doc in estimates:
+            if doc["id"] in remaining and doc.get("project_id") in alive:
+                continue
+            contribute(deltas, "estimates", doc, project_types.get(doc.get("project_id")), -1)
+            if doc["id"] in remaining:
+                contribute(deltas, "estimates", doc, None, 1)
+        await self._apply(deltas)
+
+    async def remove_orphans(self, estimates: List[Dict[str, Any]], settled: bool = True) -> None:
+        """Take back estimates the orphan sweeper deleted; their project is gone."""
+        if not settled:
+            remaining = {doc["id"] for doc in await self.load_ids("estimates", [doc["id"] for doc in estimates])}
+            estimates = [doc for doc in estimates if doc["id"] not in remaining]
+        await self.record("estimates", estimates, [], {})
+
+    async def _apply(self, deltas: Deltas) -> None:
+        await self.store.increment_many([
+            (_rollup_id(key), amounts, _dimensions(key)) for key, amounts in deltas.items() if any(amounts.values())
+        ])
+
+    async def rebuild(self) -> int:
+        """Recompute every bucket from projects and estimates; returns the bucket count.
+
+        The buckets are swapped in at once (see Repository.replace_all), so
+        reports keep answering while the rebuild runs; writes landing during
+        the rebuild may be missed, so run it when traffic is quiet.
+        """
+        deltas: Deltas = {}
+        project_types: Dict[str, Any] = {}
+        async for doc in self.repositories["projects"].iterate({}, ROLLUP_PROJECTIONS["projects"]):
+            project_types[doc["id"]] = doc.get("project_type")
+            contribute(deltas, "projects", doc, doc.get("project_type"), 1)
+        async for doc in self.repositories["estimates"].iterate({}, ROLLUP_PROJECTIONS["estimates"]):
+            contribute(deltas, "estimates", doc, project_types.get(doc.get("project_id")), 1)
+        rows = [{"id": _rollup_id(key), **_dimensions(key), **amounts} for key, amounts in deltas.items()]
+        await self.store.replace_all(rows)
+        return len(rows)
+
+    async def report(
+        self,
+        period: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        project_type: Optional[str] = None,
+        by_type: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Report rows per bucket (and per project type with `by_type`), oldest first."""
+        query: Dict[str, Any] = {"period": period, "count": {"$gt": 0}}
+        bounds = {}
+        if start:
+            bounds["$gte"] = bucket_of(period, start)
+        if end:
+            bounds["$lte"] = bucket_of(period, end)
+        if bounds:
+            query["bucket"] = bounds
+        if project_type is not None:
+            query["project_type"] = project_type
+        rows: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+        for doc in await self.store.find(query, {"_id": 0}):
+            group = (doc["bucket"], doc["project_type"] if by_type or project_type else None)
+            row = rows.setdefault(group, _empty_row(*group))
+            _add_to_row(row, doc)
+        return [_finish_row(rows[group]) for group in sorted(rows, key=lambda item: (item[0], item[1] or ""))]
+
+
+def _empty_row(bucket: str, project_type: Optional[str]) -> Dict[str, Any]:
+    return {
+        "bucket": bucket,
+        "project_type": project_type,
+        "estimates": 0,
+        "estimates_by_status": {},
+        "estimate_value_by_status": {},
+        "pipeline_value": 0.0,
+        "won_value": 0.0,
+        "win_rate": None,
+        "projects": 0,
+        "projects_by_status": {},
+        "estimated_cost": 0.0,
+        "actual_cost": 0.0,
+        "completed_estimated_cost": 0.0,
+        "completed_actual_cost": 0.0,
+        "cost_variance": 0.0,
+    }
+
+
+def _add_to_row(row: Dict[str, Any], doc: Dict[str, Any]) -> None:
+    status, count = doc["status"], doc["count"]
+    if doc["source"] == "estimates":
+        value = doc.get("total_cost", 0)
+        row["estimates"] += count
+        row["estimates_by_status"][status] = row["estimates_by_status"].get(status, 0) + count
+        row["estimate_value_by_status"][status] = row["estimate_value_by_status"].get(status, 0) + value
+        if status in OPEN_ESTIMATE_STATUSES:
+            row["pipeline_value"] += value
+        elif status == WON_STATUS:
+            row["won_value"] += value
+    else:
+        row["projects"] += count
+        row["projects_by_status"][status] = row["projects_by_status"].get(status, 0) + count
+        row["estimated_cost"] += doc.get("estimated_cost", 0)
+        row["actual_cost"] += doc.get("actual_cost", 0)
+        if status == COMPLETED_PROJECT_STATUS:
+            row["completed_estimated_cost"] += doc.get("estimated_cost", 0)
+            row["completed_actual_cost"] += doc.get("actual_cost", 0)
+
+
+def _finish_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    won = row["estimates_by_status"].get(WON_STATUS, 0)
+    decided = won + row["estimates_by_status"].get(LOST_STATUS, 0)
+    row["win_rate"] = won / decided if decided else None
+    # Only finished projects have a meaningful actual cost to compare
+    row["cost_variance"] = row["completed_actual_cost"] - row["completed_estimated_cost"]
+    return row
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+    load_dotenv(Path(__file__).parent / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    try:
+        buckets = await Rollups(motor_repositories(client[os.environ["DB_NAME"]])).rebuild()
+        print(f"Rebuilt {buckets} rollup buckets")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,206 @@
+import asyncio
+import math
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from models import Lead, Material, Project, SearchHit, SearchResults
+from repository import MotorRepository, Repository
+from serialization import model_projection
+
+# Fields covered by each collection's text index and trigram set
+SEARCH_FIELDS = {
+    "projects": ["name", "address", "description"],
+    "leads": ["name", "email", "phone", "address", "description"],
+    "materials": ["name", "category", "supplier", "description"],
+}
+SEARCH_MODELS = {"projects": Project, "leads": Lead, "materials": Material}
+
+# Keeps the multikey index bounded for long descriptions; fields are taken
+# in the order above, so names and contact details always make it in.
+MAX_GRAMS = 512
+FUZZY_MIN_SCORE = 0.4
+MAX_SEARCH_WINDOW = 1000
+BACKFILL_BATCH_SIZE = 1000
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+def _words(text: str) -> List[str]:
+    folded = unicodedata.normalize("NFKD", text.lower())
+    return _WORD.findall("".join(char for char in folded if not unicodedata.combining(char)))
+
+
+def trigrams(text: str) -> List[str]:
+    """pg_trgm-style trigrams: two leading blanks make short prefixes match."""
+    grams: Dict[str, None] = {}
+    for word in _words(text):
+        padded = f"  {word} "
+        for start in range(len(padded) - 2):
+            grams.setdefault(padded[start:start + 3])
+    return list(grams)
+
+
+def search_grams(collection_name: str, doc: Dict[str, Any]) -> List[str]:
+    grams: Dict[str, None] = {}
+    for field in SEARCH_FIELDS[collection_name]:
+        value = doc.get(field)
+        if isinstance(value, str):
+            for gram in trigrams(value):
+                grams.setdefault(gram)
+    return list(grams)[:MAX_GRAMS]
+
+
+def with_search_grams(collection_name: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {**doc, "search_grams": search_grams(collection_name, doc)}
+
+
+def touches_search(collection_name: str, fields: Iterable[str]) -> bool:
+    return any(field in SEARCH_FIELDS[collection_name] for field in fields)
+
+
+async def store_search_grams(repository: Repository, docs: List[Dict[str, Any]]) -> None:
+    """Write grams computed from updated documents already in hand."""
+    await repository.set_many([(doc["id"], {"search_grams": search_grams(repository.name, doc)}) for doc in docs])
+
+
+async def refresh_search_grams(repository: Repository, ids: List[str]) -> None:
+    """Recompute grams after a partial update changed a searchable field."""
+    if not ids:
+        return
+    fields = SEARCH_FIELDS[repository.name]
+    docs = await repository.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, **{field: 1 for field in fields}})
+    await store_search_grams(repository, docs)
+
+
+async def backfill_search_grams(db: AsyncIOMotorDatabase, batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, int]:
+    """Add grams to documents written before search existed."""
+    filled = {}
+    for collection_name, fields in SEARCH_FIELDS.items():
+        collection = db[collection_name]
+        filled[collection_name] = 0
+        cursor = collection.find(
+            {"search_grams": {"$exists": False}}, {"_id": 0, "id": 1, **{field: 1 for field in fields}}
+        ).batch_size(batch_size)
+        batch: List[UpdateOne] = []
+        async for doc in cursor:
+            batch.append(
+                UpdateOne({"id": doc["id"]}, {"$set": {"search_grams": search_grams(collection_name, doc)}})
+            )
+            if len(batch) >= batch_size:
+                filled[collection_name] += (await collection.bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            filled[collection_name] += (await collection.bulk_write(batch, ordered=False)).modified_count
+    return filled
+
+
+async def _text_hits(repository: Repository, q: str, window: int) -> List[Dict[str, Any]]:
+    if not isinstance(repository, MotorRepository):
+        return []  # only MongoDB has a text index; trigrams cover the rest
+    projection = {**model_projection(SEARCH_MODELS[repository.name]), "score": {"$meta": "textScore"}}
+    try:
+        return await repository.collection.find({"$text": {"$search": q}}, projection).sort(
+            [("score", {"$meta": "textScore"})]
+        ).limit(window).to_list(window)
+    except OperationFailure:
+        # No text index yet (first start against old data); trigrams still work.
+        return []
+
+
+def _candidate_grams(grams: List[str]) -> List[str]:
+    """Query grams of which every document reaching FUZZY_MIN_SCORE holds at least one.
+
+    A hit shares `required` of the n grams, so it cannot miss all of any
+    n - required + 1 of them. Word-edge grams (padded with blanks) are the
+    most common, so interior ones are picked first to keep candidates few.
+    """
+    required = max(1, math.ceil(FUZZY_MIN_SCORE * len(grams) - 1e-9))
+    return sorted(grams, key=lambda gram: (" " in gram, gram))[:len(grams) - required + 1]
+
+
+def _score_grams(docs: List[Dict[str, Any]], grams: List[str], window: int) -> List[Dict[str, Any]]:
+    wanted = set(grams)
+    hits = []
+    for doc in docs:
+        score = len(wanted.intersection(doc.pop("search_grams", ()))) / len(grams)
+        if score >= FUZZY_MIN_SCORE:
+            hits.append({**doc, "score": score})
+    hits.sort(key=lambda hit: (-hit["score"], hit["id"]))
+    return hits[:window]
+
+
+async def _fuzzy_hits(repository: Repository, grams: List[str], window: int) -> List[Dict[str, Any]]:
+    projection = model_projection(SEARCH_MODELS[repository.name])
+    candidates = {"search_grams": {"$in": _candidate_grams(grams)}}
+    if not isinstance(repository, MotorRepository):
+        docs = await repository.find(candidates, {**projection, "search_grams": 1})
+        return _score_grams(docs, grams, window)
+    # Every candidate is scored before the sort and limit, so the best hits
+    # cannot be cut off ahead of ranking.
+    pipeline = [
+        {"$match": candidates},
+        {"$addFields": {"score": {"$divide": [{"$size": {"$setIntersection": ["$search_grams", grams]}}, len(grams)]}}},
+        {"$match": {"score": {"$gte": FUZZY_MIN_SCORE}}},
+        {"$sort": {"score": -1, "id": 1}},
+        {"$limit": window},
+        {"$project": {**projection, "score": 1}},
+    ]
+    return await repository.collection.aggregate(pipeline).to_list(window)
+
+
+async def _ranked(
+    repositories: Dict[str, Repository], types: List[str], fetch, window: int
+) -> List[Tuple[str, Dict[str, Any]]]:
+    results = await asyncio.gather(*(fetch(repositories[collection_name], window) for collection_name in types))
+    hits = [(collection_name, doc) for collection_name, docs in zip(types, results) for doc in docs]
+    hits.sort(key=lambda hit: hit[1]["score"], reverse=True)
+    return hits
+
+
+async def search(
+    repositories: Dict[str, Repository], q: str, types: List[str], page: int = 1, limit: int = 20
+) -> SearchResults:
+    """Rank matches across collections with the text index, falling back to trigrams.
+
+    The fallback runs only when the text index finds nothing, which is the
+    case for typos and for partial words.
+    """
+    unknown = set(types) - set(SEARCH_FIELDS)
+    if unknown:
+        raise InvalidSearch(f"Cannot search {', '.join(sorted(unknown))}")
+    # Every type contributes its top `window` hits so the merged page is exact.
+    window = page * limit + 1
+    if window > MAX_SEARCH_WINDOW:
+        raise InvalidSearch(f"Search results are limited to the first {MAX_SEARCH_WINDOW} hits")
+
+    mode = "text"
+    hits = await _ranked(repositories, types, lambda repository, size: _text_hits(repository, q, size), window)
+    if not hits:
+        grams = trigrams(q)
+        if grams:
+            mode = "fuzzy"
+            hits = await _ranked(
+                repositories, types, lambda repository, size: _fuzzy_hits(repository, grams, size), window
+            )
+
+    start = (page - 1) * limit
+    return SearchResults(
+        query=q,
+        mode=mode,
+        page=page,
+        limit=limit,
+        has_more=len(hits) > start + limit,
+        hits=[
+            SearchHit(type=collection_name, score=doc.pop("score"), document=doc)
+            for collection_name, doc in hits[start:start + limit]
+        ],
+    )
@@ -0,0 +1,93 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Type, TypeVar, get_args
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Always projected so keyset pagination can build the next cursor.
+CURSOR_FIELDS = ("id", "created_at")
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class InvalidChanges(ValueError):
+    pass
+
+
+def model_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    """MongoDB projection returning exactly the model's fields."""
+    return {"_id": 0, **{field: 1 for field in model.model_fields}}
+
+
+def sparse_projection(
+    model: Type[BaseModel],
+    fields: Optional[List[str]] = None,
+    summary: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Projection for a sparse fieldset or a summary shape; None means full."""
+    if fields:
+        unknown = set(fields) - set(model.model_fields)
+        if unknown:
+            raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return {"_id": 0, **{field: 1 for field in (*CURSOR_FIELDS, *fields)}}
+    if summary:
+        return {"_id": 0, **summary}
+    return None
+
+
+def patch_fields(changes: BaseModel, model: Type[BaseModel]) -> Dict[str, Any]:
+    """The fields a PATCH body sets; an explicit null clears the field.
+
+    Only fields `model` allows to be None can be cleared, so stored documents
+    keep validating.
+    """
+    fields = changes.model_dump(exclude_unset=True)
+    required = [
+        name for name, value in fields.items()
+        if value is None and type(None) not in get_args(model.model_fields[name].annotation)
+    ]
+    if required:
+        raise InvalidChanges(f"Cannot clear: {', '.join(required)}")
+    return fields
+
+
+def trim_cursor_fields(docs: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Drop created_at again when it was only fetched for the cursor."""
+    if fields and "created_at" not in fields:
+        for doc in docs:
+            doc.pop("created_at", None)
+    return docs
+
+
+def construct_all(model: Type[ModelT], docs: Iterable[Dict[str, Any]]) -> List[ModelT]:
+    """Build models from stored documents without re-validating them.
+
+    Everything in the collection was written through these same models, so
+    validation only costs time; defaults still fill fields older documents
+    predate.
+    """
+    return [model.model_construct(**doc) for doc in docs]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """Encode models, dicts and datetimes straight to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
@@ -1,65 +1,308 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 import logging
+import shutil
+import tempfile
+from datetime import date, datetime
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import List, Literal, Optional
 
 from models import (
-    Project, ProjectCreate,
-    Lead, LeadCreate,
-    Material, MaterialCreate,
-    Estimate, EstimateCreate,
-    Proposal, ProposalCreate
+    Project, ProjectCreate, ProjectUpdate,
+    Lead, LeadCreate, LeadUpdate,
+    Material, MaterialCreate, MaterialUpdate,
+    Estimate, EstimateCreate, EstimateUpdate,
+    Proposal, ProposalCreate, ProposalUpdate,
+    BulkCreateRequest, BulkUpdateRequest, BulkDeleteRequest, BulkResult,
+    DashboardStats, MaterialImportProgress, SearchResults, RollupReport
 )
 from services import (
     ProjectService, LeadService, MaterialService, 
     EstimateService, ProposalService
 )
+from stats import STATS_COLLECTIONS, StatsService
+from rollups import Rollups
+from cache import LRUCache, invalidate
+from singleflight import SingleFlight
+from compression import CompressionMiddleware
+from metrics import CommandMetrics, MetricsMiddleware, registry, timed_serialization, watch_profiler
+from serialization import InvalidChanges, InvalidFields, dumps
+from expand import InvalidExpand, joined_collections
+from etag import ListEtags, document_etag, etag_matches, page_etag
+from export import EXPORT_MEDIA_TYPES, export_rows
+from material_import import import_materials
+from pricing import PricingError
+from cascade import MissingParent, run_orphan_sweeper, sweep_orphans
+from search import SEARCH_FIELDS, InvalidSearch, backfill_search_grams, search
+from dedup import DEDUP_POLICIES, DuplicateLead, backfill_dedup_keys
+from repricing import RepriceQueue, reprice_estimates, reprice_materials_updated_since
+from indexes import ensure_indexes, index_report, log_index_report
+from changes import CHANGE_FEED_MODES, ChangeEvent, ChangeFeed, ChangeListener
+from pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, InvalidCursor, build_filter
+from repository import memory_repositories, motor_repositories
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# mongo keeps data in MongoDB; memory keeps it in this process only (tests, benchmarks, demos)
+STORAGE_BACKENDS = ("mongo", "memory")
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo')
+if STORAGE_BACKEND not in STORAGE_BACKENDS:
+    raise RuntimeError(f"STORAGE_BACKEND must be one of {', '.join(STORAGE_BACKENDS)}")
+
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+client = None
+db = None
+if STORAGE_BACKEND == "mongo":
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, event_listeners=[CommandMetrics()])
+    db = client[os.environ['DB_NAME']]
+
+# Shared read-through cache for single-document GETs
+cache = LRUCache(
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', '10000')),
+    ttl_seconds=float(os.environ.get('CACHE_TTL_SECONDS', '60')),
+)
 
 # Initialize services
-project_service = ProjectService(db)
-lead_service = LeadService(db)
-material_service = MaterialService(db)
-estimate_service = EstimateService(db)
-proposal_service = ProposalService(db)
+def init_services(database, backend: str = STORAGE_BACKEND) -> None:
+    """Bind every service to `database`, or to fresh in-memory repositories with backend="memory".
+
+    Tests and benchmarks/load.py call this to swap in their own storage.
+    """
+    global db, repositories, project_service, lead_service, material_service, estimate_service, proposal_service
+    global stats_service, rollups, reprice_queue
+    # One repository per collection, shared so their write versions agree
+    if backend == "memory":
+        db, repositories = None, memory_repositories()
+    else:
+        db, repositories = database, motor_repositories(database)
+    project_service = ProjectService(db, cache, repositories)
+    lead_service = LeadService(db, cache, repositories)
+    material_service = MaterialService(db, cache, repositories)
+    estimate_service = EstimateService(db, cache, repositories)
+    proposal_service = ProposalService(db, cache, repositories)
+    stats_service = StatsService(repositories, ttl_seconds=float(os.environ.get('DASHBOARD_STATS_TTL', '10')))
+    rollups = Rollups(repositories)
+    reprice_queue = RepriceQueue(repositories, cache)
+
+init_services(db)
+
+# reject answers 409 with the existing id, merge folds a duplicate lead into it, off inserts as-is
+DedupPolicy = Literal["merge", "reject", "off"]
+LEAD_DEDUP_POLICY = os.environ.get('LEAD_DEDUP_POLICY', 'reject')
+if LEAD_DEDUP_POLICY not in DEDUP_POLICIES:
+    raise RuntimeError(f"LEAD_DEDUP_POLICY must be one of {', '.join(DEDUP_POLICIES)}")
+
+# Writes from other replicas or straight to MongoDB reach the cache and stats through the change feed
+CHANGE_FEED = os.environ.get('CHANGE_FEED', 'auto')
+if CHANGE_FEED not in CHANGE_FEED_MODES:
+    raise RuntimeError(f"CHANGE_FEED must be one of {', '.join(CHANGE_FEED_MODES)}")
+change_feed = ChangeFeed()
+# Set once the listener runs; from then on material writes reprice through the
+# feed, so estimates catch up as soon as a stream event arrives, or within
+# CHANGE_POLL_INTERVAL when the listener polls
+change_listener = None
+
+async def invalidate_cached(event: ChangeEvent):
+    if event.doc_id is not None:
+        await invalidate(cache, event.collection, [event.doc_id])
+    else:
+        await cache.clear(prefix=f"{event.collection}:" if event.collection else "")
+
+async def touch_versions(event: ChangeEvent):
+    names = [event.collection] if event.collection else list(repositories)
+    for name in names:
+        if name in repositories:
+            repositories[name].touch()
+
+async def refresh_stats(event: ChangeEvent):
+    # Stats group by status, so updates that leave it alone cannot move them
+    if event.operation != "update" or not event.fields or "status" in event.fields:
+        stats_service.invalidate()
+
+async def reprice_materials(event: ChangeEvent):
+    # Covers cost changes made straight in the database as well as through the API
+    if event.operation in ("update", "replace") and event.doc_id is not None:
+        if not event.fields or "cost_per_unit" in event.fields:
+            reprice_queue.add([event.doc_id])
+
+change_feed.subscribe(invalidate_cached)
+change_feed.subscribe(touch_versions)
+change_feed.subscribe(refresh_stats, STATS_COLLECTIONS)
+change_feed.subscribe(reprice_materials, ["materials"])
+
+def reprice_later(background_tasks: BackgroundTasks, task, *args):
+    # Without the change feed, the request that changed the costs schedules the re-price itself
+    if change_listener is None:
+        background_tasks.add_task(task, repositories, *args, cache)
 
 # Create the main app without a prefix
 app = FastAPI(title="Crewlo API", version="1.0.0")
 
+@app.exception_handler(PricingError)
+async def pricing_error_handler(request: Request, exc: PricingError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(MissingParent)
+async def missing_parent_handler(request: Request, exc: MissingParent):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(InvalidChanges)
+async def invalid_changes_handler(request: Request, exc: InvalidChanges):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Pagination helpers
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    view: Literal["summary", "full"] = Query("summary", description="Estimates and proposals list a compact shape unless view=full"),
+):
+    return {
+        "limit": limit,
+        "after": after,
+        "created_after": created_after,
+        "created_before": created_before,
+        "fields": [field.strip() for field in fields.split(",") if field.strip()] if fields else None,
+        "summary": view == "summary",
+    }
+
+# Concurrent identical list reads share one query and one serialized body
+list_flight = SingleFlight()
+list_etags = ListEtags(ttl_seconds=cache.ttl_seconds)
+
+def not_modified(request: Request, etag: str) -> bool:
+    return etag_matches(request.headers.get("if-none-match"), etag)
+
+def etag_headers(etag: str) -> dict:
+    # no-cache lets clients store the body but revalidate before reuse
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+async def list_page(request: Request, name: str, fetch, page: dict, related=(), **equals):
+    query = build_filter(equals, page["created_after"], page["created_before"])
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    # Joined parents are versioned too, so renaming a project invalidates the
+    # tag of every list that embeds it.
+    versions = tuple(repositories[collection].version for collection in (name, *related))
+    known = list_etags.get(key, versions)
+    if known and not_modified(request, known):
+        return Response(status_code=304, headers=etag_headers(known))
+
+    async def load():
+        items, next_cursor = await fetch(
+            query, page["limit"], page["after"], fields=page["fields"], summary=page["summary"]
+        )
+        with timed_serialization():
+            body = dumps(items)
+        return body, next_cursor
+
+    # Versions are part of the key so a request never joins a load that
+    # started before a write it has already seen.
+    try:
+        body, next_cursor = await list_flight.do((*key, versions), load)
+    except (InvalidCursor, InvalidFields, InvalidExpand) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    etag = page_etag(body, next_cursor)
+    list_etags.remember(key, versions, etag)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+    headers = etag_headers(etag)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def detail_response(request: Request, response: Response, item):
+    etag = document_etag(item.id, item.updated_at)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+    response.headers.update(etag_headers(etag))
+    return item
+
 # Health check endpoint
 @api_router.get("/")
 async def root():
     return {"message": "Crewlo API", "version": "1.0.0"}
 
+# Export endpoints
+EXPORTS = {
+    "projects": (Project, ["status", "project_type", "client_id"]),
+    "leads": (Lead, ["status", "project_type", "source"]),
+    "materials": (Material, ["category", "supplier"]),
+    "estimates": (Estimate, ["status", "project_id", "lead_id"]),
+    "proposals": (Proposal, ["status", "estimate_id"]),
+}
+
+@api_router.get("/{resource}/export")
+async def export_resource(
+    resource: str,
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    if resource not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    model, filters = EXPORTS[resource]
+    equals = {field: request.query_params.get(field) for field in filters}
+    query = build_filter(equals, created_after, created_before)
+    return StreamingResponse(
+        export_rows(repositories[resource], model, query, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{resource}.{fmt}"'},
+    )
+
 # Project endpoints
 @api_router.post("/projects", response_model=Project)
 async def create_project(project: ProjectCreate):
     return await project_service.create_project(project)
 
 @api_router.get("/projects", response_model=List[Project])
-async def get_projects():
-    return await project_service.get_projects()
+async def get_projects(
+    request: Request,
+    status: Optional[str] = None,
+    project_type: Optional[str] = None,
+    client_id: Optional[str] = None,
+    page: dict = Depends(page_params),
+):
+    return await list_page(
+        request, "projects", project_service.get_projects, page,
+        status=status,
+        project_type=project_type,
+        client_id=client_id,
+    )
+
+@api_router.post("/projects/bulk", response_model=BulkResult)
+async def bulk_create_projects(request: BulkCreateRequest[ProjectCreate]):
+    return await project_service.create_projects(request.items, request.ordered)
+
+@api_router.patch("/projects/bulk", response_model=BulkResult)
+async def bulk_update_projects(request: BulkUpdateRequest[ProjectUpdate]):
+    return await project_service.update_projects(request.items, request.ordered)
+
+@api_router.delete("/projects/bulk", response_model=BulkResult)
+async def bulk_delete_projects(request: BulkDeleteRequest):
+    return await project_service.delete_projects(request.ids, request.ordered)
 
 @api_router.get("/projects/{project_id}", response_model=Project)
-async def get_project(project_id: str):
+async def get_project(project_id: str, request: Request, response: Response):
     project = await project_service.get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    return project
+    return detail_response(request, response, project)
 
 @api_router.put("/projects/{project_id}", response_model=Project)
 async def update_project(project_id: str, project: ProjectCreate):
@@ -68,6 +311,13 @@ async def update_project(project_id: str, project: ProjectCreate):
         raise HTTPException(status_code=404, detail="Project not found")
     return updated_project
 
+@api_router.patch("/projects/{project_id}", response_model=Project)
+async def patch_project(project_id: str, changes: ProjectUpdate):
+    updated_project = await project_service.patch_project(project_id, changes)
+    if not updated_project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return updated_project
+
 @api_router.delete("/projects/{project_id}")
 async def delete_project(project_id: str):
     success = await project_service.delete_project(project_id)
@@ -77,19 +327,50 @@ async def delete_project(project_id: str):
 
 # Lead endpoints
 @api_router.post("/leads", response_model=Lead)
-async def create_lead(lead: LeadCreate):
-    return await lead_service.create_lead(lead)
+async def create_lead(lead: LeadCreate, response: Response, dedup: Optional[DedupPolicy] = None):
+    try:
+        lead_obj, duplicate_reason = await lead_service.create_lead(lead, dedup or LEAD_DEDUP_POLICY)
+    except DuplicateLead as exc:
+        raise HTTPException(
+            status_code=409, detail={"message": str(exc), "existing_id": exc.existing_id, "reason": exc.reason}
+        )
+    if duplicate_reason:
+        response.headers["X-Merged-Into"] = lead_obj.id
+    return lead_obj
 
 @api_router.get("/leads", response_model=List[Lead])
-async def get_leads():
-    return await lead_service.get_leads()
+async def get_leads(
+    request: Request,
+    status: Optional[str] = None,
+    project_type: Optional[str] = None,
+    source: Optional[str] = None,
+    page: dict = Depends(page_params),
+):
+    return await list_page(
+        request, "leads", lead_service.get_leads, page,
+        status=status,
+        project_type=project_type,
+        source=source,
+    )
+
+@api_router.post("/leads/bulk", response_model=BulkResult)
+async def bulk_create_leads(request: BulkCreateRequest[LeadCreate], dedup: Optional[DedupPolicy] = None):
+    return await lead_service.create_leads(request.items, request.ordered, dedup or LEAD_DEDUP_POLICY)
+
+@api_router.patch("/leads/bulk", response_model=BulkResult)
+async def bulk_update_leads(request: BulkUpdateRequest[LeadUpdate]):
+    return await lead_service.update_leads(request.items, request.ordered)
+
+@api_router.delete("/leads/bulk", response_model=BulkResult)
+async def bulk_delete_leads(request: BulkDeleteRequest):
+    return await lead_service.delete_leads(request.ids, request.ordered)
 
 @api_router.get("/leads/{lead_id}", response_model=Lead)
-async def get_lead(lead_id: str):
+async def get_lead(lead_id: str, request: Request, response: Response):
     lead = await lead_service.get_lead(lead_id)
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
-    return lead
+    return detail_response(request, response, lead)
 
 @api_router.put("/leads/{lead_id}", response_model=Lead)
 async def update_lead(lead_id: str, lead: LeadCreate):
@@ -98,6 +379,13 @@ async def update_lead(lead_id: str, lead: LeadCreate):
         raise HTTPException(status_code=404, detail="Lead not found")
     return updated_lead
 
+@api_router.patch("/leads/{lead_id}", response_model=Lead)
+async def patch_lead(lead_id: str, changes: LeadUpdate):
+    updated_lead = await lead_service.patch_lead(lead_id, changes)
+    if not updated_lead:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return updated_lead
+
 @api_router.delete("/leads/{lead_id}")
 async def delete_lead(lead_id: str):
     success = await lead_service.delete_lead(lead_id)
@@ -111,21 +399,91 @@ async def create_material(material: MaterialCreate):
     return await material_service.create_material(material)
 
 @api_router.get("/materials", response_model=List[Material])
-async def get_materials():
-    return await material_service.get_materials()
+async def get_materials(
+    request: Request,
+    category: Optional[str] = None,
+    supplier: Optional[str] = None,
+    page: dict = Depends(page_params),
+):
+    return await list_page(
+        request, "materials", material_service.get_materials, page,
+        category=category,
+        supplier=supplier,
+    )
+
+@api_router.post("/materials/bulk", response_model=BulkResult)
+async def bulk_create_materials(request: BulkCreateRequest[MaterialCreate]):
+    return await material_service.create_materials(request.items, request.ordered)
+
+@api_router.patch("/materials/bulk", response_model=BulkResult)
+async def bulk_update_materials(request: BulkUpdateRequest[MaterialUpdate], background_tasks: BackgroundTasks):
+    result = await material_service.update_materials(request.items, request.ordered)
+    repriced_ids = [item.id for item in request.items if item.changes.cost_per_unit is not None]
+    reprice_later(background_tasks, reprice_estimates, repriced_ids)
+    return result
+
+@api_router.delete("/materials/bulk", response_model=BulkResult)
+async def bulk_delete_materials(request: BulkDeleteRequest):
+    return await material_service.delete_materials(request.ids, request.ordered)
+
+@api_router.post("/materials/import", response_model=MaterialImportProgress)
+async def import_material_price_list(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    stream: bool = Query(False, description="Stream NDJSON progress after every batch"),
+):
+    # Mongo keeps milliseconds; truncate so rows written this instant match.
+    started = datetime.utcnow()
+    started = started.replace(microsecond=started.microsecond // 1000 * 1000)
+    if stream:
+        # The upload is closed once this handler returns, before the body
+        # streams, so the generator reads from its own disk-spooled copy.
+        upload = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        await run_in_threadpool(shutil.copyfileobj, file.file, upload)
+        upload.seek(0)
+
+        async def progress_lines():
+            with upload:
+                async for report in import_materials(repositories["materials"], upload):
+                    yield report.model_dump_json() + "\n"
+            await cache.clear(prefix="materials:")
+        return StreamingResponse(
+            progress_lines(),
+            media_type="application/x-ndjson",
+            background=(
+                BackgroundTask(reprice_materials_updated_since, repositories, started, cache)
+                if change_listener is None else None
+            ),
+        )
+    report = None
+    async for report in import_materials(repositories["materials"], file.file):
+        pass
+    await cache.clear(prefix="materials:")
+    reprice_later(background_tasks, reprice_materials_updated_since, started)
+    return report
 
 @api_router.get("/materials/{material_id}", response_model=Material)
-async def get_material(material_id: str):
+async def get_material(material_id: str, request: Request, response: Response):
     material = await material_service.get_material(material_id)
     if not material:
         raise HTTPException(status_code=404, detail="Material not found")
-    return material
+    return detail_response(request, response, material)
 
 @api_router.put("/materials/{material_id}", response_model=Material)
-async def update_material(material_id: str, material: MaterialCreate):
+async def update_material(material_id: str, material: MaterialCreate, background_tasks: BackgroundTasks):
     updated_material = await material_service.update_material(material_id, material)
     if not updated_material:
         raise HTTPException(status_code=404, detail="Material not found")
+    reprice_later(background_tasks, reprice_estimates, [material_id])
+    return updated_material
+
+@api_router.patch("/materials/{material_id}", response_model=Material)
+async def patch_material(material_id: str, changes: MaterialUpdate, background_tasks: BackgroundTasks):
+    updated_material = await material_service.patch_material(material_id, changes)
+    if not updated_material:
+        raise HTTPException(status_code=404, detail="Material not found")
+    if changes.cost_per_unit is not None:
+        reprice_later(background_tasks, reprice_estimates, [material_id])
     return updated_material
 
 @api_router.delete("/materials/{material_id}")
@@ -141,15 +499,40 @@ async def create_estimate(estimate: EstimateCreate):
     return await estimate_service.create_estimate(estimate)
 
 @api_router.get("/estimates", response_model=List[Estimate])
-async def get_estimates():
-    return await estimate_service.get_estimates()
+async def get_estimates(
+    request: Request,
+    status: Optional[str] = None,
+    project_id: Optional[str] = None,
+    lead_id: Optional[str] = None,
+    expand: Optional[str] = Query(None, description="Embed parent records: project"),
+    page: dict = Depends(page_params),
+):
+    return await list_page(
+        request, "estimates", partial(estimate_service.get_estimates, expand=expand), page,
+        related=joined_collections("estimates", expand),
+        status=status,
+        project_id=project_id,
+        lead_id=lead_id,
+    )
+
+@api_router.post("/estimates/bulk", response_model=BulkResult)
+async def bulk_create_estimates(request: BulkCreateRequest[EstimateCreate]):
+    return await estimate_service.create_estimates(request.items, request.ordered)
+
+@api_router.patch("/estimates/bulk", response_model=BulkResult)
+async def bulk_update_estimates(request: BulkUpdateRequest[EstimateUpdate]):
+    return await estimate_service.update_estimates(request.items, request.ordered)
+
+@api_router.delete("/estimates/bulk", response_model=BulkResult)
+async def bulk_delete_estimates(request: BulkDeleteRequest):
+    return await estimate_service.delete_estimates(request.ids, request.ordered)
 
 @api_router.get("/estimates/{estimate_id}", response_model=Estimate)
-async def get_estimate(estimate_id: str):
+async def get_estimate(estimate_id: str, request: Request, response: Response):
     estimate = await estimate_service.get_estimate(estimate_id)
     if not estimate:
         raise HTTPException(status_code=404, detail="Estimate not found")
-    return estimate
+    return detail_response(request, response, estimate)
 
 @api_router.put("/estimates/{estimate_id}", response_model=Estimate)
 async def update_estimate(estimate_id: str, estimate: EstimateCreate):
@@ -158,6 +541,13 @@ async def update_estimate(estimate_id: str, estimate: EstimateCreate):
         raise HTTPException(status_code=404, detail="Estimate not found")
     return updated_estimate
 
+@api_router.patch("/estimates/{estimate_id}", response_model=Estimate)
+async def patch_estimate(estimate_id: str, changes: EstimateUpdate):
+    updated_estimate = await estimate_service.patch_estimate(estimate_id, changes)
+    if not updated_estimate:
+        raise HTTPException(status_code=404, detail="Estimate not found")
+    return updated_estimate
+
 @api_router.delete("/estimates/{estimate_id}")
 async def delete_estimate(estimate_id: str):
     success = await estimate_service.delete_estimate(estimate_id)
@@ -171,15 +561,38 @@ async def create_proposal(proposal: ProposalCreate):
     return await proposal_service.create_proposal(proposal)
 
 @api_router.get("/proposals", response_model=List[Proposal])
-async def get_proposals():
-    return await proposal_service.get_proposals()
+async def get_proposals(
+    request: Request,
+    status: Optional[str] = None,
+    estimate_id: Optional[str] = None,
+    expand: Optional[str] = Query(None, description="Embed parent records: estimate or estimate.project"),
+    page: dict = Depends(page_params),
+):
+    return await list_page(
+        request, "proposals", partial(proposal_service.get_proposals, expand=expand), page,
+        related=joined_collections("proposals", expand),
+        status=status,
+        estimate_id=estimate_id,
+    )
+
+@api_router.post("/proposals/bulk", response_model=BulkResult)
+async def bulk_create_proposals(request: BulkCreateRequest[ProposalCreate]):
+    return await proposal_service.create_proposals(request.items, request.ordered)
+
+@api_router.patch("/proposals/bulk", response_model=BulkResult)
+async def bulk_update_proposals(request: BulkUpdateRequest[ProposalUpdate]):
+    return await proposal_service.update_proposals(request.items, request.ordered)
+
+@api_router.delete("/proposals/bulk", response_model=BulkResult)
+async def bulk_delete_proposals(request: BulkDeleteRequest):
+    return await proposal_service.delete_proposals(request.ids, request.ordered)
 
 @api_router.get("/proposals/{proposal_id}", response_model=Proposal)
-async def get_proposal(proposal_id: str):
+async def get_proposal(proposal_id: str, request: Request, response: Response):
     proposal = await proposal_service.get_proposal(proposal_id)
     if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
-    return proposal
+    return detail_response(request, response, proposal)
 
 @api_router.put("/proposals/{proposal_id}", response_model=Proposal)
 async def update_proposal(proposal_id: str, proposal: ProposalCreate):
@@ -188,6 +601,13 @@ async def update_proposal(proposal_id: str, proposal: ProposalCreate):
         raise HTTPException(status_code=404, detail="Proposal not found")
     return updated_proposal
 
+@api_router.patch("/proposals/{proposal_id}", response_model=Proposal)
+async def patch_proposal(proposal_id: str, changes: ProposalUpdate):
+    updated_proposal = await proposal_service.patch_proposal(proposal_id, changes)
+    if not updated_proposal:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return updated_proposal
+
 @api_router.delete("/proposals/{proposal_id}")
 async def delete_proposal(proposal_id: str):
     success = await proposal_service.delete_proposal(proposal_id)
@@ -195,15 +615,84 @@ async def delete_proposal(proposal_id: str):
         raise HTTPException(status_code=404, detail="Proposal not found")
     return {"message": "Proposal deleted successfully"}
 
+# Search endpoints
+@api_router.get("/search", response_model=SearchResults)
+async def search_records(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: str = Query(",".join(SEARCH_FIELDS), description="Comma-separated: projects, leads, materials"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+):
+    try:
+        return await search(repositories, q, [name.strip() for name in types.split(",") if name.strip()], page, limit)
+    except InvalidSearch as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+# Dashboard endpoints
+@api_router.get("/dashboard/stats", response_model=DashboardStats)
+async def get_dashboard_stats():
+    return await stats_service.get_stats()
+
+# Report endpoints
+@api_router.get("/reports/rollups", response_model=RollupReport)
+async def get_rollup_report(
+    period: Literal["day", "month"] = "month",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    project_type: Optional[str] = None,
+    by_type: bool = False,
+):
+    rows = await rollups.report(period, start, end, project_type, by_type)
+    return RollupReport(period=period, rows=rows)
+
+# Admin endpoints
+@api_router.get("/admin/indexes")
+async def get_index_report():
+    return await index_report(db) if db is not None else {}
+
+@api_router.get("/admin/cache")
+async def get_cache_stats():
+    return {**cache.stats(), "list_flight": list_flight.stats()}
+
+@api_router.post("/admin/orphans/sweep")
+async def sweep_orphan_documents():
+    return {"removed": await sweep_orphans(repositories, cache, db=db)}
+
+@api_router.post("/admin/rollups/rebuild")
+async def rebuild_rollups():
+    return {"buckets": await rollups.rebuild()}
+
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')),
+    levels={
+        "gzip": int(os.environ.get('GZIP_LEVEL', '6')),
+        "br": int(os.environ.get('BROTLI_QUALITY', '4')),
+        "zstd": int(os.environ.get('ZSTD_LEVEL', '3')),
+    },
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Merged-Into"],
+)
+
+# Opt-in: requests slower than SLOW_REQUEST_MS are logged with their query shapes
+slow_request_ms = os.environ.get('SLOW_REQUEST_MS')
+app.add_middleware(
+    MetricsMiddleware,
+    slow_request_ms=float(slow_request_ms) if slow_request_ms else None,
 )
 
 # Configure logging
@@ -213,6 +702,68 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def provision_indexes():
+    if db is not None:
+        await ensure_indexes(db)
+        await log_index_report(db)
+
+async def backfill_search():
+    try:
+        filled = await backfill_search_grams(db)
+    except Exception:
+        logger.exception("Search gram backfill failed")
+        return
+    if any(filled.values()):
+        logger.info("Backfilled search grams: %s", filled)
+
+async def backfill_dedup():
+    try:
+        filled = await backfill_dedup_keys(db)
+    except Exception:
+        logger.exception("Lead dedup key backfill failed")
+        return
+    if filled:
+        logger.info("Backfilled dedup keys on %d leads", filled)
+
+# Seconds between orphan sweeps; 0 turns the background sweeper off
+ORPHAN_SWEEP_INTERVAL = float(os.environ.get('ORPHAN_SWEEP_INTERVAL', '3600'))
+background_tasks = []
+
+@app.on_event("startup")
+async def start_background_tasks():
+    global change_listener
+    if ORPHAN_SWEEP_INTERVAL > 0:
+        background_tasks.append(
+            asyncio.create_task(run_orphan_sweeper(repositories, cache, ORPHAN_SWEEP_INTERVAL, db=db))
+        )
+    if db is None:
+        return  # the rest backfills and watches MongoDB
+    background_tasks.append(asyncio.create_task(backfill_search()))
+    background_tasks.append(asyncio.create_task(backfill_dedup()))
+    # Opt-in: documents scanned, from the profiler, for operations slower than PROFILE_SLOW_MS
+    profile_slow_ms = os.environ.get('PROFILE_SLOW_MS')
+    if profile_slow_ms:
+        background_tasks.append(asyncio.create_task(watch_profiler(
+            db, int(profile_slow_ms), float(os.environ.get('PROFILE_POLL_INTERVAL', '15'))
+        )))
+    if CHANGE_FEED != "off":
+        change_listener = ChangeListener(
+            db,
+            change_feed,
+            consumer=os.environ.get('CHANGE_FEED_CONSUMER', 'api'),
+            mode=CHANGE_FEED,
+            poll_interval=float(os.environ.get('CHANGE_POLL_INTERVAL', '2')),
+            delete_check_interval=float(os.environ.get('CHANGE_DELETE_CHECK_INTERVAL', '300')),
+        )
+        background_tasks.append(asyncio.create_task(change_listener.run()))
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in background_tasks:
+        task.cancel()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    if client is not None:
+        client.close()
\ No newline at end of file
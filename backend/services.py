@@ -1,186 +1,627 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from models import (
-    Project, ProjectCreate, 
-    Lead, LeadCreate,
-    Material, MaterialCreate,
-    Estimate, EstimateCreate,
-    Proposal, ProposalCreate
+    Project, ProjectCreate, ProjectUpdate,
+    Lead, LeadCreate, LeadUpdate,
+    Material, MaterialCreate, MaterialUpdate,
+    Estimate, EstimateCreate, EstimateUpdate,
+    Proposal, ProposalCreate, ProposalUpdate,
+    BulkItemResult, BulkResult, BulkUpdateItem
 )
 from datetime import datetime
+from pagination import DEFAULT_PAGE_LIMIT, aggregate_page
+from expand import Join, expansion, join_parents, lookup_stages, supports_lookup_pipeline
+from pricing import load_unit_costs, price_estimates, price_line_items
+from cache import CacheBackend, NullCache, cached_find_one, invalidate
+from cascade import CascadeDeleter, require_parents
+from repository import MotorRepository, Repository, motor_repositories
+from rollups import Rollups, changes_rollups, touches_rollups
+from dedup import (
+    CandidateIndex, DuplicateLead, dedup_key_fields, find_candidates, merge_changes,
+    refresh_dedup_keys, touches_dedup_keys, with_dedup_keys,
+)
+from search import refresh_search_grams, search_grams, store_search_grams, touches_search, with_search_grams
+from serialization import construct_all, model_projection, patch_fields, sparse_projection, trim_cursor_fields
+
+ESTIMATE_COST_FIELDS = ["materials_cost", "labor_cost", "overhead_cost", "profit_margin"]
+
+# Default list shapes that leave out the bulky fields; ?view=full restores them
+ESTIMATE_SUMMARY = {
+    field: 1 for field in Estimate.model_fields if field not in ("line_items", "material_ids")
+}
+PROPOSAL_SUMMARY = {
+    **{field: 1 for field in Proposal.model_fields if field not in ("content", "terms")},
+    "content_preview": {"$substrCP": ["$content", 0, 200]},
+}
+
+async def fetch_list(
+    repository: Repository,
+    model,
+    query: Optional[Dict[str, Any]],
+    limit: int,
+    after: Optional[str],
+    fields: Optional[List[str]] = None,
+    summary: Optional[Dict[str, Any]] = None,
+    expand: Optional[Join] = None,
+    repositories: Optional[Dict[str, Repository]] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """One list page: full models, or plain dicts for a sparse/summary/expanded shape."""
+    projection = sparse_projection(model, fields, summary)
+    if expand is not None:
+        projection = {**(projection or model_projection(model)), expand.as_field: 1}
+        if isinstance(repository, MotorRepository) and await supports_lookup_pipeline(repository.collection.database):
+            docs, next_cursor = await aggregate_page(
+                repository.collection, query or {}, limit, after, projection, lookup_stages(expand)
+            )
+            return trim_cursor_fields(docs, fields), next_cursor
+        # Joined in process; the parent key is fetched even if not asked for
+        keep_key = projection.get(expand.local_field)
+        docs, next_cursor = await repository.find_page(
+            query or {}, limit, after, {**projection, expand.local_field: 1}
+        )
+        await join_parents(repositories, docs, expand)
+        if not keep_key:
+            for doc in docs:
+                doc.pop(expand.local_field, None)
+        return trim_cursor_fields(docs, fields), next_cursor
+    docs, next_cursor = await repository.find_page(
+        query or {}, limit, after, projection or model_projection(model)
+    )
+    if projection is None:
+        return construct_all(model, docs), next_cursor
+    return trim_cursor_fields(docs, fields), next_cursor
+
+def estimate_derived_fields(fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if any(field in fields for field in ESTIMATE_COST_FIELDS):
+        return {"total_cost": {"$add": [f"${field}" for field in ESTIMATE_COST_FIELDS]}}
+    return None
+
+def sparse_changes(items: List[BulkUpdateItem], model) -> List[Tuple[str, Dict[str, Any]]]:
+    return [(item.id, patch_fields(item.changes, model)) for item in items]
+
+def succeeded_ids(result: BulkResult) -> List[str]:
+    return [item.id for item in result.results if item.status == "ok"]
 
 class ProjectService:
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        db: Optional[AsyncIOMotorDatabase],
+        cache: Optional[CacheBackend] = None,
+        repositories: Optional[Dict[str, Repository]] = None,
+    ):
         self.db = db
-        self.collection = db.projects
+        self.cache = cache or NullCache()
+        repositories = repositories or motor_repositories(db)
+        self.repository = repositories["projects"]
+        self.cascade = CascadeDeleter(db, self.cache, repositories=repositories)
+        self.rollups = Rollups(repositories)
 
     async def create_project(self, project: ProjectCreate) -> Project:
-        project_dict = project.dict()
+        project_dict = project.model_dump()
         project_obj = Project(**project_dict)
-        await self.collection.insert_one(project_obj.dict())
+        await self.repository.insert_one(with_search_grams(self.repository.name, project_obj.model_dump()))
+        await self.rollups.record(self.repository.name, [], [project_obj.model_dump()])
         return project_obj
 
-    async def get_projects(self) -> List[Project]:
-        projects = await self.collection.find().to_list(1000)
-        return [Project(**project) for project in projects]
+    async def create_projects(self, items: List[ProjectCreate], ordered: bool = True) -> BulkResult:
+        docs = [with_search_grams(self.repository.name, Project(**item.model_dump()).model_dump()) for item in items]
+        result = await self.repository.insert_many(docs, ordered)
+        inserted = set(succeeded_ids(result))
+        await self.rollups.record(self.repository.name, [], [doc for doc in docs if doc["id"] in inserted])
+        return result
+
+    async def update_projects(self, items: List[BulkUpdateItem[ProjectUpdate]], ordered: bool = True) -> BulkResult:
+        changes = sparse_changes(items, Project)
+        rolled = [doc_id for doc_id, fields in changes if touches_rollups(self.repository.name, fields)]
+        before = await self.rollups.load_ids(self.repository.name, rolled)
+        result = await self.repository.patch_many(changes, ordered)
+        await self.rollups.record(self.repository.name, before, await self.rollups.load_ids(self.repository.name, rolled))
+        await refresh_search_grams(
+            self.repository,
+            [doc_id for doc_id, fields in changes if touches_search(self.repository.name, fields)],
+        )
+        await invalidate(self.cache, self.repository.name, [doc_id for doc_id, _ in changes])
+        return result
+
+    async def delete_projects(self, ids: List[str], ordered: bool = True) -> BulkResult:
+        projects = await self.rollups.load_ids(self.repository.name, ids)
+        estimates = await self.rollups.load("estimates", {"project_id": {"$in": ids}})
+        result = await self.repository.delete_many(ids, ordered)
+        await invalidate(self.cache, self.repository.name, ids)
+        deleted = succeeded_ids(result)
+        settled = False
+        try:
+            # Anything left by a failure here is picked up by the orphan sweeper
+            await self.cascade.delete_children(self.repository.name, deleted)
+            settled = True
+        finally:
+            await self.rollups.remove_projects(
+                [doc for doc in projects if doc["id"] in deleted],
+                [doc for doc in estimates if doc["project_id"] in deleted],
+                settled,
+            )
+        return result
+
+    async def get_projects(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        limit: int = DEFAULT_PAGE_LIMIT,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        summary: bool = False,
+    ) -> Tuple[List[Any], Optional[str]]:
+        return await fetch_list(self.repository, Project, query, limit, after, fields, None)
 
     async def get_project(self, project_id: str) -> Optional[Project]:
-        project = await self.collection.find_one({"id": project_id})
+        project = await cached_find_one(self.cache, self.repository, project_id)
         return Project(**project) if project else None
 
     async def update_project(self, project_id: str, project: ProjectCreate) -> Optional[Project]:
-        project_dict = project.dict()
+        project_dict = project.model_dump()
         project_dict["updated_at"] = datetime.utcnow()
-        result = await self.collection.update_one(
-            {"id": project_id}, 
-            {"$set": project_dict}
-        )
-        if result.modified_count:
-            return await self.get_project(project_id)
-        return None
+        project_dict["search_grams"] = search_grams(self.repository.name, project_dict)
+        before = await self.repository.swap_fields(project_id, project_dict)
+        await invalidate(self.cache, self.repository.name, [project_id])
+        if before is None:
+            return None
+        updated = {**before, **project_dict}
+        if changes_rollups(self.repository.name, before, updated):
+            await self.rollups.record(self.repository.name, [before], [updated])
+        return Project(**updated)
+
+    async def patch_project(self, project_id: str, changes: ProjectUpdate) -> Optional[Project]:
+        fields = patch_fields(changes, Project)
+        rolled = touches_rollups(self.repository.name, fields)
+        before = await self.rollups.load_ids(self.repository.name, [project_id]) if rolled else []
+        updated = await self.repository.patch(project_id, fields)
+        if rolled and updated:
+            await self.rollups.record(self.repository.name, before, [updated])
+        if updated and touches_search(self.repository.name, fields):
+            await store_search_grams(self.repository, [updated])
+        await invalidate(self.cache, self.repository.name, [project_id])
+        return Project(**updated) if updated else None
 
     async def delete_project(self, project_id: str) -> bool:
-        result = await self.collection.delete_one({"id": project_id})
-        return result.deleted_count > 0
+        projects = await self.rollups.load_ids(self.repository.name, [project_id])
+        estimates = await self.rollups.load("estimates", {"project_id": project_id})
+        settled = False
+        try:
+            deleted = await self.cascade.delete(self.repository.name, [project_id])
+            settled = True
+        finally:
+            await self.rollups.remove_projects(projects, estimates, settled)
+        return deleted.get(self.repository.name, 0) > 0
 
 class LeadService:
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        db: Optional[AsyncIOMotorDatabase],
+        cache: Optional[CacheBackend] = None,
+        repositories: Optional[Dict[str, Repository]] = None,
+    ):
         self.db = db
-        self.collection = db.leads
+        self.cache = cache or NullCache()
+        repositories = repositories or motor_repositories(db)
+        self.repository = repositories["leads"]
+
+    def _lead_document(self, lead: Lead) -> Dict[str, Any]:
+        return with_dedup_keys(with_search_grams(self.repository.name, lead.model_dump()))
+
+    def _merge_fields(self, target: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **changes,
+            **dedup_key_fields(target),
+            "search_grams": search_grams(self.repository.name, target),
+            "updated_at": datetime.utcnow(),
+        }
+
+    async def create_lead(self, lead: LeadCreate, policy: str = "reject") -> Tuple[Lead, Optional[str]]:
+        """Insert a lead, or merge it into / reject it for an existing duplicate.
+
+        Returns the stored lead and, when it was merged, the duplicate reason.
+        """
+        lead_obj = Lead(**lead.model_dump())
+        doc = self._lead_document(lead_obj)
+        if policy != "off":
+            found = CandidateIndex(await find_candidates(self.repository, [doc])).match(doc)
+            if found:
+                existing, reason = found
+                if policy == "reject":
+                    raise DuplicateLead(existing["id"], reason)
+                changes = merge_changes(existing, doc)
+                existing.update(changes)
+                merged = await self.repository.set_fields(existing["id"], self._merge_fields(existing, changes))
+                await invalidate(self.cache, self.repository.name, [existing["id"]])
+                if merged:
+                    return Lead(**merged), reason
+        await self.repository.insert_one(doc)
+        return lead_obj, None
 
-    async def create_lead(self, lead: LeadCreate) -> Lead:
-        lead_dict = lead.dict()
-        lead_obj = Lead(**lead_dict)
-        await self.collection.insert_one(lead_obj.dict())
-        return lead_obj
+    async def create_leads(self, items: List[LeadCreate], ordered: bool = True, policy: str = "reject") -> BulkResult:
+        docs = [self._lead_document(Lead(**item.model_dump())) for item in items]
+        if policy == "off":
+            return await self.repository.insert_many(docs, ordered)
+
+        # One candidate query for the whole batch; fresh items join the index
+        # so later items in the same batch are matched against them too.
+        index = CandidateIndex(await find_candidates(self.repository, docs))
+        fresh: List[int] = []
+        fresh_ids = set()
+        merges: Dict[str, Dict[str, Any]] = {}
+        targets: Dict[str, Dict[str, Any]] = {}
+        outcomes: Dict[int, BulkItemResult] = {}
+        for position, doc in enumerate(docs):
+            found = index.match(doc)
+            if found is None:
+                index.add(doc)
+                fresh.append(position)
+                fresh_ids.add(doc["id"])
+                continue
+            target, reason = found
+            if policy == "reject":
+                outcomes[position] = BulkItemResult(
+                    index=position, id=target["id"], status="duplicate",
+                    error=f"Duplicate of lead {target['id']} ({reason})",
+                )
+                if ordered:
+                    break
+                continue
+            changes = merge_changes(target, doc)
+            target.update(changes)
+            targets[target["id"]] = target
+            if target["id"] not in fresh_ids:
+                merges.setdefault(target["id"], {}).update(changes)
+            outcomes[position] = BulkItemResult(index=position, id=target["id"], status="merged")
+
+        for position in fresh:
+            if docs[position]["id"] in targets:
+                docs[position] = self._lead_document(Lead(**docs[position]))
+        inserted = await self.repository.insert_many([docs[position] for position in fresh], ordered)
+        for position, item in zip(fresh, inserted.results):
+            outcomes[position] = item.model_copy(update={"index": position})
+        if merges:
+            await self.repository.set_many(
+                [(doc_id, self._merge_fields(targets[doc_id], changes)) for doc_id, changes in merges.items()]
+            )
+            await invalidate(self.cache, self.repository.name, list(merges))
+
+        result = BulkResult(ordered=ordered)
+        for position, doc in enumerate(docs):
+            item = outcomes.get(position) or BulkItemResult(index=position, id=doc["id"], status="skipped")
+            if item.status in ("ok", "merged"):
+                result.succeeded += 1
+            else:
+                result.failed += 1
+            result.results.append(item)
+        return result
+
+    async def update_leads(self, items: List[BulkUpdateItem[LeadUpdate]], ordered: bool = True) -> BulkResult:
+        changes = sparse_changes(items, Lead)
+        result = await self.repository.patch_many(changes, ordered)
+        await refresh_search_grams(
+            self.repository,
+            [doc_id for doc_id, fields in changes if touches_search(self.repository.name, fields)],
+        )
+        await refresh_dedup_keys(
+            self.repository, [doc_id for doc_id, fields in changes if touches_dedup_keys(fields)]
+        )
+        await invalidate(self.cache, self.repository.name, [doc_id for doc_id, _ in changes])
+        return result
 
-    async def get_leads(self) -> List[Lead]:
-        leads = await self.collection.find().to_list(1000)
-        return [Lead(**lead) for lead in leads]
+    async def delete_leads(self, ids: List[str], ordered: bool = True) -> BulkResult:
+        result = await self.repository.delete_many(ids, ordered)
+        await invalidate(self.cache, self.repository.name, ids)
+        return result
+
+    async def get_leads(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        limit: int = DEFAULT_PAGE_LIMIT,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        summary: bool = False,
+    ) -> Tuple[List[Any], Optional[str]]:
+        return await fetch_list(self.repository, Lead, query, limit, after, fields, None)
 
     async def get_lead(self, lead_id: str) -> Optional[Lead]:
-        lead = await self.collection.find_one({"id": lead_id})
+        lead = await cached_find_one(self.cache, self.repository, lead_id)
         return Lead(**lead) if lead else None
 
     async def update_lead(self, lead_id: str, lead: LeadCreate) -> Optional[Lead]:
-        lead_dict = lead.dict()
+        lead_dict = lead.model_dump()
         lead_dict["updated_at"] = datetime.utcnow()
-        result = await self.collection.update_one(
-            {"id": lead_id}, 
-            {"$set": lead_dict}
-        )
-        if result.modified_count:
-            return await self.get_lead(lead_id)
-        return None
+        lead_dict["search_grams"] = search_grams(self.repository.name, lead_dict)
+        lead_dict.update(dedup_key_fields(lead_dict))
+        updated = await self.repository.set_fields(lead_id, lead_dict)
+        await invalidate(self.cache, self.repository.name, [lead_id])
+        return Lead(**updated) if updated else None
+
+    async def patch_lead(self, lead_id: str, changes: LeadUpdate) -> Optional[Lead]:
+        fields = patch_fields(changes, Lead)
+        updated = await self.repository.patch(lead_id, fields)
+        # Derived from the patched lead in hand, in one write
+        derived: Dict[str, Any] = {}
+        if updated and touches_search(self.repository.name, fields):
+            derived["search_grams"] = search_grams(self.repository.name, updated)
+        if updated and touches_dedup_keys(fields):
+            derived.update(dedup_key_fields(updated))
+        if derived:
+            await self.repository.set_many([(lead_id, derived)])
+        await invalidate(self.cache, self.repository.name, [lead_id])
+        return Lead(**updated) if updated else None
 
     async def delete_lead(self, lead_id: str) -> bool:
-        result = await self.collection.delete_one({"id": lead_id})
-        return result.deleted_count > 0
+        deleted = await self.repository.delete_one(lead_id)
+        await invalidate(self.cache, self.repository.name, [lead_id])
+        return deleted
 
 class MaterialService:
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        db: Optional[AsyncIOMotorDatabase],
+        cache: Optional[CacheBackend] = None,
+        repositories: Optional[Dict[str, Repository]] = None,
+    ):
         self.db = db
-        self.collection = db.materials
+        self.cache = cache or NullCache()
+        repositories = repositories or motor_repositories(db)
+        self.repository = repositories["materials"]
 
     async def create_material(self, material: MaterialCreate) -> Material:
-        material_dict = material.dict()
+        material_dict = material.model_dump()
         material_obj = Material(**material_dict)
-        await self.collection.insert_one(material_obj.dict())
+        await self.repository.insert_one(with_search_grams(self.repository.name, material_obj.model_dump()))
         return material_obj
 
-    async def get_materials(self) -> List[Material]:
-        materials = await self.collection.find().to_list(1000)
-        return [Material(**material) for material in materials]
+    async def create_materials(self, items: List[MaterialCreate], ordered: bool = True) -> BulkResult:
+        docs = [with_search_grams(self.repository.name, Material(**item.model_dump()).model_dump()) for item in items]
+        return await self.repository.insert_many(docs, ordered)
+
+    async def update_materials(self, items: List[BulkUpdateItem[MaterialUpdate]], ordered: bool = True) -> BulkResult:
+        changes = sparse_changes(items, Material)
+        result = await self.repository.patch_many(changes, ordered)
+        await refresh_search_grams(
+            self.repository,
+            [doc_id for doc_id, fields in changes if touches_search(self.repository.name, fields)],
+        )
+        await invalidate(self.cache, self.repository.name, [doc_id for doc_id, _ in changes])
+        return result
+
+    async def delete_materials(self, ids: List[str], ordered: bool = True) -> BulkResult:
+        result = await self.repository.delete_many(ids, ordered)
+        await invalidate(self.cache, self.repository.name, ids)
+        return result
+
+    async def get_materials(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        limit: int = DEFAULT_PAGE_LIMIT,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        summary: bool = False,
+    ) -> Tuple[List[Any], Optional[str]]:
+        return await fetch_list(self.repository, Material, query, limit, after, fields, None)
 
     async def get_material(self, material_id: str) -> Optional[Material]:
-        material = await self.collection.find_one({"id": material_id})
+        material = await cached_find_one(self.cache, self.repository, material_id)
         return Material(**material) if material else None
 
     async def update_material(self, material_id: str, material: MaterialCreate) -> Optional[Material]:
-        material_dict = material.dict()
+        material_dict = material.model_dump()
         material_dict["updated_at"] = datetime.utcnow()
-        result = await self.collection.update_one(
-            {"id": material_id}, 
-            {"$set": material_dict}
-        )
-        if result.modified_count:
-            return await self.get_material(material_id)
-        return None
+        material_dict["search_grams"] = search_grams(self.repository.name, material_dict)
+        updated = await self.repository.set_fields(material_id, material_dict)
+        await invalidate(self.cache, self.repository.name, [material_id])
+        return Material(**updated) if updated else None
+
+    async def patch_material(self, material_id: str, changes: MaterialUpdate) -> Optional[Material]:
+        fields = patch_fields(changes, Material)
+        updated = await self.repository.patch(material_id, fields)
+        if updated and touches_search(self.repository.name, fields):
+            await store_search_grams(self.repository, [updated])
+        await invalidate(self.cache, self.repository.name, [material_id])
+        return Material(**updated) if updated else None
 
     async def delete_material(self, material_id: str) -> bool:
-        result = await self.collection.delete_one({"id": material_id})
-        return result.deleted_count > 0
+        deleted = await self.repository.delete_one(material_id)
+        await invalidate(self.cache, self.repository.name, [material_id])
+        return deleted
 
 class EstimateService:
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        db: Optional[AsyncIOMotorDatabase],
+        cache: Optional[CacheBackend] = None,
+        repositories: Optional[Dict[str, Repository]] = None,
+    ):
         self.db = db
-        self.collection = db.estimates
+        self.cache = cache or NullCache()
+        repositories = repositories or motor_repositories(db)
+        self.repositories = repositories
+        self.repository = repositories["estimates"]
+        self.materials = repositories["materials"]
+        self.cascade = CascadeDeleter(db, self.cache, repositories=repositories)
+        self.rollups = Rollups(repositories)
+
+    async def _build_estimates(self, estimates: List[EstimateCreate]) -> List[Estimate]:
+        estimate_dicts = [estimate.model_dump() for estimate in estimates]
+        await require_parents(self.repositories, self.repository.name, estimate_dicts)
+        # Price line items against the catalog and derive totals server-side
+        unit_costs = await load_unit_costs(self.materials, estimate_dicts)
+        price_estimates(estimate_dicts, unit_costs)
+        return [Estimate(**estimate_dict) for estimate_dict in estimate_dicts]
+
+    async def _price_changes(self, changes: List[Dict[str, Any]]) -> None:
+        # Sparse change sets that replace line_items get their materials (and
+        # line labor) cost re-derived; total_cost follows via the pipeline.
+        priced = [fields for fields in changes if "line_items" in fields]
+        if not priced:
+            return
+        partials = [{"line_items": fields["line_items"]} for fields in priced]
+        unit_costs = await load_unit_costs(self.materials, partials)
+        price_line_items(partials, unit_costs)
+        for fields, partial in zip(priced, partials):
+            fields.update(partial)
 
     async def create_estimate(self, estimate: EstimateCreate) -> Estimate:
-        estimate_dict = estimate.dict()
-        # Calculate total cost
-        total_cost = estimate_dict["materials_cost"] + estimate_dict["labor_cost"] + estimate_dict["overhead_cost"] + estimate_dict["profit_margin"]
-        estimate_dict["total_cost"] = total_cost
-        estimate_obj = Estimate(**estimate_dict)
-        await self.collection.insert_one(estimate_obj.dict())
+        [estimate_obj] = await self._build_estimates([estimate])
+        await self.repository.insert_one(estimate_obj.model_dump())
+        await self.rollups.record(self.repository.name, [], [estimate_obj.model_dump()])
         return estimate_obj
 
-    async def get_estimates(self) -> List[Estimate]:
-        estimates = await self.collection.find().to_list(1000)
-        return [Estimate(**estimate) for estimate in estimates]
+    async def create_estimates(self, items: List[EstimateCreate], ordered: bool = True) -> BulkResult:
+        docs = [estimate.model_dump() for estimate in await self._build_estimates(items)]
+        result = await self.repository.insert_many(docs, ordered)
+        inserted = set(succeeded_ids(result))
+        await self.rollups.record(self.repository.name, [], [doc for doc in docs if doc["id"] in inserted])
+        return result
+
+    async def update_estimates(self, items: List[BulkUpdateItem[EstimateUpdate]], ordered: bool = True) -> BulkResult:
+        changes = sparse_changes(items, Estimate)
+        await require_parents(self.repositories, self.repository.name, [fields for _, fields in changes])
+        await self._price_changes([fields for _, fields in changes])
+        rolled = [doc_id for doc_id, fields in changes if touches_rollups(self.repository.name, fields)]
+        before = await self.rollups.load_ids(self.repository.name, rolled)
+        result = await self.repository.patch_many(changes, ordered, estimate_derived_fields)
+        await self.rollups.record(self.repository.name, before, await self.rollups.load_ids(self.repository.name, rolled))
+        await invalidate(self.cache, self.repository.name, [doc_id for doc_id, _ in changes])
+        return result
+
+    async def delete_estimates(self, ids: List[str], ordered: bool = True) -> BulkResult:
+        before = await self.rollups.load_ids(self.repository.name, ids)
+        result = await self.repository.delete_many(ids, ordered)
+        await invalidate(self.cache, self.repository.name, ids)
+        deleted = succeeded_ids(result)
+        await self.rollups.record(self.repository.name, [doc for doc in before if doc["id"] in deleted], [])
+        # Anything left by a failure here is picked up by the orphan sweeper
+        await self.cascade.delete_children(self.repository.name, deleted)
+        return result
+
+    async def get_estimates(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        limit: int = DEFAULT_PAGE_LIMIT,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        summary: bool = False,
+        expand: Optional[str] = None,
+    ) -> Tuple[List[Any], Optional[str]]:
+        shape = ESTIMATE_SUMMARY if summary else None
+        return await fetch_list(
+            self.repository, Estimate, query, limit, after, fields, shape,
+            expansion(self.repository.name, expand), self.repositories,
+        )
 
     async def get_estimate(self, estimate_id: str) -> Optional[Estimate]:
-        estimate = await self.collection.find_one({"id": estimate_id})
+        estimate = await cached_find_one(self.cache, self.repository, estimate_id)
         return Estimate(**estimate) if estimate else None
 
     async def update_estimate(self, estimate_id: str, estimate: EstimateCreate) -> Optional[Estimate]:
-        estimate_dict = estimate.dict()
+        estimate_dict = estimate.model_dump()
+        await require_parents(self.repositories, self.repository.name, [estimate_dict])
+        # Re-price line items and recalculate total cost
+        unit_costs = await load_unit_costs(self.materials, [estimate_dict])
+        price_estimates([estimate_dict], unit_costs)
         estimate_dict["updated_at"] = datetime.utcnow()
-        # Recalculate total cost
-        total_cost = estimate_dict["materials_cost"] + estimate_dict["labor_cost"] + estimate_dict["overhead_cost"] + estimate_dict["profit_margin"]
-        estimate_dict["total_cost"] = total_cost
-        result = await self.collection.update_one(
-            {"id": estimate_id}, 
-            {"$set": estimate_dict}
-        )
-        if result.modified_count:
-            return await self.get_estimate(estimate_id)
-        return None
+        before = await self.repository.swap_fields(estimate_id, estimate_dict)
+        await invalidate(self.cache, self.repository.name, [estimate_id])
+        if before is None:
+            return None
+        updated = {**before, **estimate_dict}
+        if changes_rollups(self.repository.name, before, updated):
+            await self.rollups.record(self.repository.name, [before], [updated])
+        return Estimate(**updated)
+
+    async def patch_estimate(self, estimate_id: str, changes: EstimateUpdate) -> Optional[Estimate]:
+        fields = patch_fields(changes, Estimate)
+        await require_parents(self.repositories, self.repository.name, [fields])
+        await self._price_changes([fields])
+        rolled = touches_rollups(self.repository.name, fields)
+        before = await self.rollups.load_ids(self.repository.name, [estimate_id]) if rolled else []
+        updated = await self.repository.patch(estimate_id, fields, estimate_derived_fields(fields))
+        if rolled and updated:
+            await self.rollups.record(self.repository.name, before, [updated])
+        await invalidate(self.cache, self.repository.name, [estimate_id])
+        return Estimate(**updated) if updated else None
 
     async def delete_estimate(self, estimate_id: str) -> bool:
-        result = await self.collection.delete_one({"id": estimate_id})
-        return result.deleted_count > 0
+        before = await self.rollups.load_ids(self.repository.name, [estimate_id])
+        deleted = await self.cascade.delete(self.repository.name, [estimate_id])
+        await self.rollups.record(self.repository.name, before, [])
+        return deleted.get(self.repository.name, 0) > 0
 
 class ProposalService:
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        db: Optional[AsyncIOMotorDatabase],
+        cache: Optional[CacheBackend] = None,
+        repositories: Optional[Dict[str, Repository]] = None,
+    ):
         self.db = db
-        self.collection = db.proposals
+        self.cache = cache or NullCache()
+        repositories = repositories or motor_repositories(db)
+        self.repositories = repositories
+        self.repository = repositories["proposals"]
 
     async def create_proposal(self, proposal: ProposalCreate) -> Proposal:
-        proposal_dict = proposal.dict()
+        proposal_dict = proposal.model_dump()
+        await require_parents(self.repositories, self.repository.name, [proposal_dict])
         proposal_obj = Proposal(**proposal_dict)
-        await self.collection.insert_one(proposal_obj.dict())
+        await self.repository.insert_one(proposal_obj.model_dump())
         return proposal_obj
 
-    async def get_proposals(self) -> List[Proposal]:
-        proposals = await self.collection.find().to_list(1000)
-        return [Proposal(**proposal) for proposal in proposals]
+    async def create_proposals(self, items: List[ProposalCreate], ordered: bool = True) -> BulkResult:
+        docs = [Proposal(**item.model_dump()).model_dump() for item in items]
+        await require_parents(self.repositories, self.repository.name, docs)
+        return await self.repository.insert_many(docs, ordered)
+
+    async def update_proposals(self, items: List[BulkUpdateItem[ProposalUpdate]], ordered: bool = True) -> BulkResult:
+        changes = sparse_changes(items, Proposal)
+        await require_parents(self.repositories, self.repository.name, [fields for _, fields in changes])
+        result = await self.repository.patch_many(changes, ordered)
+        await invalidate(self.cache, self.repository.name, [doc_id for doc_id, _ in changes])
+        return result
+
+    async def delete_proposals(self, ids: List[str], ordered: bool = True) -> BulkResult:
+        result = await self.repository.delete_many(ids, ordered)
+        await invalidate(self.cache, self.repository.name, ids)
+        return result
+
+    async def get_proposals(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        limit: int = DEFAULT_PAGE_LIMIT,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        summary: bool = False,
+        expand: Optional[str] = None,
+    ) -> Tuple[List[Any], Optional[str]]:
+        shape = PROPOSAL_SUMMARY if summary else None
+        return await fetch_list(
+            self.repository, Proposal, query, limit, after, fields, shape,
+            expansion(self.repository.name, expand), self.repositories,
+        )
 
     async def get_proposal(self, proposal_id: str) -> Optional[Proposal]:
-        proposal = await self.collection.find_one({"id": proposal_id})
+        proposal = await cached_find_one(self.cache, self.repository, proposal_id)
         return Proposal(**proposal) if proposal else None
 
     async def update_proposal(self, proposal_id: str, proposal: ProposalCreate) -> Optional[Proposal]:
-        proposal_dict = proposal.dict()
+        proposal_dict = proposal.model_dump()
+        await require_parents(self.repositories, self.repository.name, [proposal_dict])
         proposal_dict["updated_at"] = datetime.utcnow()
-        result = await self.collection.update_one(
-            {"id": proposal_id}, 
-            {"$set": proposal_dict}
-        )
-        if result.modified_count:
-            return await self.get_proposal(proposal_id)
-        return None
+        updated = await self.repository.set_fields(proposal_id, proposal_dict)
+        await invalidate(self.cache, self.repository.name, [proposal_id])
+        return Proposal(**updated) if updated else None
+
+    async def patch_proposal(self, proposal_id: str, changes: ProposalUpdate) -> Optional[Proposal]:
+        fields = patch_fields(changes, Proposal)
+        await require_parents(self.repositories, self.repository.name, [fields])
+        updated = await self.repository.patch(proposal_id, fields)
+        await invalidate(self.cache, self.repository.name, [proposal_id])
+        return Proposal(**updated) if updated else None
 
     async def delete_proposal(self, proposal_id: str) -> bool:
-        result = await self.collection.delete_one({"id": proposal_id})
-        return result.deleted_count > 0
\ No newline at end of file
+        deleted = await self.repository.delete_one(proposal_id)
+        await invalidate(self.cache, self.repository.name, [proposal_id])
+        return deleted
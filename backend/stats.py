@@ -0,0 +1,75 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from models import DashboardStats
+from repository import MotorRepository, Repository
+
+STATS_COLLECTIONS = ["projects", "leads", "estimates"]
+
+
+def _status_stage(collection_name: str) -> list:
+    return [{"$project": {"_id": 0, "collection": collection_name, "status": 1}}]
+
+
+class StatsService:
+    def __init__(self, repositories: Dict[str, Repository], ttl_seconds: float = 0.0):
+        self.repositories = repositories
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[DashboardStats] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _pipeline(self) -> list:
+        # One round trip: union the status field of every collection and
+        # group on (collection, status) server-side.
+        first, *rest = STATS_COLLECTIONS
+        pipeline = _status_stage(first)
+        for name in rest:
+            pipeline.append({"$unionWith": {"coll": name, "pipeline": _status_stage(name)}})
+        pipeline.append({
+            "$group": {
+                "_id": {"collection": "$collection", "status": "$status"},
+                "count": {"$sum": 1},
+            }
+        })
+        return pipeline
+
+    async def _counts(self) -> Dict[str, Dict[Any, int]]:
+        counts: Dict[str, Dict[Any, int]] = {name: {} for name in STATS_COLLECTIONS}
+        repositories = [self.repositories[name] for name in STATS_COLLECTIONS]
+        if all(isinstance(repository, MotorRepository) for repository in repositories):
+            async for row in repositories[0].collection.aggregate(self._pipeline()):
+                key = row["_id"]
+                counts[key["collection"]][key.get("status")] = row["count"]
+            return counts
+        results = await asyncio.gather(*(repository.count_by("status") for repository in repositories))
+        return dict(zip(STATS_COLLECTIONS, results))
+
+    async def compute_stats(self) -> DashboardStats:
+        by_status: Dict[str, Dict[str, int]] = {name: {} for name in STATS_COLLECTIONS}
+        for name, counts in (await self._counts()).items():
+            for status, count in counts.items():
+                key = status or "unknown"
+                by_status[name][key] = by_status[name].get(key, 0) + count
+        return DashboardStats(
+            total_projects=sum(by_status["projects"].values()),
+            active_projects=by_status["projects"].get("active", 0),
+            total_leads=sum(by_status["leads"].values()),
+            new_leads=by_status["leads"].get("new", 0),
+            total_estimates=sum(by_status["estimates"].values()),
+            pending_estimates=by_status["estimates"].get("draft", 0),
+            by_status=by_status,
+        )
+
+    async def get_stats(self) -> DashboardStats:
+        if self.ttl_seconds <= 0:
+            return await self.compute_stats()
+        async with self._lock:
+            if self._snapshot is None or time.monotonic() >= self._expires_at:
+                self._snapshot = await self.compute_stats()
+                self._expires_at = time.monotonic() + self.ttl_seconds
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        self._snapshot = None
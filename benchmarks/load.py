@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""Throughput and latency of the API under concurrent load, per endpoint.
+
+Boots the FastAPI app in-process (httpx ASGITransport, no network hop) on a
+freshly seeded database, then drives each workload with --concurrency
+clients and reports requests/s and p50/p95/p99 latency.
+
+The database is either a local mongod (--mongo-url, default $MONGO_URL) or,
+with --memory, the in-memory repository backend (STORAGE_BACKEND=memory).
+That backend needs no server; it has no text index, so search always takes
+the trigram path, and no $lookup, so the expand workload only runs against
+mongod.
+
+    python benchmarks/load.py --leads 100000 --estimates 100000 --save-baseline /tmp/mongod.json
+    python benchmarks/load.py --leads 100000 --estimates 100000 --baseline /tmp/mongod.json
+
+With --baseline, a workload whose p95 grew or whose throughput dropped by
+more than --tolerance is reported as a regression and the exit status is 1.
+Baselines are only comparable on the same machine, backend and volumes,
+which the baseline's "meta" block records. benchmarks/baseline.json was
+recorded on the in-memory repository backend (no mongod, no mongomock)
+with
+
+    python benchmarks/load.py --memory --leads 2000 --estimates 2000 --requests 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+SEED_BATCH_SIZE = 5000
+MATERIAL_COUNT = 500
+ESTIMATES_PER_PROJECT = 10
+LINE_ITEMS = 8
+
+FIRST_NAMES = ["Ana", "Ben", "Carla", "Dev", "Elena", "Farid", "Grace", "Hugo", "Iris", "Jonas", "Kim", "Luis"]
+LAST_NAMES = ["Smith", "Garcia", "Nguyen", "Okafor", "Rossi", "Schmidt", "Tanaka", "Walsh", "Young", "Zhang"]
+STREETS = ["Main Street", "Oak Avenue", "Maple Drive", "Cedar Lane", "Elm Road", "Pine Court", "Lake Boulevard"]
+PROJECT_TYPES = ["residential", "commercial", "renovation"]
+LEAD_STATUSES = ["new", "contacted", "qualified", "converted", "lost"]
+LEAD_SOURCES = ["website", "referral", "social", "phone"]
+ESTIMATE_STATUSES = ["draft", "sent", "approved", "rejected"]
+CATEGORIES = ["lumber", "concrete", "roofing", "electrical", "plumbing", "drywall", "paint"]
+SEARCH_TERMS = ["kitchen", "oak", "Garcia", "maple drive", "roofing", "kitchn", "bathrom remodel"]
+
+
+@dataclass
+class Seeded:
+    lead_ids: List[str]
+    estimate_ids: List[str]
+    project_ids: List[str]
+
+
+def _timestamp(rng: random.Random) -> datetime:
+    return datetime(2024, 1, 1) + timedelta(seconds=rng.randrange(2 * 365 * 86400))
+
+
+def lead_doc(rng: random.Random, i: int) -> dict:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    created = _timestamp(rng)
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))), "name": f"{first} {last}",
+        "email": f"{first}.{last}.{i}@example.com".lower(), "phone": f"555{i:07d}",
+        "address": f"{rng.randrange(1, 9999)} {rng.choice(STREETS)}", "project_type": rng.choice(PROJECT_TYPES),
+        "description": rng.choice(["Kitchen remodel", "Bathroom remodel", "New deck", "Roof repair", "Basement"]),
+        "status": rng.choice(LEAD_STATUSES), "source": rng.choice(LEAD_SOURCES),
+        "estimated_budget": float(rng.randrange(5, 200) * 1000), "notes": None,
+        "created_at": created, "updated_at": created,
+    }
+
+
+def project_doc(rng: random.Random, i: int) -> dict:
+    created = _timestamp(rng)
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))), "name": f"{rng.choice(LAST_NAMES)} project {i}",
+        "description": rng.choice(["Kitchen remodel", "Office fit-out", "Deck and patio", "Roof replacement"]),
+        "address": f"{rng.randrange(1, 9999)} {rng.choice(STREETS)}", "client_id": f"client-{i % 1000}",
+        "status": "active", "project_type": rng.choice(PROJECT_TYPES), "estimated_cost": 0.0,
+        "actual_cost": 0.0, "start_date": None, "end_date": None, "created_at": created, "updated_at": created,
+    }
+
+
+def material_doc(rng: random.Random, i: int) -> dict:
+    created = _timestamp(rng)
+    category = rng.choice(CATEGORIES)
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))), "name": f"{category.title()} item {i}",
+        "category": category, "unit": "each", "cost_per_unit": round(rng.uniform(1, 250), 2),
+        "supplier": rng.choice(["Acme Supply", "BuildCo", "Northside Lumber"]), "description": None,
+        "created_at": created, "updated_at": created,
+    }
+
+
+def estimate_doc(rng: random.Random, project_id: str, materials: List[dict]) -> dict:
+    created = _timestamp(rng)
+    picked = rng.sample(materials, LINE_ITEMS)
+    line_items = []
+    for material in picked:
+        quantity = float(rng.randrange(1, 50))
+        line_items.append({
+            "material_id": material["id"], "quantity": quantity, "unit_cost": material["cost_per_unit"],
+            "extended_cost": round(quantity * material["cost_per_unit"], 2), "price_source": "catalog",
+        })
+    materials_cost = round(sum(item["extended_cost"] for item in line_items), 2)
+    labor, overhead, profit = materials_cost * 0.6, materials_cost * 0.1, materials_cost * 0.15
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))), "project_id": project_id, "lead_id": None,
+        "description": rng.choice(["Deck", "Kitchen cabinets", "Roof", "Drywall and paint"]),
+        "total_cost": round(materials_cost + labor + overhead + profit, 2), "materials_cost": materials_cost,
+        "labor_cost": labor, "overhead_cost": overhead, "profit_margin": profit, "line_items": line_items,
+        "material_ids": [material["id"] for material in picked], "status": rng.choice(ESTIMATE_STATUSES),
+        "created_at": created, "updated_at": created,
+    }
+
+
+async def insert_batched(repository, docs) -> List[str]:
+    ids, batch = [], []
+    for doc in docs:
+        batch.append(doc)
+        ids.append(doc["id"])
+        if len(batch) >= SEED_BATCH_SIZE:
+            await repository.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await repository.insert_many(batch, ordered=False)
+    return ids
+
+
+async def seed(repositories, leads: int, estimates: int, rng: random.Random) -> Seeded:
+    # Documents carry the same derived fields the services write.
+    from dedup import with_dedup_keys
+    from search import with_search_grams
+
+    materials = [with_search_grams("materials", material_doc(rng, i)) for i in range(MATERIAL_COUNT)]
+    await insert_batched(repositories["materials"], materials)
+    project_count = max(1, estimates // ESTIMATES_PER_PROJECT)
+    project_ids = await insert_batched(
+        repositories["projects"], (with_search_grams("projects", project_doc(rng, i)) for i in range(project_count))
+    )
+    lead_ids = await insert_batched(
+        repositories["leads"], (with_dedup_keys(with_search_grams("leads", lead_doc(rng, i))) for i in range(leads))
+    )
+    estimate_ids = await insert_batched(
+        repositories["estimates"], (estimate_doc(rng, rng.choice(project_ids), materials) for _ in range(estimates))
+    )
+    return Seeded(lead_ids, estimate_ids, project_ids)
+
+
+# name -> (builds (method, url, json body) for one request, needs a real mongod)
+Request = Tuple[str, str, Optional[dict]]
+
+
+def workloads(seeded: Seeded, rng: random.Random) -> Dict[str, Tuple[Callable[[], Request], bool]]:
+    counter = iter(range(10**9))
+
+    def new_lead() -> Request:
+        i = next(counter)
+        return "POST", "/api/leads", {
+            "name": f"Bench Lead {i}", "email": f"bench-{uuid.uuid4().hex}@example.com",
+            "phone": f"+1 (444) {i % 10**7:07d}", "address": f"{i} Benchmark Way", "project_type": "residential",
+        }
+
+    return {
+        "list_leads": (lambda: ("GET", "/api/leads?limit=50", None), False),
+        "list_leads_filtered": (lambda: ("GET", f"/api/leads?limit=50&status={rng.choice(LEAD_STATUSES)}", None), False),
+        "list_leads_full": (lambda: ("GET", "/api/leads?limit=50&view=full", None), False),
+        "get_lead": (lambda: ("GET", f"/api/leads/{rng.choice(seeded.lead_ids)}", None), False),
+        "create_lead": (new_lead, False),
+        "patch_lead": (lambda: (
+            "PATCH", f"/api/leads/{rng.choice(seeded.lead_ids)}", {"status": rng.choice(LEAD_STATUSES)}
+        ), False),
+        "list_estimates": (lambda: ("GET", "/api/estimates?limit=50", None), False),
+        "list_estimates_expand": (lambda: ("GET", "/api/estimates?limit=50&expand=project", None), True),
+        "get_estimate": (lambda: ("GET", f"/api/estimates/{rng.choice(seeded.estimate_ids)}", None), False),
+        "search": (lambda: ("GET", f"/api/search?q={rng.choice(SEARCH_TERMS)}&limit=20", None), False),
+        "dashboard_stats": (lambda: ("GET", "/api/dashboard/stats", None), False),
+    }
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    # Nearest rank, so small samples report latencies that actually happened.
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+async def run_workload(client, build: Callable[[], Request], requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            method, url, body = build()
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {before['throughput_rps']:.1f} -> {result['throughput_rps']:.1f} req/s"
+            )
+    return regressions
+
+
+async def open_database(args):
+    if args.memory:
+        return None, None
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    await client.drop_database(args.db_name)
+    return client[args.db_name], client
+
+
+async def main_async(args) -> int:
+    import httpx
+
+    # server reads these at import time; the client it builds is never used.
+    backend = "memory" if args.memory else "mongo"
+    os.environ["STORAGE_BACKEND"] = backend
+    os.environ.setdefault("MONGO_URL", args.mongo_url)
+    os.environ.setdefault("DB_NAME", args.db_name)
+    import server
+
+    db, client = await open_database(args)
+    server.init_services(db, backend)
+    if db is not None:
+        await server.ensure_indexes(db)
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    seeded = await seed(server.repositories, args.leads, args.estimates, rng)
+    print(f"seeded {args.leads} leads, {args.estimates} estimates in {time.perf_counter() - started:.1f}s")
+
+    selected = set(args.only.split(",")) if args.only else None
+    results: Dict[str, dict] = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        for name, (build, needs_mongod) in workloads(seeded, rng).items():
+            if (selected and name not in selected) or (needs_mongod and args.memory):
+                continue
+            if args.warmup:
+                await run_workload(http, build, args.warmup, min(args.concurrency, args.warmup))
+            results[name] = await run_workload(http, build, args.requests, args.concurrency)
+    if client is not None:
+        await client.drop_database(args.db_name)
+        client.close()
+
+    print(f"{'workload':<24}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, result in results.items():
+        print(
+            f"{name:<24}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}"
+        )
+
+    meta = {
+        "backend": "memory" if args.memory else "mongod",
+        "leads": args.leads,
+        "estimates": args.estimates,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps({"meta": meta, "results": results}, indent=2) + "\n")
+        print(f"baseline written to {args.save_baseline}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        differs = {key: value for key, value in meta.items() if baseline["meta"].get(key) != value}
+        if differs:
+            print(f"warning: baseline was recorded with different settings: {differs}")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="crewlo_bench", help="dropped before and after the run")
+    parser.add_argument("--memory", action="store_true", help="use the in-memory backend instead of a mongod")
+    parser.add_argument("--leads", type=int, default=10000)
+    parser.add_argument("--estimates", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per workload")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per workload")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--only", help="comma-separated workload names")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="JSON file from --save-baseline to compare against")
+    parser.add_argument("--save-baseline", help="write this run's results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed fractional slowdown")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
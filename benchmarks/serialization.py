@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""CPU cost per document of the list-endpoint read path, before and after.
+
+"before" replays what the list routes used to do: build each model with full
+validation, then let FastAPI's response_model dump, re-validate and
+JSON-encode the list. "after" is the current path: model_construct on
+projected documents plus a single encoder pass.
+
+    python benchmarks/serialization.py --docs 1000 --repeat 20
+
+Reference run (CPython 3.11.7, pydantic 2.14.1, orjson 3.8.3, one x86_64
+Xeon core), in us/doc:
+
+    Lead        20.08 -> 11.32   (1.8x)
+    Estimate    63.98 -> 18.24   (3.5x, 10 line items)
+
+Lead gains least: its fields are flat scalars, so validation was a smaller
+share of the cost than the encoding that remains.
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from models import Estimate, Lead  # noqa: E402
+from serialization import construct_all, dumps, orjson  # noqa: E402
+
+
+def lead_doc(i: int) -> dict:
+    now = datetime(2026, 1, 1) + timedelta(seconds=i)
+    return {
+        "id": str(uuid.uuid4()), "name": f"Lead {i}", "email": f"lead{i}@example.com",
+        "phone": "+1-555-0100", "address": f"{i} Main St", "project_type": "residential",
+        "description": "Kitchen remodel", "status": "new", "source": "website",
+        "estimated_budget": 25000.0, "notes": None, "created_at": now, "updated_at": now,
+    }
+
+
+def estimate_doc(i: int) -> dict:
+    now = datetime(2026, 1, 1) + timedelta(seconds=i)
+    line_items = [
+        {"material_id": f"m{j}", "quantity": 4.0, "unit_cost": 3.5, "extended_cost": 14.0, "price_source": "catalog"}
+        for j in range(10)
+    ]
+    return {
+        "id": str(uuid.uuid4()), "project_id": str(uuid.uuid4()), "lead_id": None,
+        "description": "Deck", "total_cost": 1140.0, "materials_cost": 140.0, "labor_cost": 800.0,
+        "overhead_cost": 100.0, "profit_margin": 100.0, "line_items": line_items,
+        "material_ids": [f"m{j}" for j in range(10)], "status": "draft",
+        "created_at": now, "updated_at": now,
+    }
+
+
+def before(model, docs: List[dict]) -> bytes:
+    adapter = TypeAdapter(List[model])
+    models = [model(**doc) for doc in docs]
+    validated = adapter.validate_python([item.model_dump() for item in models])
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def after(model, docs: List[dict]) -> bytes:
+    return dumps(construct_all(model, docs))
+
+
+def per_doc_us(fn, model, docs: List[dict], repeat: int) -> float:
+    fn(model, docs)  # warm up
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(model, docs)
+        best = min(best, time.perf_counter() - started)
+    return best / len(docs) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if orjson else 'json'}  docs: {args.docs}  best of {args.repeat}")
+    print(f"{'model':<10}{'before us/doc':>15}{'after us/doc':>15}{'speedup':>10}")
+    for model, make in ((Lead, lead_doc), (Estimate, estimate_doc)):
+        docs = [make(i) for i in range(args.docs)]
+        assert json.loads(before(model, docs)) == json.loads(after(model, docs))
+        slow = per_doc_us(before, model, docs, args.repeat)
+        fast = per_doc_us(after, model, docs, args.repeat)
+        print(f"{model.__name__:<10}{slow:>15.2f}{fast:>15.2f}{slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
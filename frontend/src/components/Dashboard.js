@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { projectsApi, leadsApi, estimatesApi } from '../services/api';
+import { dashboardApi } from '../services/api';
 
 const Dashboard = () => {
   const navigate = useNavigate();
@@ -20,23 +20,16 @@ const Dashboard = () => {
 
   const fetchStats = async () => {
     try {
-      const [projectsRes, leadsRes, estimatesRes] = await Promise.all([
-        projectsApi.getAll(),
-        leadsApi.getAll(),
-        estimatesApi.getAll()
-      ]);
-
-      const projects = projectsRes.data;
-      const leads = leadsRes.data;
-      const estimates = estimatesRes.data;
+      const response = await dashboardApi.getStats();
+      const data = response.data;
 
       setStats({
-        totalProjects: projects.length,
-        activeProjects: projects.filter(p => p.status === 'active').length,
-        totalLeads: leads.length,
-        newLeads: leads.filter(l => l.status === 'new').length,
-        totalEstimates: estimates.length,
-        pendingEstimates: estimates.filter(e => e.status === 'draft').length
+        totalProjects: data.total_projects,
+        activeProjects: data.active_projects,
+        totalLeads: data.total_leads,
+        newLeads: data.new_leads,
+        totalEstimates: data.total_estimates,
+        pendingEstimates: data.pending_estimates
       });
     } catch (error) {
       console.error('Error fetching stats:', error);
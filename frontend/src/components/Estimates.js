@@ -1,12 +1,14 @@
 import React, { useState, useEffect } from 'react';
 import { useSearchParams } from 'react-router-dom';
-import { estimatesApi, projectsApi } from '../services/api';
+import { estimatesApi, projectsApi, getAllPages } from '../services/api';
+import LoadMore, { useCursorList } from './LoadMore';
 
 const Estimates = () => {
   const [searchParams] = useSearchParams();
-  const [estimates, setEstimates] = useState([]);
+  // Parent project names come back joined on each estimate
+  const estimateList = useCursorList(estimatesApi.getAll, { expand: 'project' }, 'estimates');
+  const { items: estimates, loading, reload: fetchData } = estimateList;
   const [projects, setProjects] = useState([]);
-  const [loading, setLoading] = useState(true);
   const [showForm, setShowForm] = useState(false);
   const [editingEstimate, setEditingEstimate] = useState(null);
   const [formData, setFormData] = useState({
@@ -27,20 +29,14 @@ const Estimates = () => {
     }
   }, [searchParams]);
 
-  const fetchData = async () => {
-    try {
-      const [estimatesRes, projectsRes] = await Promise.all([
-        estimatesApi.getAll(),
-        projectsApi.getAll()
-      ]);
-      setEstimates(estimatesRes.data);
-      setProjects(projectsRes.data);
-    } catch (error) {
-      console.error('Error fetching data:', error);
-    } finally {
-      setLoading(false);
+  // Project options are only needed by the form
+  useEffect(() => {
+    if (showForm && projects.length === 0) {
+      getAllPages(projectsApi.getAll, { fields: 'name' })
+        .then(setProjects)
+        .catch((error) => console.error('Error fetching projects:', error));
     }
-  };
+  }, [showForm, projects.length]);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -67,7 +63,9 @@ const Estimates = () => {
     }
   };
 
-  const handleEdit = (estimate) => {
+  // List rows omit line items; load the full estimate for the edit form
+  const handleEdit = async (summary) => {
+    const { data: estimate } = await estimatesApi.getById(summary.id);
     setEditingEstimate(estimate);
     setFormData({
       project_id: estimate.project_id,
@@ -102,9 +100,8 @@ const Estimates = () => {
     }
   };
 
-  const getProjectName = (projectId) => {
-    const project = projects.find(p => p.id === projectId);
-    return project ? project.name : 'Unknown Project';
+  const getProjectName = (estimate) => {
+    return estimate.project ? estimate.project.name : 'Unknown Project';
   };
 
   if (loading) {
@@ -252,7 +249,7 @@ const Estimates = () => {
           {estimates.map((estimate) => (
             <div key={estimate.id} className="bg-white rounded-lg shadow p-6">
               <div className="flex justify-between items-start mb-4">
-                <h3 className="text-lg font-semibold text-gray-900">{getProjectName(estimate.project_id)}</h3>
+                <h3 className="text-lg font-semibold text-gray-900">{getProjectName(estimate)}</h3>
                 <span className={`px-2 py-1 text-xs rounded-full ${getStatusColor(estimate.status)}`}>
                   {estimate.status}
                 </span>
@@ -298,6 +295,8 @@ const Estimates = () => {
           ))}
         </div>
 
+        <LoadMore list={estimateList} />
+
         {estimates.length === 0 && (
           <div className="text-center py-12">
             <p className="text-gray-500 text-lg">No estimates found</p>
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useSearchParams } from 'react-router-dom';
-import { projectsApi, leadsApi } from '../services/api';
+import { projectsApi, leadsApi, getAllPages } from '../services/api';
 
 const Invoices = () => {
   const [searchParams] = useSearchParams();
@@ -59,8 +59,7 @@ const Invoices = () => {
 
   const fetchData = async () => {
     try {
-      const projectsRes = await projectsApi.getAll();
-      setProjects(projectsRes.data);
+      setProjects(await getAllPages(projectsApi.getAll, { fields: 'name' }));
     } catch (error) {
       console.error('Error fetching data:', error);
     }
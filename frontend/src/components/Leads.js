@@ -1,11 +1,12 @@
 import React, { useState, useEffect } from 'react';
 import { useSearchParams } from 'react-router-dom';
 import { leadsApi } from '../services/api';
+import LoadMore, { useCursorList } from './LoadMore';
 
 const Leads = () => {
   const [searchParams] = useSearchParams();
-  const [leads, setLeads] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const leadList = useCursorList(leadsApi.getAll, undefined, 'leads');
+  const { items: leads, loading, reload: fetchLeads } = leadList;
   const [showForm, setShowForm] = useState(false);
   const [editingLead, setEditingLead] = useState(null);
   const [formData, setFormData] = useState({
@@ -28,17 +29,6 @@ const Leads = () => {
     }
   }, [searchParams]);
 
-  const fetchLeads = async () => {
-    try {
-      const response = await leadsApi.getAll();
-      setLeads(response.data);
-    } catch (error) {
-      console.error('Error fetching leads:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
-
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -62,6 +52,11 @@ const Leads = () => {
       });
       fetchLeads();
     } catch (error) {
+      // New leads matching an existing one are rejected with its id
+      if (error.response && error.response.status === 409) {
+        window.alert(`This lead already exists (${error.response.data.detail.reason}).`);
+        return;
+      }
       console.error('Error saving lead:', error);
     }
   };
@@ -303,6 +298,8 @@ const Leads = () => {
           ))}
         </div>
 
+        <LoadMore list={leadList} />
+
         {leads.length === 0 && (
           <div className="text-center py-12">
             <p className="text-gray-500 text-lg">No leads found</p>
@@ -0,0 +1,49 @@
+import React, { useState } from 'react';
+import { pageCursor } from '../services/api';
+
+// A list read a page at a time: reload() fetches the first page, later
+// pages (named by X-Next-Cursor) are appended by loadMore()
+export const useCursorList = (getAll, params, label) => {
+  const [items, setItems] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loading, setLoading] = useState(true);
+
+  const fetchPage = async (after) => {
+    try {
+      const response = await getAll(after ? { ...params, after } : params);
+      setItems((loaded) => (after ? [...loaded, ...response.data] : response.data));
+      setNextCursor(pageCursor(response));
+    } catch (error) {
+      console.error(`Error fetching ${label}:`, error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  return {
+    items,
+    loading,
+    hasMore: nextCursor !== null,
+    reload: () => fetchPage(),
+    loadMore: () => fetchPage(nextCursor),
+  };
+};
+
+const LoadMore = ({ list }) => {
+  if (!list.hasMore) {
+    return null;
+  }
+
+  return (
+    <div className="text-center mt-6">
+      <button
+        onClick={list.loadMore}
+        className="bg-gray-300 hover:bg-gray-400 text-gray-800 py-2 px-4 rounded-md transition-colors"
+      >
+        Load more
+      </button>
+    </div>
+  );
+};
+
+export default LoadMore;
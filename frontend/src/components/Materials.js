@@ -1,9 +1,10 @@
 import React, { useState, useEffect } from 'react';
 import { materialsApi } from '../services/api';
+import LoadMore, { useCursorList } from './LoadMore';
 
 const Materials = () => {
-  const [materials, setMaterials] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const materialList = useCursorList(materialsApi.getAll, undefined, 'materials');
+  const { items: materials, loading, reload: fetchMaterials } = materialList;
   const [showForm, setShowForm] = useState(false);
   const [editingMaterial, setEditingMaterial] = useState(null);
   const [formData, setFormData] = useState({
@@ -19,17 +20,6 @@ const Materials = () => {
     fetchMaterials();
   }, []);
 
-  const fetchMaterials = async () => {
-    try {
-      const response = await materialsApi.getAll();
-      setMaterials(response.data);
-    } catch (error) {
-      console.error('Error fetching materials:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
-
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -279,6 +269,8 @@ const Materials = () => {
           ))}
         </div>
 
+        <LoadMore list={materialList} />
+
         {materials.length === 0 && (
           <div className="text-center py-12">
             <p className="text-gray-500 text-lg">No materials found</p>
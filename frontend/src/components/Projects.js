@@ -1,11 +1,12 @@
 import React, { useState, useEffect } from 'react';
 import { useSearchParams } from 'react-router-dom';
 import { projectsApi } from '../services/api';
+import LoadMore, { useCursorList } from './LoadMore';
 
 const Projects = () => {
   const [searchParams] = useSearchParams();
-  const [projects, setProjects] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const projectList = useCursorList(projectsApi.getAll, undefined, 'projects');
+  const { items: projects, loading, reload: fetchProjects } = projectList;
   const [showForm, setShowForm] = useState(false);
   const [editingProject, setEditingProject] = useState(null);
   const [formData, setFormData] = useState({
@@ -27,17 +28,6 @@ const Projects = () => {
     }
   }, [searchParams]);
 
-  const fetchProjects = async () => {
-    try {
-      const response = await projectsApi.getAll();
-      setProjects(response.data);
-    } catch (error) {
-      console.error('Error fetching projects:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
-
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -252,6 +242,8 @@ const Projects = () => {
           ))}
         </div>
 
+        <LoadMore list={projectList} />
+
         {projects.length === 0 && (
           <div className="text-center py-12">
             <p className="text-gray-500 text-lg">No projects found</p>
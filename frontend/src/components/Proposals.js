@@ -1,12 +1,14 @@
 import React, { useState, useEffect } from 'react';
 import { useSearchParams } from 'react-router-dom';
-import { proposalsApi, estimatesApi } from '../services/api';
+import { proposalsApi, estimatesApi, getAllPages } from '../services/api';
+import LoadMore, { useCursorList } from './LoadMore';
 
 const Proposals = () => {
   const [searchParams] = useSearchParams();
-  const [proposals, setProposals] = useState([]);
+  // Each proposal comes back with its estimate and that estimate's project
+  const proposalList = useCursorList(proposalsApi.getAll, { expand: 'estimate.project' }, 'proposals');
+  const { items: proposals, loading, reload: fetchData } = proposalList;
   const [estimates, setEstimates] = useState([]);
-  const [loading, setLoading] = useState(true);
   const [showForm, setShowForm] = useState(false);
   const [editingProposal, setEditingProposal] = useState(null);
   const [showShareModal, setShowShareModal] = useState(false);
@@ -27,20 +29,14 @@ const Proposals = () => {
     }
   }, [searchParams]);
 
-  const fetchData = async () => {
-    try {
-      const [proposalsRes, estimatesRes] = await Promise.all([
-        proposalsApi.getAll(),
-        estimatesApi.getAll()
-      ]);
-      setProposals(proposalsRes.data);
-      setEstimates(estimatesRes.data);
-    } catch (error) {
-      console.error('Error fetching data:', error);
-    } finally {
-      setLoading(false);
+  // Estimate options are only needed by the form
+  useEffect(() => {
+    if (showForm && estimates.length === 0) {
+      getAllPages(estimatesApi.getAll, { fields: 'description,total_cost' })
+        .then(setEstimates)
+        .catch((error) => console.error('Error fetching estimates:', error));
     }
-  };
+  }, [showForm, estimates.length]);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -65,7 +61,9 @@ const Proposals = () => {
     }
   };
 
-  const handleEdit = (proposal) => {
+  // The list carries a summary shape; fetch the full proposal before editing or sharing
+  const handleEdit = async (summary) => {
+    const { data: proposal } = await proposalsApi.getById(summary.id);
     setEditingProposal(proposal);
     setFormData({
       estimate_id: proposal.estimate_id,
@@ -88,7 +86,8 @@ const Proposals = () => {
     }
   };
 
-  const handleShare = (proposal) => {
+  const handleShare = async (summary) => {
+    const { data: proposal } = await proposalsApi.getById(summary.id);
     setSelectedProposal(proposal);
     setShowShareModal(true);
   };
@@ -148,9 +147,13 @@ Valid until: ${selectedProposal.valid_until ? new Date(selectedProposal.valid_un
     }
   };
 
-  const getEstimateInfo = (estimateId) => {
-    const estimate = estimates.find(e => e.id === estimateId);
-    return estimate ? `$${estimate.total_cost.toLocaleString()}` : 'Unknown Estimate';
+  const getEstimateInfo = (proposal) => {
+    const { estimate } = proposal;
+    if (!estimate) {
+      return 'Unknown Estimate';
+    }
+    const total = `$${estimate.total_cost.toLocaleString()}`;
+    return estimate.project ? `${estimate.project.name} - ${total}` : total;
   };
 
   if (loading) {
@@ -323,11 +326,11 @@ Valid until: ${selectedProposal.valid_until ? new Date(selectedProposal.valid_un
                   {proposal.status}
                 </span>
               </div>
-              <p className="text-gray-600 mb-4 text-sm line-clamp-3">{proposal.content}</p>
+              <p className="text-gray-600 mb-4 text-sm line-clamp-3">{proposal.content_preview}</p>
               <div className="space-y-2 mb-4">
                 <div className="flex justify-between text-sm">
                   <span>Estimate Value:</span>
-                  <span className="font-semibold">{getEstimateInfo(proposal.estimate_id)}</span>
+                  <span className="font-semibold">{getEstimateInfo(proposal)}</span>
                 </div>
                 {proposal.valid_until && (
                   <div className="flex justify-between text-sm">
@@ -362,6 +365,8 @@ Valid until: ${selectedProposal.valid_until ? new Date(selectedProposal.valid_un
           ))}
         </div>
 
+        <LoadMore list={proposalList} />
+
         {proposals.length === 0 && (
           <div className="text-center py-12">
             <p className="text-gray-500 text-lg">No proposals found</p>
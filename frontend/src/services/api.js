@@ -10,49 +10,79 @@ const api = axios.create({
   },
 });
 
+// List endpoints return a page at a time; X-Next-Cursor names the next one
+export const pageCursor = (response) => response.headers['x-next-cursor'] || null;
+
+// Follows the cursor to the last page, for pickers that need every option
+export const getAllPages = async (getAll, params = {}) => {
+  const items = [];
+  let after = null;
+  do {
+    const response = await getAll(after ? { ...params, after } : params);
+    items.push(...response.data);
+    after = pageCursor(response);
+  } while (after);
+  return items;
+};
+
 // Projects API
 export const projectsApi = {
-  getAll: () => api.get('/projects'),
+  getAll: (params) => api.get('/projects', { params }),
   getById: (id) => api.get(`/projects/${id}`),
   create: (data) => api.post('/projects', data),
   update: (id, data) => api.put(`/projects/${id}`, data),
+  patch: (id, data) => api.patch(`/projects/${id}`, data),
   delete: (id) => api.delete(`/projects/${id}`),
 };
 
 // Leads API
 export const leadsApi = {
-  getAll: () => api.get('/leads'),
+  getAll: (params) => api.get('/leads', { params }),
   getById: (id) => api.get(`/leads/${id}`),
   create: (data) => api.post('/leads', data),
   update: (id, data) => api.put(`/leads/${id}`, data),
+  patch: (id, data) => api.patch(`/leads/${id}`, data),
   delete: (id) => api.delete(`/leads/${id}`),
 };
 
 // Materials API
 export const materialsApi = {
-  getAll: () => api.get('/materials'),
+  getAll: (params) => api.get('/materials', { params }),
   getById: (id) => api.get(`/materials/${id}`),
   create: (data) => api.post('/materials', data),
   update: (id, data) => api.put(`/materials/${id}`, data),
+  patch: (id, data) => api.patch(`/materials/${id}`, data),
   delete: (id) => api.delete(`/materials/${id}`),
 };
 
 // Estimates API
 export const estimatesApi = {
-  getAll: () => api.get('/estimates'),
+  getAll: (params) => api.get('/estimates', { params }),
   getById: (id) => api.get(`/estimates/${id}`),
   create: (data) => api.post('/estimates', data),
   update: (id, data) => api.put(`/estimates/${id}`, data),
+  patch: (id, data) => api.patch(`/estimates/${id}`, data),
   delete: (id) => api.delete(`/estimates/${id}`),
 };
 
 // Proposals API
 export const proposalsApi = {
-  getAll: () => api.get('/proposals'),
+  getAll: (params) => api.get('/proposals', { params }),
   getById: (id) => api.get(`/proposals/${id}`),
   create: (data) => api.post('/proposals', data),
   update: (id, data) => api.put(`/proposals/${id}`, data),
+  patch: (id, data) => api.patch(`/proposals/${id}`, data),
   delete: (id) => api.delete(`/proposals/${id}`),
 };
 
+// Search API
+export const searchApi = {
+  search: (q, params) => api.get('/search', { params: { q, ...params } }),
+};
+
+// Dashboard API
+export const dashboardApi = {
+  getStats: () => api.get('/dashboard/stats'),
+};
+
 export default api;
\ No newline at end of file
@@ -0,0 +1,62 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend modules import each other by bare name, as when run from backend/.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+# Everything runs on the in-memory backend; server needs no MongoDB then.
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ.setdefault("CHANGE_FEED", "off")
+os.environ.setdefault("ORPHAN_SWEEP_INTERVAL", "0")
+
+PROJECT = {"name": "Garcia kitchen", "address": "12 Oak Avenue", "client_id": "c1", "project_type": "residential"}
+LEAD = {"name": "Ana Smith", "email": "ana@example.com", "phone": "555-000-1234", "address": "1 Main Street",
+        "project_type": "residential"}
+
+
+def create(client, resource, body):
+    response = client.post(f"/api/{resource}", json=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def estimate_body(project_id, **fields):
+    return {
+        "project_id": project_id, "description": "Cabinets", "materials_cost": 100.0, "labor_cost": 50.0,
+        "overhead_cost": 10.0, "profit_margin": 20.0, **fields,
+    }
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def repositories():
+    from repository import memory_repositories
+
+    return memory_repositories()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """The API module bound to fresh in-memory storage, cache and list ETags."""
+    import server
+    from cache import LRUCache
+    from etag import ListEtags
+
+    monkeypatch.setattr(server, "cache", LRUCache(max_entries=1000, ttl_seconds=60))
+    monkeypatch.setattr(server, "list_etags", ListEtags(ttl_seconds=60))
+    server.init_services(None, "memory")
+    return server
+
+
+@pytest.fixture
+def client(server):
+    from fastapi.testclient import TestClient
+
+    # Not entered as a context manager, so startup tasks never run.
+    return TestClient(server.app)
@@ -0,0 +1,16 @@
+"""Bulk endpoints report a result per item."""
+from .conftest import PROJECT, create
+
+
+def test_unordered_bulk_update_reports_each_item(client):
+    project = create(client, "projects", PROJECT)
+    body = {"ordered": False, "items": [
+        {"id": "missing", "changes": {"status": "completed"}},
+        {"id": project["id"], "changes": {"status": "completed"}},
+    ]}
+
+    result = client.patch("/api/projects/bulk", json=body).json()
+
+    assert (result["succeeded"], result["failed"]) == (1, 1)
+    assert [item["status"] for item in result["results"]] == ["not_found", "ok"]
+    assert client.get(f"/api/projects/{project['id']}").json()["status"] == "completed"
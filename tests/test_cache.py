@@ -0,0 +1,67 @@
+"""Read-through document cache: hits, misses, invalidation."""
+from datetime import datetime
+
+import anyio
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+PROJECT = {"id": "p1", "name": "Old name", "created_at": datetime(2024, 1, 1), "updated_at": datetime(2024, 1, 1)}
+
+
+async def test_reads_hit_the_cache_until_invalidated(repositories):
+    from cache import LRUCache, cached_find_one, invalidate
+
+    cache, projects = LRUCache(), repositories["projects"]
+    await projects.insert_one(dict(PROJECT))
+
+    assert (await cached_find_one(cache, projects, "p1"))["name"] == "Old name"
+    await projects.set_fields("p1", {"name": "New name"})
+    assert (await cached_find_one(cache, projects, "p1"))["name"] == "Old name"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    await invalidate(cache, "projects", ["p1"])
+    assert (await cached_find_one(cache, projects, "p1"))["name"] == "New name"
+    assert await cached_find_one(cache, projects, "missing") is None
+    assert cache.stats()["entries"] == 1
+
+
+async def test_lru_evicts_the_least_recent_and_expires_entries():
+    from cache import LRUCache
+
+    cache = LRUCache(max_entries=2)
+    await cache.set("a", {"id": "a"})
+    await cache.set("b", {"id": "b"})
+    await cache.get("a")
+    await cache.set("c", {"id": "c"})
+    assert await cache.get("b") is None and cache.evictions == 1
+
+    expired = LRUCache(ttl_seconds=0)
+    await expired.set("a", {"id": "a"})
+    assert await expired.get("a") is None and expired.expirations == 1
+
+
+async def test_read_overlapping_a_write_does_not_cache_the_old_document(repositories, monkeypatch):
+    from cache import LRUCache, cached_find_one, invalidate
+
+    cache, projects = LRUCache(), repositories["projects"]
+    await projects.insert_one(dict(PROJECT))
+    read, fetched, resume = projects.get, anyio.Event(), anyio.Event()
+
+    async def slow_get(doc_id):
+        doc = await read(doc_id)
+        fetched.set()
+        await resume.wait()
+        return doc
+
+    monkeypatch.setattr(projects, "get", slow_get)
+    async with anyio.create_task_group() as tasks:
+        tasks.start_soon(cached_find_one, cache, projects, "p1")
+        await fetched.wait()
+        # The write and its invalidation land between the read and its cache.set
+        await projects.set_fields("p1", {"name": "New name"})
+        await invalidate(cache, "projects", ["p1"])
+        resume.set()
+    monkeypatch.undo()
+
+    assert (await cached_find_one(cache, projects, "p1"))["name"] == "New name"
@@ -0,0 +1,29 @@
+"""Deleting a parent takes its estimates and proposals with it."""
+from .conftest import PROJECT, create, estimate_body
+
+
+def test_bulk_delete_cascades_to_estimates_and_proposals(client):
+    project = create(client, "projects", PROJECT)
+    estimate = create(client, "estimates", estimate_body(project["id"]))
+    proposal = create(client, "proposals", {
+        "estimate_id": estimate["id"], "title": "Kitchen", "content": "Scope", "terms": "Net 30",
+    })
+
+    result = client.request("DELETE", "/api/projects/bulk", json={"ids": [project["id"]]}).json()
+
+    assert result["succeeded"] == 1
+    assert client.get(f"/api/estimates/{estimate['id']}").status_code == 404
+    assert client.get(f"/api/proposals/{proposal['id']}").status_code == 404
+
+
+def test_writes_pointing_at_a_missing_parent_are_rejected(client):
+    project = create(client, "projects", PROJECT)
+    estimate = create(client, "estimates", estimate_body(project["id"]))
+
+    assert client.post("/api/estimates", json=estimate_body("gone")).status_code == 400
+    assert client.patch(f"/api/estimates/{estimate['id']}", json={"project_id": "gone"}).status_code == 400
+    rejected = client.post("/api/proposals", json={
+        "estimate_id": "gone", "title": "Kitchen", "content": "Scope", "terms": "Net 30",
+    })
+    assert rejected.status_code == 400 and rejected.json()["detail"] == "Unknown estimate_id: gone"
+    assert client.get(f"/api/estimates/{estimate['id']}").json()["project_id"] == project["id"]
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import changes
+from changes import ChangeEvent, ChangeFeed, ChangeListener, _PollPosition
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def database():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()["changes"]
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def listener(database, events):
+    feed = ChangeFeed()
+
+    async def record(event):
+        events.append((event.operation, event.collection, event.doc_id))
+
+    feed.subscribe(record)
+    return ChangeListener(database, feed, collections=["leads"], mode="poll")
+
+
+def lead(doc_id, created_at, updated_at=None):
+    return {"id": doc_id, "created_at": created_at, "updated_at": updated_at or created_at}
+
+
+async def test_poll_walks_writes_sharing_one_timestamp_past_the_batch_size(database, listener, events, monkeypatch):
+    monkeypatch.setattr(changes, "POLL_BATCH_SIZE", 3)
+    old = datetime.utcnow() - timedelta(hours=1)
+    position = _PollPosition(old - timedelta(seconds=1), "")
+    stamp = datetime.utcnow().replace(microsecond=0)
+    await database.leads.insert_many([lead(f"l{i}", old, stamp) for i in range(8)])
+
+    await listener._poll("leads", position)
+    await listener._poll("leads", position)
+
+    assert events == [("update", "leads", f"l{i}") for i in range(8)]
+    assert (position.updated_at, position.last_id) == (stamp, "l7")
+
+
+async def test_poll_reports_inserts_and_deletes_of_young_documents(database, listener, events):
+    position = _PollPosition(datetime.utcnow() - timedelta(seconds=1), "")
+    await listener._poll("leads", position)
+
+    now = datetime.utcnow()
+    await database.leads.insert_one(lead("young", now))
+    await listener._poll("leads", position)
+    await database.leads.delete_one({"id": "young"})
+    await listener._poll("leads", position)
+
+    assert events == [("insert", "leads", "young"), ("delete", "leads", "young")]
+
+
+async def test_poll_sees_a_delete_despite_an_insert_in_the_same_interval(database, listener, events):
+    listener.delete_check_interval = 0
+    old = datetime.utcnow() - timedelta(hours=1)
+    await database.leads.insert_many([lead("a", old), lead("b", old)])
+    position = _PollPosition(datetime.utcnow(), "")
+    await listener._poll("leads", position)
+
+    await database.leads.delete_one({"id": "a"})
+    await database.leads.insert_one(lead("c", datetime.utcnow()))
+    await listener._poll("leads", position)
+
+    assert ("insert", "leads", "c") in events
+    assert ("invalidate", "leads", None) in events
+
+
+async def test_poll_counts_older_documents_only_every_delete_check_interval(database, listener, events):
+    old = datetime.utcnow() - timedelta(hours=1)
+    await database.leads.insert_many([lead("a", old), lead("b", old)])
+    position = _PollPosition(datetime.utcnow(), "")
+    await listener._poll("leads", position)
+
+    await database.leads.delete_one({"id": "a"})
+    await listener._poll("leads", position)
+    assert events == []
+
+    position.counted_at -= listener.delete_check_interval
+    await listener._poll("leads", position)
+    assert events == [("invalidate", "leads", None)]
+
+
+class CountingCollection:
+    def __init__(self, collection):
+        self.collection = collection
+        self.finds = 0
+
+    def find(self, *args, **kwargs):
+        self.finds += 1
+        return self.collection.find(*args, **kwargs)
+
+
+async def test_stream_batches_resolve_ids_without_a_lookup_per_event(database, listener, events):
+    await database.leads.insert_many([{"_id": 1, "id": "one"}, {"_id": 2, "id": "two"}])
+    leads = CountingCollection(database.leads)
+    listener.db = {"leads": leads}
+    update = {"operationType": "update", "ns": {"coll": "leads"}, "updateDescription": {"updatedFields": {"name": 1}}}
+    await listener._publish_changes([
+        {**update, "documentKey": {"_id": 1}},
+        {**update, "documentKey": {"_id": 2}},
+        {"operationType": "insert", "ns": {"coll": "leads"}, "documentKey": {"_id": 3}, "fullDocument": {"id": "three"}},
+    ])
+    await listener._publish_changes([{**update, "documentKey": {"_id": 3}}])
+
+    assert leads.finds == 1
+    assert events == [
+        ("update", "leads", "one"), ("update", "leads", "two"), ("insert", "leads", "three"),
+        ("update", "leads", "three"),
+    ]
+
+
+async def test_material_cost_change_on_the_feed_reprices_drafts(server):
+    from models import EstimateCreate, MaterialCreate, ProjectCreate
+
+    project = await server.project_service.create_project(
+        ProjectCreate(name="Deck", address="1 Main", client_id="c", project_type="residential")
+    )
+    material = await server.material_service.create_material(
+        MaterialCreate(name="Board", category="lumber", unit="each", cost_per_unit=2.0)
+    )
+    estimate = await server.estimate_service.create_estimate(EstimateCreate(
+        project_id=project.id, description="Deck", materials_cost=0, labor_cost=0, overhead_cost=0,
+        profit_margin=0, line_items=[{"material_id": material.id, "quantity": 5}],
+    ))
+    # As if someone changed the cost straight in the database
+    await server.repositories["materials"].set_many([(material.id, {"cost_per_unit": 4.0})])
+
+    await server.change_feed.publish(ChangeEvent("update", "materials", material.id, ["cost_per_unit"]))
+    await server.reprice_queue.join()
+
+    assert (await server.estimate_service.get_estimate(estimate.id)).materials_cost == 20.0
@@ -0,0 +1,71 @@
+"""Response compression: codec negotiation and the middleware."""
+import zlib
+
+import pytest
+
+BODY = b'{"rows": "' + b"x" * 4000 + b'"}'
+
+
+def test_negotiate_prefers_q_values_then_server_order():
+    from compression import negotiate
+
+    assert negotiate("gzip, br", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", ["zstd", "br", "gzip"]) == "gzip"
+    assert negotiate("*;q=0.1, gzip;q=0", ["br", "gzip"]) == "br"
+    assert negotiate("identity", ["br", "gzip"]) is None
+    assert negotiate("", ["gzip"]) is None
+
+
+@pytest.fixture
+def app_client():
+    from fastapi.testclient import TestClient
+    from starlette.applications import Starlette
+    from starlette.responses import Response, StreamingResponse
+    from starlette.routing import Route
+
+    from compression import CompressionMiddleware
+
+    async def large(request):
+        return Response(BODY, media_type="application/json", headers={"ETag": '"v1"'})
+
+    async def small(request):
+        return Response(b'{"ok": true}', media_type="application/json")
+
+    async def image(request):
+        return Response(BODY, media_type="image/png")
+
+    async def stream(request):
+        async def chunks():
+            for i in range(3):
+                yield f'{{"row": {i}}}\n'.encode() * 200
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    app = Starlette(routes=[Route(f"/{view.__name__}", view) for view in (large, small, image, stream)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_large_json_is_compressed_with_a_weak_etag(app_client):
+    response = app_client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.content == BODY
+
+
+def test_small_and_binary_bodies_pass_through(app_client):
+    for path in ("/small", "/image"):
+        response = app_client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+    assert "content-encoding" not in app_client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_streamed_bodies_are_compressed_chunk_by_chunk(app_client):
+    with app_client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert zlib.decompress(raw, 16 + zlib.MAX_WBITS).count(b"\n") == 600
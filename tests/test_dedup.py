@@ -0,0 +1,26 @@
+"""Duplicate leads on create."""
+from .conftest import LEAD, create
+
+
+def test_duplicate_lead_is_rejected_by_default_or_merged_on_request(client):
+    existing = create(client, "leads", LEAD)
+    again = {**LEAD, "email": "Ana@Example.com", "notes": "Called twice"}
+
+    rejected = client.post("/api/leads", json=again)
+    assert rejected.status_code == 409
+    assert rejected.json()["detail"]["existing_id"] == existing["id"]
+
+    merged = client.post("/api/leads", params={"dedup": "merge"}, json=again)
+    assert merged.headers["X-Merged-Into"] == existing["id"]
+    assert len(client.get("/api/leads").json()) == 1
+
+
+def test_shared_phone_needs_the_same_name_to_be_a_duplicate(client):
+    existing = create(client, "leads", LEAD)
+    household = {**LEAD, "name": "Maria Lopez", "email": "maria@example.com"}
+    same_person = {**LEAD, "name": "Ana  Smith", "email": "ana.smith@work.example"}
+
+    assert client.post("/api/leads", json=household).status_code == 200
+    rejected = client.post("/api/leads", json=same_person)
+    assert rejected.status_code == 409
+    assert rejected.json()["detail"]["existing_id"] == existing["id"]
@@ -0,0 +1,22 @@
+"""Conditional GETs on lists and details."""
+from .conftest import PROJECT, create
+
+
+def test_list_revalidates_with_etag_until_a_write(client):
+    project = create(client, "projects", PROJECT)
+    first = client.get("/api/projects")
+    etag = first.headers["ETag"]
+
+    assert client.get("/api/projects", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/projects", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+    client.patch(f"/api/projects/{project['id']}", json={"name": "Renamed"})
+    changed = client.get("/api/projects", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+
+def test_detail_revalidates_with_etag(client):
+    project = create(client, "projects", PROJECT)
+    etag = client.get(f"/api/projects/{project['id']}").headers["ETag"]
+
+    assert client.get(f"/api/projects/{project['id']}", headers={"If-None-Match": etag}).status_code == 304
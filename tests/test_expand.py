@@ -0,0 +1,58 @@
+"""?expand= embeds parent records into list rows."""
+import pytest
+
+from .conftest import PROJECT, create, estimate_body
+
+
+def test_estimates_embed_their_project_on_the_memory_backend(client):
+    project = create(client, "projects", PROJECT)
+    create(client, "estimates", estimate_body(project["id"]))
+
+    rows = client.get("/api/estimates", params={"expand": "project"}).json()
+
+    assert rows[0]["project"] == {
+        "id": project["id"], "name": "Garcia kitchen", "client_id": "c1", "status": "active",
+        "project_type": "residential",
+    }
+    assert client.get("/api/estimates", params={"expand": "client"}).status_code == 400
+
+
+def test_proposals_embed_estimate_and_project_with_sparse_fields(client):
+    project = create(client, "projects", PROJECT)
+    estimate = create(client, "estimates", estimate_body(project["id"]))
+    create(client, "proposals", {
+        "estimate_id": estimate["id"], "title": "Kitchen", "content": "Scope", "terms": "Net 30",
+    })
+
+    rows = client.get("/api/proposals", params={"expand": "estimate.project", "fields": "title"}).json()
+
+    assert set(rows[0]) == {"id", "title", "estimate"}
+    assert rows[0]["estimate"]["total_cost"] == estimate["total_cost"]
+    assert rows[0]["estimate"]["project"]["name"] == "Garcia kitchen"
+
+
+@pytest.mark.anyio
+async def test_servers_before_5_0_join_in_process(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import expand
+    from models import Estimate
+    from repository import motor_repositories
+    from services import fetch_list
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    repositories = motor_repositories(client["expand"])
+    await repositories["projects"].insert_one({"id": "p1", "name": "Garcia kitchen", "status": "active"})
+    await repositories["estimates"].insert_one({"id": "e1", "project_id": "p1", "description": "Cabinets"})
+
+    async def server_info():
+        return {"version": "4.4.0", "versionArray": [4, 4, 0, 0]}
+
+    monkeypatch.setattr(client, "server_info", server_info)
+    monkeypatch.setattr(expand, "_lookup_pipelines", {})
+    docs, _ = await fetch_list(
+        repositories["estimates"], Estimate, {}, 10, None, ["description"],
+        expand=expand.expansion("estimates", "project"), repositories=repositories,
+    )
+
+    project = {"id": "p1", "name": "Garcia kitchen", "status": "active"}
+    assert docs == [{"id": "e1", "description": "Cabinets", "project": project}]
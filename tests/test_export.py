@@ -0,0 +1,43 @@
+"""Streamed NDJSON and CSV exports."""
+import csv
+import io
+import json
+
+import pytest
+
+from .conftest import PROJECT, create
+
+
+def test_csv_export_has_a_header_and_one_row_per_match(client):
+    kept = create(client, "projects", {**PROJECT, "description": 'Says "hi", twice'})
+    create(client, "projects", {**PROJECT, "name": "Elsewhere", "client_id": "c2"})
+
+    response = client.get("/api/projects/export", params={"format": "csv", "client_id": "c1"})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="projects.csv"'
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header[:3] == ["id", "name", "description"]
+    assert [row[:3] for row in rows] == [[kept["id"], "Garcia kitchen", 'Says "hi", twice']]
+
+
+def test_ndjson_export_streams_every_document(client):
+    ids = [create(client, "projects", {**PROJECT, "name": f"Project {i}"})["id"] for i in range(3)]
+
+    response = client.get("/api/projects/export")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == ids
+    assert client.get("/api/nothing/export").status_code == 404
+
+
+@pytest.mark.anyio
+async def test_export_yields_one_chunk_per_batch(repositories):
+    from export import export_rows
+    from models import Project
+
+    await repositories["projects"].insert_many([Project(**PROJECT).model_dump() for _ in range(5)])
+
+    chunks = [chunk async for chunk in export_rows(repositories["projects"], Project, {}, "ndjson", batch_size=2)]
+
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
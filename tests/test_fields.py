@@ -0,0 +1,35 @@
+"""Sparse fieldsets and the default summary shapes of list endpoints."""
+from .conftest import PROJECT, create, estimate_body
+
+
+def test_fields_select_columns_and_keep_paging(client):
+    ids = [create(client, "projects", {**PROJECT, "name": f"Project {i}"})["id"] for i in range(3)]
+
+    first = client.get("/api/projects", params={"fields": "name", "limit": 2})
+    rest = client.get("/api/projects", params={"fields": "name", "limit": 2, "after": first.headers["X-Next-Cursor"]})
+
+    assert first.json() == [{"id": ids[0], "name": "Project 0"}, {"id": ids[1], "name": "Project 1"}]
+    assert [row["id"] for row in rest.json()] == ids[2:]
+    assert set(client.get("/api/projects", params={"fields": "name,created_at"}).json()[0]) == {
+        "id", "name", "created_at",
+    }
+    assert client.get("/api/projects", params={"fields": "name,secret"}).status_code == 400
+
+
+def test_estimates_and_proposals_list_a_summary_unless_asked_for_full(client):
+    project = create(client, "projects", PROJECT)
+    estimate = create(client, "estimates", estimate_body(
+        project["id"], line_items=[{"description": "Labor", "quantity": 1, "unit_cost": 5.0}],
+    ))
+    create(client, "proposals", {
+        "estimate_id": estimate["id"], "title": "Kitchen", "content": "x" * 500, "terms": "Net 30",
+    })
+
+    summary = client.get("/api/estimates").json()[0]
+    full = client.get("/api/estimates", params={"view": "full"}).json()[0]
+    proposal = client.get("/api/proposals").json()[0]
+
+    assert "line_items" not in summary and summary["total_cost"] == estimate["total_cost"]
+    assert len(full["line_items"]) == 1
+    assert "content" not in proposal and proposal["content_preview"] == "x" * 200
+    assert client.get("/api/proposals", params={"view": "full"}).json()[0]["content"] == "x" * 500
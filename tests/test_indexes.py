@@ -0,0 +1,63 @@
+"""Declared MongoDB indexes: creation and the drift report."""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def database():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()["indexes"]
+
+
+async def test_ensure_indexes_creates_every_declared_index_and_is_repeatable(database):
+    from indexes import INDEX_SPECS, ensure_indexes
+
+    await ensure_indexes(database)
+    await ensure_indexes(database)
+
+    for collection_name, indexes in INDEX_SPECS.items():
+        existing = await database[collection_name].index_information()
+        assert {index.document["name"] for index in indexes} <= set(existing)
+
+
+async def test_ensure_indexes_keeps_going_past_duplicate_ids(database, caplog):
+    from indexes import ensure_indexes
+
+    await database.projects.insert_many([{"id": "p1"}, {"id": "p1"}])
+
+    await ensure_indexes(database)
+
+    assert "Could not create indexes on projects" in caplog.text
+    assert "id_unique" in await database.leads.index_information()
+
+
+class StatsCollection:
+    """Serves $indexStats, which mongomock lacks, from canned access counts."""
+
+    def __init__(self, collection, ops):
+        self.collection = collection
+        self.ops = ops
+
+    async def index_information(self):
+        return await self.collection.index_information()
+
+    async def aggregate(self, pipeline):
+        for name, ops in self.ops.items():
+            yield {"name": name, "accesses": {"ops": ops}}
+
+
+async def test_index_report_lists_missing_undeclared_and_unused(database):
+    from indexes import ensure_indexes, index_report
+
+    await ensure_indexes(database)
+    await database.proposals.drop_index("status_created_at_id")
+    await database.proposals.create_index("title", name="title_adhoc")
+    ops = {"_id_": 0, "id_unique": 12, "title_adhoc": 0}
+    wrapped = {name: StatsCollection(database[name], ops) for name in await database.list_collection_names()}
+
+    report = (await index_report(wrapped))["proposals"]
+
+    assert report["missing"] == ["status_created_at_id"]
+    assert report["undeclared"] == ["title_adhoc"]
+    assert report["unused"] == ["title_adhoc"]
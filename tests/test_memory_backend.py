@@ -0,0 +1,167 @@
+"""The API end to end on STORAGE_BACKEND=memory: no MongoDB involved."""
+import json
+
+import pytest
+
+from .conftest import PROJECT, create, estimate_body
+
+
+def test_backend_setting_binds_memory_repositories(server):
+    from repository import MemoryRepository
+
+    assert server.db is None
+    assert all(isinstance(repository, MemoryRepository) for repository in server.repositories.values())
+
+
+def test_project_crud_round_trip(client):
+    project = create(client, "projects", PROJECT)
+
+    assert client.get(f"/api/projects/{project['id']}").json()["name"] == "Garcia kitchen"
+    patched = client.patch(f"/api/projects/{project['id']}", json={"status": "completed"}).json()
+    assert patched["status"] == "completed"
+    assert [item["id"] for item in client.get("/api/projects?status=completed").json()] == [project["id"]]
+
+    assert client.delete(f"/api/projects/{project['id']}").status_code == 200
+    assert client.get(f"/api/projects/{project['id']}").status_code == 404
+
+
+def test_dashboard_stats_count_by_status(client):
+    create(client, "projects", PROJECT)
+    lead = {"name": "Ana Smith", "email": "ana@example.com", "phone": "5550001", "address": "1 Main Street",
+            "project_type": "residential"}
+    create(client, "leads", lead)
+
+    stats = client.get("/api/dashboard/stats").json()
+
+    assert (stats["total_projects"], stats["active_projects"]) == (1, 1)
+    assert (stats["total_leads"], stats["new_leads"]) == (1, 1)
+    assert stats["by_status"]["leads"] == {"new": 1}
+
+
+def test_export_streams_every_row_in_page_order(client):
+    ids = [create(client, "projects", {**PROJECT, "name": f"Project {i}"})["id"] for i in range(3)]
+
+    response = client.get("/api/projects/export?format=ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == ids
+    assert "search_grams" not in rows[0]
+
+
+def test_material_import_upserts_by_supplier_and_name(client, server):
+    csv_body = "name,category,unit,cost_per_unit,supplier\nStud,lumber,each,3.5,Acme\nNail,hardware,box,9,Acme\n"
+    first = client.post("/api/materials/import", files={"file": ("prices.csv", csv_body.encode())}).json()
+    again = client.post(
+        "/api/materials/import", files={"file": ("prices.csv", csv_body.replace("3.5", "4").encode())}
+    ).json()
+
+    assert (first["inserted"], first["updated"], first["done"]) == (2, 0, True)
+    assert (again["inserted"], again["updated"]) == (0, 2)
+    costs = {item["name"]: item["cost_per_unit"] for item in client.get("/api/materials").json()}
+    assert costs == {"Stud": 4.0, "Nail": 9.0}
+
+
+def test_streamed_import_reports_bad_rows(client):
+    csv_body = "name,category,unit,cost_per_unit,supplier\nA,x,each,1,S\nB,x,each,oops,S\nC,x,each,3,S\nD,x,each,4,S\n"
+
+    response = client.post(
+        "/api/materials/import?stream=true", files={"file": ("prices.csv", csv_body.encode())}
+    )
+
+    final = json.loads(response.text.splitlines()[-1])
+    assert (final["rows"], final["inserted"], final["failed"], final["done"]) == (4, 3, 1, True)
+    assert [error["row"] for error in final["errors"]] == [3]
+
+
+def test_search_ranks_trigram_matches(client):
+    create(client, "projects", PROJECT)
+    create(client, "projects", {**PROJECT, "name": "Walsh deck", "address": "3 Pine Court"})
+
+    results = client.get("/api/search?q=kitchn&types=projects").json()
+
+    assert results["mode"] == "fuzzy"
+    assert [hit["document"]["name"] for hit in results["hits"]] == ["Garcia kitchen"]
+
+
+def test_material_cost_change_reprices_draft_estimates(client):
+    project = create(client, "projects", PROJECT)
+    material = create(client, "materials", {"name": "Stud", "category": "lumber", "unit": "each", "cost_per_unit": 2.0})
+    estimate = create(client, "estimates", estimate_body(
+        project["id"], line_items=[{"material_id": material["id"], "quantity": 10}]
+    ))
+    assert estimate["materials_cost"] == 20.0
+
+    client.patch(f"/api/materials/{material['id']}", json={"cost_per_unit": 3.0})
+
+    repriced = client.get(f"/api/estimates/{estimate['id']}").json()
+    assert repriced["materials_cost"] == 30.0
+    assert repriced["total_cost"] == 30.0 + 50.0 + 10.0 + 20.0
+
+
+@pytest.mark.anyio
+async def test_orphan_sweep_removes_children_of_missing_parents(server):
+    from cascade import sweep_orphans
+
+    project = await server.project_service.create_project(server.ProjectCreate(**PROJECT))
+    kept = await server.estimate_service.create_estimate(server.EstimateCreate(**estimate_body(project.id)))
+    # The API refuses unknown parents, so the orphan goes straight into storage
+    orphan = server.Estimate(**estimate_body("gone", total_cost=180.0))
+    await server.repositories["estimates"].insert_one(orphan.model_dump())
+
+    removed = await sweep_orphans(server.repositories, server.cache, batch_size=1)
+
+    assert removed == {"estimates": 1}
+    assert await server.repositories["estimates"].get(kept.id)
+    assert await server.repositories["estimates"].get(orphan.id) is None
+
+
+@pytest.mark.anyio
+async def test_orphan_sweep_takes_orphans_back_from_rollups(server):
+    from cascade import sweep_orphans
+    from rollups import Rollups
+
+    project = await server.project_service.create_project(server.ProjectCreate(**PROJECT))
+    await server.estimate_service.create_estimate(server.EstimateCreate(**estimate_body(project.id)))
+    # Stored and rolled up the way writes were before parents were checked
+    orphan = server.Estimate(**estimate_body("gone", total_cost=180.0)).model_dump()
+    await server.repositories["estimates"].insert_one(orphan)
+    await Rollups(server.repositories).record("estimates", [], [orphan])
+
+    await sweep_orphans(server.repositories, server.cache)
+
+    incremental = await Rollups(server.repositories).report("month")
+    await Rollups(server.repositories).rebuild()
+    assert await Rollups(server.repositories).report("month") == incremental
+    assert incremental[0]["estimates"] == 1
+
+
+@pytest.mark.anyio
+async def test_full_update_records_rollups_only_when_inputs_change(server, monkeypatch):
+    project = await server.project_service.create_project(server.ProjectCreate(**PROJECT))
+    recorded = []
+    record = server.project_service.rollups.record
+
+    async def counting_record(*args, **kwargs):
+        recorded.append(args)
+        await record(*args, **kwargs)
+
+    monkeypatch.setattr(server.project_service.rollups, "record", counting_record)
+    renamed = await server.project_service.update_project(project.id, server.ProjectCreate(**{**PROJECT, "name": "Other"}))
+    assert renamed.name == "Other" and recorded == []
+
+    await server.project_service.update_project(project.id, server.ProjectCreate(**{**PROJECT, "estimated_cost": 9.0}))
+    [(source, [before], [after])] = recorded
+    assert (source, before["estimated_cost"], after["estimated_cost"]) == ("projects", 0.0, 9.0)
+    assert await server.project_service.update_project("missing", server.ProjectCreate(**PROJECT)) is None
+
+
+def test_rollup_report_matches_rebuild(client):
+    project = create(client, "projects", PROJECT)
+    create(client, "estimates", estimate_body(project["id"]))
+    create(client, "estimates", estimate_body(project["id"], status="approved"))
+    incremental = client.get("/api/reports/rollups?period=month").json()["rows"]
+
+    assert client.post("/api/admin/rollups/rebuild").json()["buckets"] > 0
+    assert client.get("/api/reports/rollups?period=month").json()["rows"] == incremental
+    [row] = incremental
+    assert (row["projects"], row["estimates"]) == (1, 2)
@@ -0,0 +1,12 @@
+from metrics import Counter, Histogram
+
+
+def test_counters_and_sums_render_at_full_precision():
+    counter = Counter("rows_total", "Rows.", ["route"])
+    counter.inc(("/api/leads",), 1234567)
+    counter.inc(("/api/leads",), 0.5)
+    histogram = Histogram("seconds", "Seconds.", [], buckets=(1.0,))
+    histogram.observe((), 0.1234567891)
+
+    assert 'rows_total{route="/api/leads"} 1234567.5' in counter.render()
+    assert "seconds_sum 0.1234567891" in histogram.render()
@@ -0,0 +1,17 @@
+"""Keyset list paging over HTTP."""
+from .conftest import PROJECT, create
+
+
+def test_list_pages_follow_the_next_cursor(client):
+    ids = [create(client, "projects", {**PROJECT, "name": f"Project {i}"})["id"] for i in range(5)]
+
+    seen, params = [], {"limit": 2}
+    while True:
+        response = client.get("/api/projects", params=params)
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = {"limit": 2, "after": cursor}
+    assert seen == ids
+    assert client.get("/api/projects", params={"after": "not-a-cursor"}).status_code == 400
@@ -0,0 +1,23 @@
+"""PATCH sets only the fields sent; null clears an optional one."""
+from .conftest import PROJECT, create
+
+
+def test_patch_clears_a_field_sent_as_null(client):
+    project = create(client, "projects", {**PROJECT, "description": "Full remodel"})
+
+    patched = client.patch(f"/api/projects/{project['id']}", json={"description": None, "status": "on_hold"})
+
+    assert patched.status_code == 200
+    assert (patched.json()["description"], patched.json()["status"]) == (None, "on_hold")
+    assert client.get(f"/api/projects/{project['id']}").json()["name"] == "Garcia kitchen"
+
+
+def test_patch_cannot_clear_a_required_field(client):
+    project = create(client, "projects", PROJECT)
+
+    rejected = client.patch(f"/api/projects/{project['id']}", json={"name": None})
+    bulk = client.patch("/api/projects/bulk", json={"items": [{"id": project["id"], "changes": {"status": None}}]})
+
+    assert rejected.status_code == 400 and rejected.json()["detail"] == "Cannot clear: name"
+    assert bulk.status_code == 400
+    assert client.get(f"/api/projects/{project['id']}").json()["name"] == "Garcia kitchen"
@@ -0,0 +1,16 @@
+"""Estimates priced from the material catalog."""
+from .conftest import PROJECT, create, estimate_body
+
+
+def test_estimates_are_priced_from_the_catalog(client):
+    project = create(client, "projects", PROJECT)
+    stud = create(client, "materials", {"name": "Stud", "category": "lumber", "unit": "each", "cost_per_unit": 3.5})
+
+    estimate = create(client, "estimates", estimate_body(
+        project["id"], materials_cost=0.0, line_items=[{"material_id": stud["id"], "quantity": 4}],
+    ))
+
+    assert estimate["materials_cost"] == 14.0
+    assert estimate["total_cost"] == 14.0 + 50.0 + 10.0 + 20.0
+    patched = client.patch(f"/api/estimates/{estimate['id']}", json={"labor_cost": 60.0}).json()
+    assert patched["total_cost"] == 14.0 + 60.0 + 10.0 + 20.0
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2024, 1, 1)
+
+
+def material(i, **fields):
+    return {
+        "id": f"m{i:03d}", "name": f"Item {i}", "category": "lumber", "unit": "each", "cost_per_unit": 1.0,
+        "supplier": "Acme", "created_at": START + timedelta(minutes=i), "updated_at": START, **fields,
+    }
+
+
+async def test_find_page_walks_keyset_order(repositories):
+    materials = repositories["materials"]
+    await materials.insert_many([material(i) for i in reversed(range(7))])
+
+    seen, after = [], None
+    while True:
+        page, after = await materials.find_page({}, limit=3, after=after)
+        seen.extend(doc["id"] for doc in page)
+        if not after:
+            break
+    assert seen == [f"m{i:03d}" for i in range(7)]
+
+
+async def test_find_uses_indexes_and_matches_operators(repositories):
+    materials = repositories["materials"]
+    await materials.insert_many([material(i, category="paint" if i % 2 else "lumber") for i in range(6)])
+
+    docs = await materials.find({"category": "paint", "cost_per_unit": {"$gte": 1}}, {"_id": 0, "id": 1})
+    assert docs == [{"id": "m001"}, {"id": "m003"}, {"id": "m005"}]
+    assert await materials.count_by("category") == {"lumber": 3, "paint": 3}
+
+
+async def test_iterate_survives_writes_made_while_walking(repositories):
+    materials = repositories["materials"]
+    await materials.insert_many([material(i) for i in range(5)])
+
+    walked = []
+    async for doc in materials.iterate({}, {"_id": 0, "id": 1}, batch_size=2):
+        walked.append(doc["id"])
+        await materials.delete_one(doc["id"])
+    assert walked == [f"m{i:03d}" for i in range(5)]
+    assert await materials.find({}) == []
+
+
+async def test_set_many_only_writes_documents_matching_where(repositories):
+    estimates = repositories["estimates"]
+    await estimates.insert_many([
+        {"id": "e1", "status": "draft", "total_cost": 1.0, "created_at": START},
+        {"id": "e2", "status": "sent", "total_cost": 1.0, "created_at": START},
+    ])
+
+    written = await estimates.set_many([("e1", {"total_cost": 2.0}), ("e2", {"total_cost": 2.0})], {"status": "draft"})
+
+    assert written == 1
+    assert [doc["total_cost"] for doc in await estimates.find({}, {"_id": 0, "total_cost": 1})] == [2.0, 1.0]
+
+
+async def test_upsert_many_inserts_then_updates_by_key(repositories):
+    materials = repositories["materials"]
+    key = {"supplier": "Acme", "name": "Stud"}
+
+    assert await materials.upsert_many([(key, {"cost_per_unit": 3.0}, {"id": "new", "created_at": START})]) == (1, 0)
+    assert await materials.upsert_many([(key, {"cost_per_unit": 4.0}, {"id": "other", "created_at": START})]) == (0, 1)
+
+    [doc] = await materials.find({"supplier": "Acme"})
+    assert (doc["id"], doc["cost_per_unit"]) == ("new", 4.0)
+
+
+async def test_upsert_many_finds_its_key_among_many_supplier_rows(repositories):
+    materials = repositories["materials"]
+    await materials.insert_many([material(i) for i in range(50)])
+
+    assert await materials.upsert_many([({"supplier": "Acme", "name": "Item 7"}, {"cost_per_unit": 9.0}, {})]) == (0, 1)
+    assert await materials.find({"supplier": "Acme", "cost_per_unit": 9.0}, {"_id": 0, "id": 1}) == [{"id": "m007"}]
+    assert len(await materials.find({"supplier": "Acme"})) == 50
+
+
+async def test_increment_many_creates_and_adds(repositories):
+    rollups = repositories["rollups"]
+    await rollups.increment_many([("k", {"count": 1, "total": 5.0}, {"period": "day"})])
+    await rollups.increment_many([("k", {"count": 2, "total": -1.5}, {"period": "day"})])
+
+    assert await rollups.find({"period": "day"}, {"_id": 0}) == [
+        {"period": "day", "id": "k", "count": 3, "total": 3.5}
+    ]
+
+
+async def test_replace_all_swaps_every_document(repositories):
+    rollups = repositories["rollups"]
+    await rollups.increment_many([("old", {"count": 1}, {"period": "day"})])
+    version = rollups.version
+
+    await rollups.replace_all([{"id": "new", "period": "month", "count": 2}])
+
+    assert await rollups.find({}, {"_id": 0, "id": 1}) == [{"id": "new"}]
+    assert await rollups.find({"period": "day"}) == []
+    assert rollups.version > version
+
+
+async def test_swap_fields_returns_the_previous_document(repositories):
+    materials = repositories["materials"]
+    await materials.insert_one(material(1))
+
+    previous = await materials.swap_fields("m001", {"cost_per_unit": 2.0})
+
+    assert previous["cost_per_unit"] == 1.0
+    assert (await materials.get("m001"))["cost_per_unit"] == 2.0
+    assert await materials.swap_fields("missing", {"cost_per_unit": 2.0}) is None
+
+
+async def test_patch_skips_unchanged_fields(repositories):
+    materials = repositories["materials"]
+    await materials.insert_one(material(1))
+    version = materials.version
+
+    unchanged = await materials.patch("m001", {"cost_per_unit": 1.0})
+    assert unchanged["updated_at"] == START
+    assert materials.version == version
+
+    changed = await materials.patch("m001", {"cost_per_unit": 2.0})
+    assert changed["cost_per_unit"] == 2.0 and changed["updated_at"] > START
+    assert materials.version > version
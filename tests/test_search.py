@@ -0,0 +1,40 @@
+import pytest
+
+from search import _candidate_grams, _fuzzy_hits, search_grams, trigrams
+
+pytestmark = pytest.mark.anyio
+
+
+def project(i, name):
+    doc = {"id": f"p{i:04d}", "name": name, "address": "", "client_id": "c", "project_type": "residential"}
+    return {**doc, "search_grams": search_grams("projects", doc)}
+
+
+def test_candidate_grams_cover_every_document_that_can_score():
+    grams = trigrams("kitchen")
+    candidates = set(_candidate_grams(grams))
+    required = 4  # 40% of the 8 grams, rounded up
+
+    # A document holding `required` grams, none of them candidates, would be missed.
+    assert len(set(grams) - candidates) < required
+
+
+async def test_best_fuzzy_hit_is_found_behind_many_weak_candidates(repositories):
+    repository = repositories["projects"]
+    await repository.insert_many([project(i, "kitchen cabinet") for i in range(50)] + [project(50, "kitchn")])
+
+    hits = await _fuzzy_hits(repository, trigrams("kitchn"), window=1)
+
+    assert [hit["id"] for hit in hits] == ["p0050"]
+    assert hits[0]["score"] == 1.0
+
+
+def test_patched_names_are_searchable(client):
+    created = client.post("/api/projects", json={
+        "name": "Garcia kitchen", "address": "12 Oak Avenue", "client_id": "c1", "project_type": "residential",
+    }).json()
+    client.patch(f"/api/projects/{created['id']}", json={"name": "Walsh bathroom"})
+
+    hits = client.get("/api/search?q=bathrom&types=projects").json()["hits"]
+
+    assert [hit["document"]["id"] for hit in hits] == [created["id"]]
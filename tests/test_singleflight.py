@@ -0,0 +1,59 @@
+"""Concurrent identical loads share one call."""
+import asyncio
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_callers_share_one_call_per_key():
+    from singleflight import SingleFlight
+
+    flight, calls, release = SingleFlight(), [], asyncio.Event()
+
+    async def load(key):
+        calls.append(key)
+        await release.wait()
+        return key.upper()
+
+    waiters = [asyncio.ensure_future(flight.do(key, lambda key=key: load(key))) for key in ("a", "a", "a", "b")]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["A", "A", "A", "B"]
+    assert calls == ["a", "b"]
+    assert flight.stats() == {"in_flight": 0, "started": 2, "shared": 2}
+
+
+async def test_a_cancelled_caller_leaves_the_shared_call_running():
+    from singleflight import SingleFlight
+
+    flight, release = SingleFlight(), asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("key", load))
+    second = asyncio.ensure_future(flight.do("key", load))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_failures_reach_every_caller_and_are_not_kept():
+    from singleflight import SingleFlight
+
+    flight = SingleFlight()
+
+    async def fail():
+        raise ValueError("boom")
+
+    results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    assert [str(result) for result in results] == ["boom", "boom"]
+    assert flight.stats()["in_flight"] == 0